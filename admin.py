@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import database
+import paginated_table
+import process_comparison
 from datetime import datetime
 
 def show_admin_panel():
@@ -88,54 +90,50 @@ def show_system_logs():
     if end_date:
         end_date = datetime.combine(end_date, datetime.max.time())
     
-    # Get logs with date filter
-    logs = database.get_system_logs(start_date, end_date)
+    # Filter by activity type
+    activity_types = ["All"] + database.get_activity_types()
+    selected_type = st.selectbox("Activity type", activity_types)
+    activity_type = None if selected_type == "All" else selected_type
     
-    if logs and len(logs) > 0:
-        log_df = pd.DataFrame(logs)
-        st.dataframe(log_df, use_container_width=True)
-    else:
-        st.info("No logs found for the selected period")
+    # Get logs one page at a time with the filters applied in the database
+    def fetch_page(sort_column, descending, after, page_size):
+        return database.get_system_log_page(
+            start_date, end_date, activity_type=activity_type, sort_column=sort_column,
+            descending=descending, after=after, page_size=page_size
+        )
+    
+    paginated_table.show_paginated_table(
+        "system_logs",
+        fetch_page,
+        {"timestamp": "Timestamp", "username": "Username", "activity_type": "Activity type"},
+        filter_key=(start_date, end_date, activity_type),
+        language="en"
+    )
 
 def show_kpi_overview():
     st.header("KPI Overview")
     
-    # Get all KPI data across users
-    kpi_data = database.get_all_kpi_data()
+    # Aggregated across users in the database instead of loading every entry
+    summary = process_comparison.get_summary_statistics()
     
-    if kpi_data and len(kpi_data) > 0:
-        # Convert to dataframe
-        kpi_df = pd.DataFrame(kpi_data)
-        
+    if not summary.empty:
         # Summary statistics
         st.subheader("Summary Statistics")
-        st.dataframe(kpi_df.describe(), use_container_width=True)
+        st.dataframe(summary, use_container_width=True)
         
         # KPI by industry field
         st.subheader("KPIs by Industry Field")
+        field_averages = process_comparison.get_stat(process_comparison.get_comparison_matrix(group_by="field"))
         
-        # Find numeric columns only for aggregation
-        numeric_columns = kpi_df.select_dtypes(include=['int64', 'float64']).columns
-        
-        # Group by field and calculate averages (numeric columns only)
-        if len(numeric_columns) > 0:
-            field_averages = kpi_df.groupby('field')[numeric_columns].mean().reset_index()
-            
-            # Create bar chart if we have numeric data
-            if not field_averages.empty and len(field_averages.columns) > 1:
-                st.bar_chart(field_averages.set_index('field'))
-            else:
-                st.info("No numeric KPI data available for visualization")
+        # Create bar chart if we have numeric data
+        if not field_averages.empty:
+            st.bar_chart(field_averages)
         else:
-            st.info("No numeric KPI data available for analysis")
-            field_averages = pd.DataFrame()
+            st.info("No numeric KPI data available for visualization")
         
-        # KPI by user (numeric columns only)
+        # KPI by user
         st.subheader("KPIs by User")
-        if len(numeric_columns) > 0:
-            user_averages = kpi_df.groupby('username')[numeric_columns].mean().reset_index()
-        else:
-            user_averages = pd.DataFrame()
+        user_averages = process_comparison.get_stat(process_comparison.get_comparison_matrix(group_by="username"))
         st.dataframe(user_averages, use_container_width=True)
     else:
         st.info("No KPI data available yet")
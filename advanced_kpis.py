@@ -45,7 +45,15 @@ def process_csv_row(row, username):
         database.save_extended_kpi_data(kpi_entry)
 
 import pandas as pd
+import plotly.express as px
 import database
+import downsampling
+import forecasting
+import kpi_cache
+import online_models
+import paginated_table
+import profiling
+import utils
 from datetime import datetime
 
 def show_advanced_kpi_entry():
@@ -126,11 +134,16 @@ def show_advanced_kpi_entry():
                             'Status': 'Success'
                         })
                     
+                    # Update forecasts and online optimization models with the imported data
+                    if forecasting.update_user_forecasts(st.session_state.username) is None:
+                        st.warning("Les prévisions n'ont pas pu être mises à jour; elles le seront à la prochaine saisie.")
+                    online_models.update_user_models(st.session_state.username)
+                    
                     # Show results in a new section
                     st.success("Données importées avec succès!")
                     st.subheader("Résultats de l'importation")
                     results_df = pd.DataFrame(results)
-                    st.dataframe(results_df, use_container_width=True)
+                    profiling.dataframe(results_df, use_container_width=True)
                     
                     # Add button to view dashboard
                     if st.button("Voir le tableau de bord"):
@@ -444,6 +457,11 @@ def show_advanced_kpi_entry():
                 else:
                     st.error(f"Erreur lors de l'enregistrement des données du KPI {kpi_type}")
             
+            # Update forecasts and online optimization models with the new entries
+            if forecasting.update_user_forecasts(st.session_state.username) is None:
+                st.warning("Les prévisions n'ont pas pu être mises à jour; elles le seront à la prochaine saisie.")
+            online_models.update_user_models(st.session_state.username)
+            
             # Log the activity
             database.log_user_activity(
                 st.session_state.username,
@@ -457,7 +475,7 @@ def show_advanced_kpi_entry():
                 {"KPI": k.upper(), "Valeur": list(v.values())[0] if isinstance(v, dict) and len(v) > 0 else v} 
                 for k, v in kpi_results.items()
             ])
-            st.dataframe(results_df, use_container_width=True)
+            profiling.dataframe(results_df, use_container_width=True)
 
 def show_advanced_kpi_dashboard():
     st.title("Dashboard des KPIs Avancés")
@@ -468,23 +486,26 @@ def show_advanced_kpi_dashboard():
         st.error("Erreur lors de la récupération des données utilisateur")
         return
     
-    # Get extended KPI data
-    extended_kpi_data = database.get_user_extended_kpi_data(st.session_state.username)
+    profiling.checkpoint("load data")
     
-    if not extended_kpi_data or len(extended_kpi_data) == 0:
+    # Get extended KPI data grouped by KPI type
+    kpi_by_type = kpi_cache.get_extended_kpi_frames(st.session_state.username)
+    
+    if not kpi_by_type:
         st.info("Aucune donnée de KPI avancé disponible. Veuillez saisir vos données de processus pour voir les métriques KPI.")
         if st.button("Aller à la page de saisie des KPIs avancés"):
             st.session_state.page = "advanced_kpi_entry"
             st.rerun()
         return
     
-    # Group data by KPI type
-    kpi_by_type = {}
-    for entry in extended_kpi_data:
-        kpi_type = entry['kpi_type']
-        if kpi_type not in kpi_by_type:
-            kpi_by_type[kpi_type] = []
-        kpi_by_type[kpi_type].append(entry)
+    # Keep the most recent entry of each KPI type across processes
+    latest_by_type = {}
+    for entry in database.get_latest_kpi_snapshot(st.session_state.username):
+        current = latest_by_type.get(entry['kpi_type'])
+        if current is None or entry['date'] > current['date']:
+            latest_by_type[entry['kpi_type']] = entry
+    
+    profiling.checkpoint("kpi cards")
     
     # Display KPI summary cards
     st.subheader("Résumé des KPIs")
@@ -496,9 +517,8 @@ def show_advanced_kpi_dashboard():
     user_kpi_prefs = database.get_user_kpi_preferences(st.session_state.username)
     if user_kpi_prefs:
         for kpi_type in user_kpi_prefs:
-            kpi_data = database.get_user_kpi_data_by_type(st.session_state.username, kpi_type)
-            if kpi_data:
-                latest_data = kpi_data[0]
+            if kpi_type in latest_by_type:
+                latest_data = latest_by_type[kpi_type]['kpi_data']
                 with eval(f"col{col_idx % 3 + 1}"):
                     if 'efficiency' in latest_data:
                         st.metric(kpi_type.replace('_', ' ').title(), f"{latest_data['efficiency']:.2f}%")
@@ -508,21 +528,11 @@ def show_advanced_kpi_dashboard():
     
     # Define function to get the latest value for a KPI
     def get_latest_kpi_value(kpi_type):
-        if kpi_type not in kpi_by_type:
+        if kpi_type not in latest_by_type:
             return None
         
-        # Sort by date (most recent first)
-        sorted_entries = sorted(kpi_by_type[kpi_type], key=lambda x: x['date'], reverse=True)
-        
-        if not sorted_entries:
-            return None
-        
-        # Get first key-value pair from the kpi_data
-        latest_entry = sorted_entries[0]
-        kpi_data = latest_entry['kpi_data']
-        
-        # Return the first value (usually the main KPI value)
-        return list(kpi_data.values())[0] if isinstance(kpi_data, dict) and len(kpi_data) > 0 else None
+        # Return the main KPI value of the latest entry
+        return utils.get_main_kpi_value(kpi_type, latest_by_type[kpi_type]['kpi_data'])
     
     # Define KPI display names and units
     kpi_display_info = {
@@ -563,46 +573,93 @@ def show_advanced_kpi_dashboard():
             
             col_idx += 1
     
-    # Display detailed KPI analysis with tabs
+    profiling.checkpoint("anomalies")
+    
+    # Display entries flagged by the anomaly detector
+    anomalies = database.get_user_kpi_anomalies(st.session_state.username)
+    if anomalies:
+        st.subheader("Anomalies détectées")
+        anomaly_labels = {"out_of_range": "Hors limites", "spike": "Pic", "drop": "Chute"}
+        anomalies_df = pd.DataFrame(anomalies)
+        anomalies_df['reason'] = anomalies_df['reason'].map(anomaly_labels).fillna(anomalies_df['reason'])
+        anomalies_df = anomalies_df.rename(columns={
+            "date": "Date", "process_name": "Processus", "kpi_type": "KPI", "metric": "Indicateur",
+            "value": "Valeur", "score": "Score", "reason": "Type", "detected_at": "Détectée le"
+        })
+        st.warning(f"{len(anomalies_df)} valeur(s) anormale(s) détectée(s) dans vos saisies récentes.")
+        profiling.dataframe(anomalies_df, use_container_width=True)
+    
+    profiling.checkpoint("detailed analysis")
+    
+    # Display detailed KPI analysis, rendering only the selected KPI view
     if kpi_by_type:
         st.subheader("Analyse détaillée des KPIs")
+        show_kpi_detail_views(list(kpi_by_type.keys()), kpi_display_info)
+
+# Function to display the detailed view of the selected KPI type
+# Runs as a fragment so that switching views or zooming only reruns this part of the page
+@st.fragment
+def show_kpi_detail_views(kpi_types, kpi_display_info):
+    selected_kpi = st.radio(
+        "KPI à analyser",
+        kpi_types,
+        format_func=lambda kpi_type: kpi_display_info.get(kpi_type, (kpi_type.upper(), ""))[0],
+        horizontal=True,
+        key="advanced_kpi_view"
+    )
+    
+    df = kpi_cache.get_extended_kpi_frames(st.session_state.username).get(selected_kpi)
+    if df is None:
+        return
+    
+    display_name, unit = kpi_display_info.get(selected_kpi, (selected_kpi.upper(), ""))
+    
+    # Display trend chart if we have date and the main value (frames are already sorted by date)
+    main_value_key = utils.KPI_MAIN_METRICS.get(selected_kpi)
+    if main_value_key not in df.columns:
+        numeric_columns = df.select_dtypes(include='number').columns
+        main_value_key = numeric_columns[0] if len(numeric_columns) > 0 else None
+    
+    if main_value_key and 'Date' in df.columns and main_value_key in df.columns:
+        st.subheader(f"Tendance: {display_name}")
         
-        # Create tabs for each KPI type
-        kpi_tabs = st.tabs([kpi_display_info.get(kpi_type, (kpi_type.upper(), ""))[0] for kpi_type in kpi_by_type.keys()])
+        chart_df = downsampling.select_range(df, 'Date', key=f"range_{selected_kpi}", label="Période affichée")
         
-        for i, (kpi_type, kpi_entries) in enumerate(kpi_by_type.items()):
-            with kpi_tabs[i]:
-                display_name, unit = kpi_display_info.get(kpi_type, (kpi_type.upper(), ""))
-                
-                # Convert to dataframe
-                rows = []
-                for entry in kpi_entries:
-                    row = {
-                        "Date": entry['date'],
-                        "Processus": entry['process_name'],
-                    }
-                    # Add all KPI data values
-                    for k, v in entry['kpi_data'].items():
-                        row[k] = v
-                    rows.append(row)
-                
-                df = pd.DataFrame(rows)
-                
-                # Sort by date
-                if 'Date' in df.columns:
-                    df = df.sort_values('Date')
-                
-                # Display trend chart if we have date and the main value
-                main_value_key = list(kpi_entries[0]['kpi_data'].keys())[0] if kpi_entries and 'kpi_data' in kpi_entries[0] else None
-                
-                if main_value_key and 'Date' in df.columns and main_value_key in df.columns:
-                    st.subheader(f"Tendance: {display_name}")
-                    
-                    import plotly.express as px
-                    fig = px.line(df, x='Date', y=main_value_key, title=f"{display_name} - Évolution")
-                    fig.update_layout(yaxis_title=f"{display_name} ({unit})")
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Display the data table
-                st.subheader(f"Données détaillées: {display_name}")
-                st.dataframe(df, use_container_width=True)
\ No newline at end of file
+        # Figures are built on first display and cached with the data version
+        def build_figure(username):
+            plot_df = downsampling.downsample_frame(chart_df, 'Date', [main_value_key])
+            fig = px.line(plot_df, x='Date', y=main_value_key, title=f"{display_name} - Évolution")
+            fig.update_layout(yaxis_title=f"{display_name} ({unit})")
+            return fig
+        
+        figure_key = ("kpi_figure", selected_kpi, len(chart_df), chart_df['Date'].min(), chart_df['Date'].max())
+        fig = kpi_cache.get_cached(st.session_state.username, figure_key, build_figure)
+        profiling.plotly_chart(fig, use_container_width=True)
+    
+    # Display the data table one page at a time from the database
+    st.subheader(f"Données détaillées: {display_name}")
+    processes = ["Tous"] + sorted(df['Processus'].unique().tolist())
+    selected_process = st.selectbox("Processus", processes, key=f"detail_process_{selected_kpi}")
+    process_filter = None if selected_process == "Tous" else selected_process
+    
+    def fetch_page(sort_column, descending, after, page_size):
+        return database.get_extended_kpi_page(
+            st.session_state.username, selected_kpi, process_filter,
+            sort_column, descending, after, page_size
+        )
+    
+    def format_rows(rows):
+        page_df = pd.DataFrame({
+            "Date": [row["date"] for row in rows],
+            "Processus": [row["process_name"] for row in rows]
+        })
+        values = pd.DataFrame([row["kpi_data"] for row in rows])
+        return pd.concat([page_df, values.drop(columns=["Date", "Processus"], errors="ignore")], axis=1)
+    
+    paginated_table.show_paginated_table(
+        f"detail_{selected_kpi}",
+        fetch_page,
+        {"date": "Date", "process_name": "Processus", "created_at": "Date de saisie"},
+        format_rows=format_rows,
+        filter_key=process_filter
+    )
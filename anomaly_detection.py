@@ -0,0 +1,88 @@
+import math
+import numbers
+
+# Metrics that are percentages and must stay between 0 and 100
+PERCENT_METRICS = {
+    "oee": {"oee_value", "availability", "performance", "quality"},
+    "yield": {"yield_rate"},
+    "fpy": {"fpy_rate"},
+    "defect_rate": {"defect_rate"},
+    "equipment_availability": {"availability_rate"},
+    "equipment_utilization": {"utilization_rate"},
+    "on_time_delivery": {"otd_rate"},
+    "absence_rate": {"absence_rate"},
+    "flow_efficiency": {"efficiency"}
+}
+
+# Number of points used to initialise the median/MAD sketch exactly
+WARMUP_POINTS = 8
+
+# Robust z-score above which a point is flagged
+Z_THRESHOLD = 3.5
+
+# Relative step of the streaming median/MAD updates
+LEARNING_RATE = 0.05
+
+# Scale factor making the MAD a consistent estimate of the standard deviation
+MAD_SCALE = 1.4826
+
+# Function to create an empty sketch for a new series
+def new_state():
+    return {"median": None, "mad": None, "count": 0, "warmup": []}
+
+# Function to get the numeric metrics of a KPI entry
+def get_numeric_metrics(kpi_data):
+    return {
+        metric: float(value) for metric, value in kpi_data.items()
+        if isinstance(value, numbers.Real) and not isinstance(value, bool) and math.isfinite(value)
+    }
+
+# Function to score one value against its series sketch in O(1)
+# Returns (score, reason, updated_state); reason is None for normal points
+def score_value(kpi_type, metric, value, state):
+    state = {**state, "warmup": list(state["warmup"])}
+    score, reason = 0.0, None
+
+    # Hard range rule for percentages
+    if metric in PERCENT_METRICS.get(kpi_type, ()) and not 0 <= value <= 100:
+        score, reason = math.inf, "out_of_range"
+
+    if state["median"] is None:
+        # Collect the first points and initialise the sketch exactly
+        state["warmup"].append(value)
+        if len(state["warmup"]) >= WARMUP_POINTS:
+            values = sorted(state["warmup"])
+            median = values[len(values) // 2]
+            deviations = sorted(abs(v - median) for v in values)
+            state["median"] = median
+            state["mad"] = deviations[len(deviations) // 2]
+            state["warmup"] = []
+    else:
+        median, mad = state["median"], state["mad"]
+        scale = max(mad, 1e-3 * abs(median), 1e-9)
+
+        if reason is None:
+            score = (value - median) / (MAD_SCALE * scale)
+            if abs(score) > Z_THRESHOLD:
+                reason = "spike" if score > 0 else "drop"
+
+        # Sign-based stochastic updates keep the sketch robust to the outliers it scores
+        deviation = abs(value - median)
+        state["median"] = median + LEARNING_RATE * scale * math.copysign(1, value - median) * (value != median)
+        state["mad"] = max(mad + LEARNING_RATE * scale * math.copysign(1, deviation - mad) * (deviation != mad), 0.0)
+
+    state["count"] += 1
+    return score, reason, state
+
+# Function to score every numeric metric of a new KPI entry
+# states maps metric -> sketch; returns (anomalies, updated_states)
+def score_entry(kpi_type, kpi_data, states):
+    anomalies = []
+    updated = {}
+
+    for metric, value in get_numeric_metrics(kpi_data).items():
+        score, reason, updated[metric] = score_value(kpi_type, metric, value, states.get(metric, new_state()))
+        if reason is not None:
+            anomalies.append({"metric": metric, "value": value, "score": score, "reason": reason})
+
+    return anomalies, updated
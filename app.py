@@ -9,6 +9,7 @@ import optimization
 import database
 import kpi_selector
 import advanced_kpis
+import profiling
 import plotly.express as px
 
 
@@ -134,6 +135,7 @@ def main():
                 if st.button("User Management", key="admin_btn"):
                     st.session_state.page = "admin_panel"
                     st.rerun()
+                st.toggle("Show render profiling", key="profiling_enabled")
                 st.write("---")
             
             if st.button("Logout", key="logout_btn"):
@@ -144,6 +146,14 @@ def main():
                 st.session_state.page = "welcome"
                 st.rerun()
     
+    # Profile the page render for admins who enabled it
+    profiling.start_run(st.session_state.is_admin and st.session_state.get("profiling_enabled", False))
+    with profiling.section(f"page: {st.session_state.page}"):
+        route_page()
+    profiling.show_report()
+
+# Function to render the page selected in the session state
+def route_page():
     # Page routing
     if st.session_state.page == "welcome":
         show_welcome_page()
@@ -0,0 +1,131 @@
+import argparse
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import database
+import kpi_cache
+import model_selection
+import optimization_targets
+import solvers
+
+# Processes need this many complete rows before a target is optimized
+MIN_ROWS = 5
+
+# Function to build the optimization jobs of one user from their feature matrix
+# Every process is optimized for each main metric it reports, with the inputs the optimization page defaults to
+# Returns None when the matrix cannot be read (batch users always have extended KPI data)
+def build_user_jobs(username, version):
+    matrix = kpi_cache.get_feature_matrix(username)
+    if matrix.empty:
+        return None
+    jobs = []
+
+    for process_name, process_df in matrix.groupby('process_name', sort=True):
+        process_df = process_df.dropna(axis=1, how='all')
+        targets = optimization_targets.get_optimization_targets(process_df)
+
+        for target_column, _ in targets["targets"].values():
+            input_variables = optimization_targets.get_default_inputs(targets, [target_column])
+            if not input_variables:
+                continue
+
+            rows = process_df.dropna(subset=[target_column] + input_variables)
+            if len(rows) < MIN_ROWS:
+                continue
+
+            jobs.append({
+                "username": username,
+                "process_name": process_name,
+                "target_column": target_column,
+                "input_variables": input_variables,
+                "goal": "Minimize" if target_column in optimization_targets.MINIMIZED_TARGETS else "Maximize",
+                "data_version": version,
+                "X": rows[input_variables].to_numpy(dtype=float),
+                "y": rows[target_column].to_numpy(dtype=float)
+            })
+
+    return jobs
+
+# Function to run the optimization pipeline of one job (runs in a worker process)
+# The model is selected by cross-validation, then its optimum is searched over the observed input ranges
+def optimize_job(job):
+    X, y = job["X"], job["y"]
+
+    # Each job runs in its own worker, so model selection stays in-process
+    selected = model_selection.fit_optimization_model(X, y, "auto", max_workers=1)
+    poly, model = selected["poly"], selected["model"]
+
+    solution = solvers.solve_model(poly, model, X.min(axis=0), X.max(axis=0), job["goal"])
+
+    return {
+        "username": job["username"],
+        "process_name": job["process_name"],
+        "target_column": job["target_column"],
+        "goal": job["goal"],
+        "input_variables": job["input_variables"],
+        "model_name": selected["name"],
+        "r2": float(selected["r2"]),
+        "cv_r2": float(selected["cv_scores"]["CV R²"].iloc[0]),
+        "num_rows": len(y),
+        "optimal_value": float(solution["y"]),
+        "optimal_settings": dict(zip(job["input_variables"], np.asarray(solution["x"], dtype=float).tolist())),
+        "data_version": job["data_version"]
+    }
+
+# Function to optimize every (user, process, target) combination in a process pool
+# Users whose results were computed from their current data version are skipped unless force is set
+# Returns a summary, or None when the users cannot be read or the results cannot be saved
+def run_batch(usernames=None, max_workers=None, force=False):
+    users = database.get_optimization_batch_users()
+    if users is None:
+        return None
+    if usernames:
+        users = [user for user in users if user["username"] in usernames]
+
+    stale = [user for user in users if force or user["computed_version"] != user["version"]]
+
+    # Users whose data cannot be read keep their stored results and are retried on the next run
+    jobs, user_versions, unreadable = [], {}, []
+    for user in stale:
+        user_jobs = build_user_jobs(user["username"], user["version"])
+        if user_jobs is None:
+            unreadable.append(user["username"])
+            continue
+        jobs.extend(user_jobs)
+        user_versions[user["username"]] = user["version"]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            results = list(executor.map(optimize_job, jobs, chunksize=max(1, len(jobs) // (4 * max_workers))))
+    else:
+        results = [optimize_job(job) for job in jobs]
+
+    if user_versions and not database.save_optimization_results(user_versions, results):
+        return None
+
+    return {
+        "users": len(user_versions),
+        "skipped_users": len(users) - len(stale),
+        "unreadable_users": unreadable,
+        "combinations": len(results)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute optimal process settings for all users, processes and targets")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--user", action="append", default=None, help="Only optimize this user (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Recompute users whose data has not changed")
+    args = parser.parse_args()
+
+    summary = run_batch(args.user, args.workers, args.force)
+    if summary is None:
+        sys.exit("Optimization batch failed: the database could not be read or the results could not be saved")
+
+    print(
+        f"Optimized {summary['combinations']} combinations for {summary['users']} users "
+        f"({summary['skipped_users']} unchanged users skipped)"
+    )
+    if summary["unreadable_users"]:
+        sys.exit(f"The KPI data of these users could not be read: {', '.join(summary['unreadable_users'])}")
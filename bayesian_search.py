@@ -0,0 +1,90 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+import sampling
+import solvers
+
+# Total number of objective evaluations, initial Latin hypercube design included
+DEFAULT_BUDGET = 60
+
+# Stop after this many refinement steps without a relative improvement above EARLY_STOP_TOLERANCE
+EARLY_STOP_PATIENCE = 8
+EARLY_STOP_TOLERANCE = 1e-4
+
+# Number of random candidates scoring the acquisition function at each step
+ACQUISITION_CANDIDATES = 2000
+
+# Function to get the expected improvement of candidates over the best loss so far
+def expected_improvement(mean, std, best_loss, xi=0.01):
+    std = np.maximum(std, 1e-12)
+    improvement = best_loss - mean - xi
+    z = improvement / std
+    return improvement * norm.cdf(z) + std * norm.pdf(z)
+
+# Function to minimize a black-box loss over the box [lower, upper] with a Gaussian-process guided search
+# The search starts from a Latin hypercube design, then evaluates the point of highest expected improvement
+# until the evaluation budget is spent or the best loss stops improving
+def gp_search(loss, lower, upper, budget=DEFAULT_BUDGET, n_initial=None, seed=0):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    scale = np.where(upper > lower, upper - lower, 1.0)
+    num_variables = len(lower)
+    rng = np.random.default_rng(seed)
+
+    # The GP works in unit-cube coordinates
+    n_initial = min(n_initial or max(2 * num_variables + 2, 10), budget)
+    Z = sampling.latin_hypercube(n_initial, np.zeros(num_variables), np.ones(num_variables), seed)
+    losses = np.asarray(loss(lower + Z * scale), dtype=float)
+
+    kernel = ConstantKernel(1.0) * Matern(length_scale=np.full(num_variables, 0.3), nu=2.5) + WhiteKernel(1e-6)
+    gp = GaussianProcessRegressor(kernel=kernel, normalize_y=True, n_restarts_optimizer=1, random_state=seed)
+
+    history = list(np.minimum.accumulate(losses))
+    stalled = 0
+
+    while len(losses) < budget and stalled < EARLY_STOP_PATIENCE:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            gp.fit(Z, losses)
+
+        # Global candidates plus local perturbations of the incumbent
+        best = Z[np.argmin(losses)]
+        candidates = np.vstack([
+            rng.random((ACQUISITION_CANDIDATES, num_variables)),
+            np.clip(best + rng.normal(0, 0.05, (ACQUISITION_CANDIDATES // 4, num_variables)), 0, 1)
+        ])
+        mean, std = gp.predict(candidates, return_std=True)
+        z_next = candidates[np.argmax(expected_improvement(mean, std, losses.min()))]
+
+        new_loss = float(np.asarray(loss((lower + z_next * scale)[None, :]), dtype=float)[0])
+        previous_best = losses.min()
+        Z = np.vstack([Z, z_next])
+        losses = np.append(losses, new_loss)
+        history.append(losses.min())
+
+        if previous_best - losses.min() > EARLY_STOP_TOLERANCE * max(abs(previous_best), 1.0):
+            stalled = 0
+        else:
+            stalled += 1
+
+    best_index = int(np.argmin(losses))
+    return {
+        "x": lower + Z[best_index] * scale,
+        "loss": float(losses[best_index]),
+        "evaluations": len(losses),
+        "early_stopped": len(losses) < budget,
+        "history": pd.DataFrame({"Evaluation": np.arange(1, len(history) + 1), "Best Loss": history})
+    }
+
+# Function to search the optimum of a fitted model; poly may be None for models on the raw variables
+def search_model(poly, model, lower, upper, goal, target_value=None, budget=DEFAULT_BUDGET, seed=0):
+    def predict(X):
+        return model.predict(poly.transform(X) if poly is not None else X)
+
+    result = gp_search(lambda X: solvers.goal_scores(predict(X), goal, target_value), lower, upper, budget, seed=seed)
+    result["y"] = float(predict(result["x"][None, :])[0])
+    return result
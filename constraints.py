@@ -0,0 +1,115 @@
+import re
+import numpy as np
+
+# Comparison operators of a constraint line, longest first so that "<=" is not read as "="
+OPERATORS = ["<=", ">=", "==", "="]
+
+# Term of a linear expression: a sign, an optional coefficient, optionally followed by "*" and a variable name
+# Terms are read left to right, so exponents (1e-3) and names ending in "e" (cycle_time) are not split
+TERM_PATTERN = re.compile(
+    r"\s*(?P<sign>[+-]?)\s*(?P<coef>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)?\s*(?P<star>\*)?\s*(?P<name>[A-Za-z_][\w.]*)?\s*"
+)
+
+# Ratio constraint "a / b <op> number", read as a - number * b <op> 0 (b is assumed positive)
+RATIO_PATTERN = re.compile(r"^(?P<numerator>[A-Za-z_][\w.]*)\s*/\s*(?P<denominator>[A-Za-z_][\w.]*)$")
+
+# Function to parse a linear expression into variable coefficients and a constant
+def _parse_expression(expression, variables):
+    coefs = np.zeros(len(variables))
+    constant = 0.0
+
+    position = 0
+    while position < len(expression):
+        match = TERM_PATTERN.match(expression, position)
+        term = match.group(0).strip()
+        if (match.group("coef") is None and match.group("name") is None) \
+                or (match.group("star") and (match.group("coef") is None or match.group("name") is None)) \
+                or (position > 0 and not match.group("sign")):
+            raise ValueError(f"cannot read the term '{term or expression[position:].strip()}'")
+        position = match.end()
+
+        value = float(match.group("coef")) if match.group("coef") is not None else 1.0
+        if match.group("sign") == "-":
+            value = -value
+
+        name = match.group("name")
+        if name is None:
+            constant += value
+        elif name in variables:
+            coefs[variables.index(name)] += value
+        else:
+            raise ValueError(f"unknown variable '{name}'")
+
+    return coefs, constant
+
+# Function to parse one constraint line into a row (coefs, operator, rhs) meaning coefs . x <op> rhs
+def parse_constraint(line, variables):
+    operator = next((op for op in OPERATORS if op in line), None)
+    if operator is None:
+        raise ValueError("expected one of <=, >= or =")
+
+    left, right = (side.strip() for side in line.split(operator, 1))
+    if not left or not right:
+        raise ValueError("both sides of the constraint must be given")
+    operator = "=" if operator == "==" else operator
+
+    ratio = RATIO_PATTERN.match(left)
+    if ratio is not None:
+        try:
+            ratio_value = float(right)
+        except ValueError:
+            raise ValueError("the right side of a ratio constraint must be a number") from None
+        for name in (ratio.group("numerator"), ratio.group("denominator")):
+            if name not in variables:
+                raise ValueError(f"unknown variable '{name}'")
+
+        coefs = np.zeros(len(variables))
+        coefs[variables.index(ratio.group("numerator"))] += 1.0
+        coefs[variables.index(ratio.group("denominator"))] -= ratio_value
+        return coefs, operator, 0.0
+
+    left_coefs, left_constant = _parse_expression(left, variables)
+    right_coefs, right_constant = _parse_expression(right, variables)
+    coefs = left_coefs - right_coefs
+    if not np.any(coefs):
+        raise ValueError("the constraint does not involve any input variable")
+    return coefs, operator, right_constant - left_constant
+
+# Function to build the constraint set of the optimizers from variable bounds and constraint lines
+# Returns the bounds and the matrices of A_ub x <= b_ub and A_eq x = b_eq; errors name the offending line
+def build_constraints(variables, lower, upper, text=""):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    for name, lo, hi in zip(variables, lower, upper):
+        if lo > hi:
+            raise ValueError(f"The minimum of {name} is above its maximum")
+
+    ub_rows, ub_values, eq_rows, eq_values = [], [], [], []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            coefs, operator, rhs = parse_constraint(line, list(variables))
+        except ValueError as e:
+            raise ValueError(f"Constraint line {number}: {e}") from None
+
+        if operator == "<=":
+            ub_rows.append(coefs)
+            ub_values.append(rhs)
+        elif operator == ">=":
+            ub_rows.append(-coefs)
+            ub_values.append(-rhs)
+        else:
+            eq_rows.append(coefs)
+            eq_values.append(rhs)
+
+    num_variables = len(variables)
+    return {
+        "lower": lower,
+        "upper": upper,
+        "A_ub": np.array(ub_rows).reshape(-1, num_variables),
+        "b_ub": np.array(ub_values, dtype=float),
+        "A_eq": np.array(eq_rows).reshape(-1, num_variables),
+        "b_eq": np.array(eq_values, dtype=float)
+    }
@@ -4,8 +4,32 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import database
+import downsampling
+import forecasting
+import kpi_cache
+import process_comparison
+import profiling
+import utils
 from datetime import datetime, timedelta
 
+# Extended KPI types plotted in the historical trends of each industry
+TREND_KPIS = {
+    "Oil and Gas": ["flow_efficiency", "energy_efficiency"],
+    "Food and Beverage": ["yield", "defect_rate"],
+    "Pharmaceutical": ["yield", "fpy"],
+    "Generic": ["oee", "productivity"]
+}
+
+# Extended KPI type forecast on each legacy trend column; columns without an equivalent KPI get no band
+LEGACY_TREND_KPIS = {
+    "flow_efficiency": "flow_efficiency",
+    "energy_efficiency": "energy_efficiency",
+    "yield_rate": "yield",
+    "yield_efficiency": "yield",
+    "right_first_time": "fpy",
+    "productivity": "productivity"
+}
+
 def show_dashboard():
     st.title("KPI Dashboard")
 
@@ -15,25 +39,15 @@ def show_dashboard():
         st.error("Error fetching user data")
         return
 
-    # Get user's advanced KPI data
-    kpi_data = database.get_user_extended_kpi_data(st.session_state.username)
+    profiling.checkpoint("load data")
 
-    if not kpi_data or len(kpi_data) == 0:
+    # Get user's advanced KPI data as a typed frame, cached until the user's data changes
+    df = kpi_cache.get_extended_kpi_frame(st.session_state.username)
+
+    if len(df) == 0:
         st.info("No KPI data available. Please enter your process data in the Advanced KPIs section to see metrics.")
         return
 
-    # Convert to dataframe for easier filtering
-    records = []
-    for entry in kpi_data:
-        record = {
-            'date': entry['date'],
-            'process_name': entry['process_name'],
-            **entry['kpi_data']  # Unpack the KPI data
-        }
-        records.append(record)
-    df = pd.DataFrame(records)
-    df['date'] = pd.to_datetime(df['date'])
-
     # Filters section
     st.subheader("Select Data to Display")
     col1, col2 = st.columns(2)
@@ -55,7 +69,7 @@ def show_dashboard():
 
     # Filter data based on selection
     filtered_data = df[
-        (df['date'].dt.date == selected_date) &
+        (df['date'] == pd.Timestamp(selected_date)) &
         (df['process_name'] == selected_process)
     ]
 
@@ -63,6 +77,8 @@ def show_dashboard():
         st.warning("No data available for the selected date and process.")
         return
 
+    profiling.checkpoint("kpi summary")
+
     # Display KPI summary for selected data
     st.subheader("KPI Summary")
     latest_data = filtered_data.iloc[0]
@@ -115,26 +131,64 @@ def show_dashboard():
         with col3:
             st.metric("Energy Efficiency", f"{latest_data.get('energy_efficiency', 0):.2f} units/kWh")
 
+    profiling.checkpoint("historical trends")
+
     # Display trends
     st.subheader("Historical Trends")
     process_data = df[df['process_name'] == selected_process].copy()
     process_data = process_data.sort_values('date')
+    process_data = downsampling.select_range(process_data, 'date', key="dashboard_trend_range")
 
-    # Create trend chart based on industry
-    if field == "Oil and Gas":
-        fig = px.line(process_data, x='date', y=['flow_efficiency', 'energy_efficiency'],
-                     title=f"KPI Trends for {selected_process}")
-    elif field == "Food and Beverage":
-        fig = px.line(process_data, x='date', y=['yield_rate', 'waste_rate'],
-                     title=f"KPI Trends for {selected_process}")
-    elif field == "Pharmaceutical":
-        fig = px.line(process_data, x='date', y=['yield_efficiency', 'right_first_time'],
-                     title=f"KPI Trends for {selected_process}")
-    else:
-        fig = px.line(process_data, x='date', y=['efficiency', 'productivity'],
-                     title=f"KPI Trends for {selected_process}")
+    # Main metric of the trend KPIs of the industry, with its forecast for the selected process
+    trend_kpis = [kpi_type for kpi_type in TREND_KPIS.get(field, TREND_KPIS["Generic"])
+                  if utils.KPI_MAIN_METRICS[kpi_type] in process_data.columns]
+    trend_data = pd.concat([
+        pd.DataFrame({
+            'date': process_data.loc[process_data['kpi_type'] == kpi_type, 'date'],
+            'KPI': kpi_type.replace('_', ' ').title(),
+            'value': process_data.loc[process_data['kpi_type'] == kpi_type, utils.KPI_MAIN_METRICS[kpi_type]]
+        })
+        for kpi_type in trend_kpis
+    ] or [pd.DataFrame(columns=['date', 'KPI', 'value'])], ignore_index=True).dropna(subset=['value'])
+
+    # Downsample to the chart's point budget before plotting
+    chart_data = downsampling.downsample_frame(trend_data, 'date', ['value'], group='KPI')
+    fig = px.line(chart_data, x='date', y='value', color='KPI',
+                 title=f"KPI Trends for {selected_process}")
+
+    trend_forecasts = pd.DataFrame(database.get_user_kpi_forecasts(st.session_state.username))
+    for kpi_type in trend_kpis:
+        forecasting.add_forecast_band(fig, trend_forecasts, kpi_type, selected_process,
+                                      label=kpi_type.replace('_', ' ').title())
+
+    profiling.plotly_chart(fig, use_container_width=True)
+
+    profiling.checkpoint("forecast")
+
+    # Display forecasts for the selected process
+    forecasts = trend_forecasts
+    if not forecasts.empty:
+        process_forecasts = forecasts[forecasts['process_name'] == selected_process]
+
+        if not process_forecasts.empty:
+            st.subheader("KPI Forecast")
+            forecast_kpi = st.selectbox(
+                "Select KPI to Forecast",
+                sorted(process_forecasts['kpi_type'].unique())
+            )
 
-    st.plotly_chart(fig, use_container_width=True)
+            kpi_frame = kpi_cache.get_extended_kpi_frames(st.session_state.username).get(forecast_kpi)
+            main_metric = utils.KPI_MAIN_METRICS.get(forecast_kpi)
+            if kpi_frame is not None and main_metric in kpi_frame.columns:
+                history = kpi_frame.loc[kpi_frame['Processus'] == selected_process, ['Date', main_metric]]
+                history.columns = ['date', 'value']
+            else:
+                history = pd.DataFrame(columns=['date', 'value'])
+
+            fig = px.line(history, x='date', y='value',
+                         title=f"{forecast_kpi.replace('_', ' ').title()} Forecast for {selected_process}")
+            forecasting.add_forecast_band(fig, process_forecasts, forecast_kpi)
+            profiling.plotly_chart(fig, use_container_width=True)
 
 
 def show_kpi_entry_form(user_data):
@@ -361,7 +415,7 @@ def show_process_performance(kpi_data):
             showlegend=False
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
     
     elif field == "Food and Beverage":
         # Create radar chart
@@ -403,7 +457,7 @@ def show_process_performance(kpi_data):
             showlegend=False
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
     
     elif field == "Pharmaceutical":
         # Create radar chart
@@ -444,7 +498,7 @@ def show_process_performance(kpi_data):
             showlegend=False
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
     
     else:  # Generic radar chart
         # Create radar chart
@@ -488,29 +542,32 @@ def show_process_performance(kpi_data):
             showlegend=False
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
     
     # Display process comparison table
     st.subheader("Process Comparison")
     
-    # Group by process name and calculate averages for numeric columns only
-    if 'process_name' in df.columns:
-        # Get only numeric columns
-        numeric_columns = df.select_dtypes(include=['int64', 'float64']).columns
-        
-        # Make sure we have numeric columns to operate on
-        if len(numeric_columns) > 0:
-            # Include process_name column for grouping
-            columns_to_use = ['process_name'] + [col for col in numeric_columns if col != 'process_name']
-            df_numeric = df[columns_to_use]
-            
-            # Group by process_name and calculate mean of numeric columns
-            process_comparison = df_numeric.groupby('process_name').mean().reset_index()
-            
-            # Display comparison table
-            st.dataframe(process_comparison, use_container_width=True)
-        else:
-            st.info("No numeric data available for comparison")
+    # Aggregated per process in the database; only the comparison matrix is loaded
+    metrics = [col for col in df.select_dtypes(include=['int64', 'float64']).columns if col != 'id']
+    if not metrics:
+        st.info("No numeric data available for comparison")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        sort_metric = st.selectbox("Sort processes by", metrics, key="process_comparison_sort")
+    with col2:
+        top_n = st.number_input("Top processes", min_value=1, value=20, step=1, key="process_comparison_top_n")
+    
+    process_matrix = process_comparison.get_comparison_matrix(
+        group_by="process_name",
+        username=st.session_state.username,
+        sort_metric=sort_metric,
+        top_n=int(top_n)
+    )
+    
+    if not process_matrix.empty:
+        profiling.dataframe(process_comparison.flatten_columns(process_matrix), use_container_width=True)
     else:
         st.info("No process name data available for comparison")
 
@@ -528,66 +585,87 @@ def show_trends(kpi_data):
     # Extract field
     field = df.iloc[0]['field']
     
+    # Trends and forecasts are shown per process
+    selected_process = None
+    if 'process_name' in df.columns:
+        selected_process = st.selectbox("Select Process", sorted(df['process_name'].dropna().unique()),
+                                        key="trends_process")
+        df = df[df['process_name'] == selected_process]
+    
+    # Zoom on a date range; charts are downsampled to the fixed point budget of a full-width chart
+    df = downsampling.select_range(df, 'date', key="trends_range")
+    
+    # Get stored forecasts to extend the trend charts
+    forecasts = pd.DataFrame(database.get_user_kpi_forecasts(st.session_state.username))
+    
     # Display trends based on industry
     if field == "Oil and Gas":
         # Flow efficiency trend
         if 'flow_efficiency' in df.columns:
             st.subheader("Flow Efficiency Trend")
-            fig = px.line(df, x='date', y='flow_efficiency', title='Flow Efficiency Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['flow_efficiency']), x='date', y='flow_efficiency', title='Flow Efficiency Over Time')
             fig.update_layout(yaxis_title='Flow Efficiency (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('flow_efficiency'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
         
         # Energy efficiency trend
         if 'energy_efficiency' in df.columns:
             st.subheader("Energy Efficiency Trend")
-            fig = px.line(df, x='date', y='energy_efficiency', title='Energy Efficiency Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['energy_efficiency']), x='date', y='energy_efficiency', title='Energy Efficiency Over Time')
             fig.update_layout(yaxis_title='Energy Efficiency (m³/kWh)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('energy_efficiency'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
     
     elif field == "Food and Beverage":
         # Yield rate trend
         if 'yield_rate' in df.columns:
             st.subheader("Yield Rate Trend")
-            fig = px.line(df, x='date', y='yield_rate', title='Yield Rate Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['yield_rate']), x='date', y='yield_rate', title='Yield Rate Over Time')
             fig.update_layout(yaxis_title='Yield Rate (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('yield_rate'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
         
         # Waste rate trend
         if 'waste_rate' in df.columns:
             st.subheader("Waste Rate Trend")
-            fig = px.line(df, x='date', y='waste_rate', title='Waste Rate Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['waste_rate']), x='date', y='waste_rate', title='Waste Rate Over Time')
             fig.update_layout(yaxis_title='Waste Rate (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('waste_rate'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
     
     elif field == "Pharmaceutical":
         # Yield efficiency trend
         if 'yield_efficiency' in df.columns:
             st.subheader("Yield Efficiency Trend")
-            fig = px.line(df, x='date', y='yield_efficiency', title='Yield Efficiency Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['yield_efficiency']), x='date', y='yield_efficiency', title='Yield Efficiency Over Time')
             fig.update_layout(yaxis_title='Yield Efficiency (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('yield_efficiency'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
         
         # Right first time trend
         if 'right_first_time' in df.columns:
             st.subheader("Right First Time Trend")
-            fig = px.line(df, x='date', y='right_first_time', title='Right First Time Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['right_first_time']), x='date', y='right_first_time', title='Right First Time Over Time')
             fig.update_layout(yaxis_title='Right First Time (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('right_first_time'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
     
     else:  # Generic trends
         # Efficiency trend
         if 'efficiency' in df.columns:
             st.subheader("Efficiency Trend")
-            fig = px.line(df, x='date', y='efficiency', title='Efficiency Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['efficiency']), x='date', y='efficiency', title='Efficiency Over Time')
             fig.update_layout(yaxis_title='Efficiency (%)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('efficiency'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
         
         # Productivity trend
         if 'productivity' in df.columns:
             st.subheader("Productivity Trend")
-            fig = px.line(df, x='date', y='productivity', title='Productivity Over Time')
+            fig = px.line(downsampling.downsample_frame(df, 'date', ['productivity']), x='date', y='productivity', title='Productivity Over Time')
             fig.update_layout(yaxis_title='Productivity (units/h)')
-            st.plotly_chart(fig, use_container_width=True)
+            forecasting.add_forecast_band(fig, forecasts, LEGACY_TREND_KPIS.get('productivity'), selected_process)
+            profiling.plotly_chart(fig, use_container_width=True)
 
 def show_recommendations(kpi_data, user_data):
     st.subheader("Recommendations")
@@ -2,11 +2,16 @@ import streamlit as st
 import psycopg2
 import psycopg2.extras
 import json
+import itertools
+import pandas as pd
 from datetime import datetime
 import os
+import time
 import uuid
 import hashlib
 from dotenv import load_dotenv
+import anomaly_detection
+import profiling
 
 
 # Initialize connection to the PostgreSQL database
@@ -38,6 +43,7 @@ def get_connection():
 
 # Execute a SELECT query and return the results
 def execute_query(query, params=None):
+    start = time.perf_counter()
     conn = get_connection()  # Get a fresh connection for each query
     if conn is None:
         return None
@@ -47,6 +53,7 @@ def execute_query(query, params=None):
         cursor.execute(query, params or ())
         results = cursor.fetchall()
         cursor.close()
+        profiling.record_query(time.perf_counter() - start, len(results))
         return [dict(row) for row in results]
     except Exception as e:
         st.error(f"Error executing query: {e}")
@@ -57,6 +64,7 @@ def execute_query(query, params=None):
 
 # Execute an INSERT, UPDATE, or DELETE query
 def execute_update(query, params=None):
+    start = time.perf_counter()
     conn = get_connection()  # Get a fresh connection for each update
     if conn is None:
         return False
@@ -67,6 +75,7 @@ def execute_update(query, params=None):
         conn.commit()
         affected_rows = cursor.rowcount
         cursor.close()
+        profiling.record_query(time.perf_counter() - start, 0)
         return affected_rows > 0
     except Exception as e:
         st.error(f"Error executing update: {e}")
@@ -75,6 +84,64 @@ def execute_update(query, params=None):
         if conn:
             conn.close()
 
+# Execute several statements in a single transaction
+# A statement whose params is a list of tuples is sent as one batched VALUES insert
+# A callable entry gets the cursor and returns the statements to run in its place,
+# so writes can depend on rows read (and locked) earlier in the same transaction
+def execute_transaction(statements):
+    start = time.perf_counter()
+    conn = get_connection()
+    if conn is None:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        pending = list(statements)
+        while pending:
+            statement = pending.pop(0)
+            if callable(statement):
+                pending[:0] = statement(cursor)
+                continue
+            query, params = statement
+            if isinstance(params, list):
+                if params:
+                    psycopg2.extras.execute_values(cursor, query, params, page_size=1000)
+            else:
+                cursor.execute(query, params or ())
+        conn.commit()
+        cursor.close()
+        profiling.record_query(time.perf_counter() - start, 0)
+        return True
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Error executing transaction: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+# Statement bumping a user's data version; run it in the same transaction as every KPI write
+def bump_data_version(username):
+    query = """
+    INSERT INTO user_data_versions (username, version, updated_at)
+    VALUES (%s, 1, %s)
+    ON CONFLICT (username) DO UPDATE SET
+        version = user_data_versions.version + 1, updated_at = EXCLUDED.updated_at
+    """
+    return (query, (username, datetime.now()))
+
+# Function to get a user's current data version
+def get_user_data_version(username):
+    query = """
+    SELECT version FROM user_data_versions
+    WHERE username = %s
+    """
+    results = execute_query(query, (username,))
+    
+    if results and len(results) > 0:
+        return results[0]["version"]
+    return 0
+
 # Function to check user credentials
 def check_user_credentials(username, hashed_password):
     query = """
@@ -164,7 +231,7 @@ def save_kpi_data(kpi_data):
     """
     params = (username, field, date, process_name, data_json)
     
-    return execute_update(query, params)
+    return execute_transaction([(query, params), bump_data_version(username)])
 
 # Function to get KPI data for a user
 def get_user_kpi_data(username):
@@ -336,7 +403,7 @@ def save_user_kpi_preferences(username, preferences):
         """
         params = (username, preferences_json, datetime.now(), datetime.now())
     
-    return execute_update(query, params)
+    return execute_transaction([(query, params), bump_data_version(username)])
 
 # Function to get user KPI preferences
 def get_user_kpi_preferences(username):
@@ -372,13 +439,91 @@ def save_extended_kpi_data(kpi_entry):
     # Serialize the KPI data as JSON
     kpi_data_json = json.dumps(kpi_data)
     
+    # Score the new values against the anomaly sketches of their series
+    # The sketch rows are locked in the write transaction so concurrent writers to a series queue up
+    metrics = sorted(anomaly_detection.get_numeric_metrics(kpi_data))
+    
+    # Function to build the sketch and anomaly writes from the locked sketch rows
+    def score_statements(cursor):
+        series_states = lock_anomaly_states(cursor, username, process_name, kpi_type, metrics)
+        anomalies, updated_states = anomaly_detection.score_entry(kpi_type, kpi_data, series_states)
+        return [
+            ("""
+            UPDATE kpi_anomaly_state AS s SET
+                median = v.median::double precision, mad = v.mad::double precision, count = v.count::integer,
+                warmup = v.warmup::jsonb, updated_at = v.updated_at::timestamp
+            FROM (VALUES %s) AS v(username, process_name, kpi_type, metric, median, mad, count, warmup, updated_at)
+            WHERE s.username = v.username AND s.process_name = v.process_name
+              AND s.kpi_type = v.kpi_type AND s.metric = v.metric
+            """, [
+                (username, process_name, kpi_type, metric, state["median"], state["mad"], state["count"],
+                 json.dumps(state["warmup"]), datetime.now())
+                for metric, state in updated_states.items()
+            ]),
+            # Flagged rows reference the KPI row inserted in this transaction
+            ("""
+            INSERT INTO kpi_anomalies (kpi_entry_id, username, process_name, kpi_type, metric, date, value, score, reason, detected_at)
+            SELECT currval(pg_get_serial_sequence('extended_kpi_data', 'id')), v.username, v.process_name,
+                   v.kpi_type, v.metric, v.date::date, v.value::double precision, v.score::double precision,
+                   v.reason, v.detected_at::timestamp
+            FROM (VALUES %s) AS v(username, process_name, kpi_type, metric, date, value, score, reason, detected_at)
+            """, [
+                (username, process_name, kpi_type, a["metric"], date, a["value"], a["score"], a["reason"], datetime.now())
+                for a in anomalies
+            ])
+        ]
+    
+    statements = [
+        ("""
+        INSERT INTO extended_kpi_data (username, field, date, process_name, kpi_type, kpi_data)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """, (username, field, date, process_name, kpi_type, kpi_data_json)),
+        bump_data_version(username),
+        # Create empty sketches for new metrics so there is always a row to lock
+        ("""
+        INSERT INTO kpi_anomaly_state (username, process_name, kpi_type, metric)
+        VALUES %s
+        ON CONFLICT (username, process_name, kpi_type, metric) DO NOTHING
+        """, [(username, process_name, kpi_type, metric) for metric in metrics]),
+        score_statements
+    ]
+    
+    return execute_transaction(statements)
+
+# Function to read and lock the anomaly sketches of a series inside a write transaction
+def lock_anomaly_states(cursor, username, process_name, kpi_type, metrics):
+    if not metrics:
+        return {}
+    
     query = """
-    INSERT INTO extended_kpi_data (username, field, date, process_name, kpi_type, kpi_data)
-    VALUES (%s, %s, %s, %s, %s, %s)
+    SELECT metric, median, mad, count, warmup
+    FROM kpi_anomaly_state
+    WHERE username = %s AND process_name = %s AND kpi_type = %s AND metric = ANY(%s)
+    ORDER BY metric
+    FOR UPDATE
     """
-    params = (username, field, date, process_name, kpi_type, kpi_data_json)
+    cursor.execute(query, (username, process_name, kpi_type, list(metrics)))
     
-    return execute_update(query, params)
+    states = {}
+    for metric, median, mad, count, warmup in cursor.fetchall():
+        if isinstance(warmup, str):
+            warmup = json.loads(warmup)
+        states[metric] = {"median": median, "mad": mad, "count": count, "warmup": warmup or []}
+    
+    return states
+
+# Function to get the anomalies flagged for a user
+def get_user_kpi_anomalies(username, limit=100):
+    query = """
+    SELECT date, process_name, kpi_type, metric, value, score, reason, detected_at
+    FROM kpi_anomalies
+    WHERE username = %s
+    ORDER BY detected_at DESC
+    LIMIT %s
+    """
+    params = (username, limit)
+    
+    return execute_query(query, params) or []
 
 # Function to get extended KPI data for a user
 def get_user_extended_kpi_data(username):
@@ -422,6 +567,107 @@ def get_user_extended_kpi_data(username):
     
     return processed_results
 
+# Function to get a user's extended KPI data as one DataFrame per KPI type in a single query
+def get_user_extended_kpi_frames(username):
+    query = """
+    SELECT date, process_name, kpi_type, kpi_data
+    FROM extended_kpi_data
+    WHERE username = %s
+    ORDER BY kpi_type, date, id
+    """
+    params = (username,)
+    results = execute_query(query, params)
+    
+    if not results:
+        return {}
+    
+    frames = {}
+    for kpi_type, rows in itertools.groupby(results, key=lambda row: row["kpi_type"]):
+        rows = [row for row in rows if isinstance(row["kpi_data"], (str, dict))]
+        if not rows:
+            continue
+        
+        # Unpack all KPI fields of the group at once
+        values = pd.DataFrame([
+            json.loads(row["kpi_data"]) if isinstance(row["kpi_data"], str) else row["kpi_data"]
+            for row in rows
+        ])
+        frame = pd.DataFrame({
+            "Date": [row["date"] for row in rows],
+            "Processus": [row["process_name"] for row in rows]
+        })
+        frames[kpi_type] = pd.concat([frame, values.drop(columns=["Date", "Processus"], errors="ignore")], axis=1)
+    
+    return frames
+
+# Function to get the numeric fields of a user's extended KPI entries in long form
+# Fields are namespaced by KPI type (e.g. oee.availability) and averaged per date and process,
+# so that the rows pivot directly into one wide row per (date, process_name)
+def get_user_feature_values(username):
+    query = """
+    SELECT k.date, k.process_name, k.kpi_type || '.' || m.key AS feature,
+           AVG((m.value #>> '{}')::double precision) AS value
+    FROM extended_kpi_data k, jsonb_each(k.kpi_data) m
+    WHERE k.username = %s AND jsonb_typeof(m.value) = 'number'
+    GROUP BY k.date, k.process_name, feature
+    """
+    params = (username,)
+    return execute_query(query, params) or []
+
+# Function to get the feature values of the (date, process) rows touched by entries newer than an entry id
+# Each value comes before (old_value, entries up to the id only) and after (new_value) the new entries;
+# with an id of 0 every row of the user is returned as new
+def get_feature_value_changes(username, after_entry_id):
+    query = """
+    WITH changed AS (
+        SELECT DISTINCT date, process_name
+        FROM extended_kpi_data
+        WHERE username = %s AND id > %s
+    )
+    SELECT k.date, k.process_name, k.kpi_type || '.' || m.key AS feature,
+           AVG((m.value #>> '{}')::double precision) FILTER (WHERE k.id <= %s) AS old_value,
+           AVG((m.value #>> '{}')::double precision) AS new_value,
+           MAX(k.id) AS last_entry_id
+    FROM extended_kpi_data k
+    JOIN changed c ON c.date = k.date AND c.process_name = k.process_name
+    CROSS JOIN LATERAL jsonb_each(k.kpi_data) m
+    WHERE k.username = %s AND jsonb_typeof(m.value) = 'number'
+    GROUP BY k.date, k.process_name, feature
+    """
+    params = (username, after_entry_id, after_entry_id, username)
+    return execute_query(query, params) or []
+
+# Function to get the latest entry of every KPI type and process in a single query
+def get_latest_kpi_snapshot(username):
+    query = """
+    SELECT DISTINCT ON (kpi_type, process_name) kpi_type, process_name, date, kpi_data
+    FROM extended_kpi_data
+    WHERE username = %s
+    ORDER BY kpi_type, process_name, date DESC, id DESC
+    """
+    params = (username,)
+    results = execute_query(query, params)
+    
+    if not results:
+        return []
+    
+    snapshot = []
+    for row in results:
+        if isinstance(row["kpi_data"], str):
+            kpi_data = json.loads(row["kpi_data"])
+        elif isinstance(row["kpi_data"], dict):
+            kpi_data = row["kpi_data"]
+        else:
+            continue
+        
+        snapshot.append({
+            "kpi_type": row["kpi_type"],
+            "process_name": row["process_name"],
+            "date": row["date"],
+            "kpi_data": kpi_data
+        })
+    
+    return snapshot
 
 def get_user_kpi_data_by_type(username, kpi_type):
     query = """
@@ -486,4 +732,434 @@ def get_system_logs(start_date=None, end_date=None):
         query = query_base + " ORDER BY timestamp DESC"
         params = None
     
-    return execute_query(query, params)
\ No newline at end of file
+    return execute_query(query, params)
+
+# Function to fetch one page of a table with keyset pagination
+# Rows are ordered by (sort column, id); after is the (sort value, id) of the last row of the previous page
+# One extra row is fetched to know whether a next page exists
+def get_keyset_page(query_base, conditions, params, sort_expr, descending=True, after=None, page_size=50):
+    conditions = list(conditions)
+    params = list(params)
+    comparison = "<" if descending else ">"
+    order = "DESC" if descending else "ASC"
+    
+    if after is not None:
+        conditions.append(f"({sort_expr}, id) {comparison} (%s, %s)")
+        params.extend(after)
+    
+    query = query_base
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {sort_expr} {order}, id {order} LIMIT %s"
+    params.append(page_size + 1)
+    
+    rows = execute_query(query, tuple(params)) or []
+    return rows[:page_size], len(rows) > page_size
+
+# Function to get one page of a user's extended KPI entries of one type
+def get_extended_kpi_page(username, kpi_type, process_name=None, sort_column="date",
+                          descending=True, after=None, page_size=50):
+    sort_columns = {"date": "date", "process_name": "process_name", "created_at": "created_at"}
+    if sort_column not in sort_columns:
+        raise ValueError(f"Unsupported sort column: {sort_column}")
+    
+    conditions = ["username = %s", "kpi_type = %s"]
+    params = [username, kpi_type]
+    if process_name:
+        conditions.append("process_name = %s")
+        params.append(process_name)
+    
+    query_base = """
+    SELECT id, date, process_name, created_at, kpi_data
+    FROM extended_kpi_data
+    """
+    rows, has_next = get_keyset_page(
+        query_base, conditions, params, sort_columns[sort_column], descending, after, page_size
+    )
+    
+    for row in rows:
+        if isinstance(row["kpi_data"], str):
+            row["kpi_data"] = json.loads(row["kpi_data"])
+    
+    return rows, has_next
+
+# Function to get one page of system logs
+def get_system_log_page(start_date=None, end_date=None, username=None, activity_type=None,
+                        sort_column="timestamp", descending=True, after=None, page_size=50):
+    sort_columns = {"timestamp": "timestamp", "username": "username", "activity_type": "activity_type"}
+    if sort_column not in sort_columns:
+        raise ValueError(f"Unsupported sort column: {sort_column}")
+    
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append("timestamp >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("timestamp <= %s")
+        params.append(end_date)
+    if username:
+        conditions.append("username = %s")
+        params.append(username)
+    if activity_type:
+        conditions.append("activity_type = %s")
+        params.append(activity_type)
+    
+    query_base = """
+    SELECT id, username, activity_type, details, timestamp
+    FROM activity_logs
+    """
+    return get_keyset_page(
+        query_base, conditions, params, sort_columns[sort_column], descending, after, page_size
+    )
+
+# Function to get the distinct activity types for log filters
+def get_activity_types():
+    query = "SELECT DISTINCT activity_type FROM activity_logs ORDER BY activity_type"
+    results = execute_query(query)
+    return [row["activity_type"] for row in results] if results else []
+
+# Function to get daily main-metric series from extended KPI data
+# series limits the result to a list of (username, process_name, kpi_type) keys
+def get_daily_kpi_series(main_metrics, username=None, series=None):
+    metric_values = ", ".join(["(%s, %s)"] * len(main_metrics))
+    query = f"""
+    SELECT e.username, e.process_name, e.kpi_type, e.date,
+           AVG((e.kpi_data ->> m.metric)::double precision) AS value
+    FROM extended_kpi_data e
+    JOIN (VALUES {metric_values}) AS m(kpi_type, metric) ON m.kpi_type = e.kpi_type
+    WHERE jsonb_typeof(e.kpi_data -> m.metric) = 'number'
+    """
+    params = [item for pair in main_metrics.items() for item in pair]
+    
+    if username:
+        query += " AND e.username = %s"
+        params.append(username)
+    
+    if series is not None:
+        if not series:
+            return []
+        query += f" AND (e.username, e.process_name, e.kpi_type) IN (VALUES {', '.join(['(%s, %s, %s)'] * len(series))})"
+        params.extend(item for key in series for item in key)
+    
+    query += " GROUP BY e.username, e.process_name, e.kpi_type, e.date ORDER BY e.date"
+    
+    return execute_query(query, tuple(params)) or []
+
+# Function to get the daily main-metric points touched by a user's entries after an entry id
+# Only the touched (process, KPI type, day) groups are read, through the (username, id) index;
+# newest_entry_id is the user's last entry, to which the forecast cursor moves
+def get_daily_kpi_changes(main_metrics, username, after_entry_id):
+    metric_values = ", ".join(["(%s, %s)"] * len(main_metrics))
+    query = f"""
+    WITH changed AS (
+        SELECT DISTINCT process_name, kpi_type, date
+        FROM extended_kpi_data
+        WHERE username = %s AND id > %s
+    )
+    SELECT e.username, e.process_name, e.kpi_type, e.date,
+           AVG((e.kpi_data ->> m.metric)::double precision) AS value,
+           (SELECT MAX(id) FROM extended_kpi_data WHERE username = %s) AS newest_entry_id
+    FROM extended_kpi_data e
+    JOIN changed c ON c.process_name = e.process_name AND c.kpi_type = e.kpi_type AND c.date = e.date
+    JOIN (VALUES {metric_values}) AS m(kpi_type, metric) ON m.kpi_type = e.kpi_type
+    WHERE e.username = %s AND jsonb_typeof(e.kpi_data -> m.metric) = 'number'
+    GROUP BY e.username, e.process_name, e.kpi_type, e.date
+    ORDER BY e.date
+    """
+    params = [username, after_entry_id, username]
+    params += [item for pair in main_metrics.items() for item in pair]
+    params.append(username)
+    
+    return execute_query(query, tuple(params)) or []
+
+# Function to get the last extended KPI entry applied to a user's forecasts (0 before the first update)
+def get_forecast_cursor(username):
+    query = """
+    SELECT last_entry_id FROM kpi_forecast_cursor
+    WHERE username = %s
+    """
+    results = execute_query(query, (username,))
+    
+    if results:
+        return results[0]["last_entry_id"]
+    return 0
+
+# Function to get the last extended KPI entry of every user
+def get_latest_entry_ids():
+    query = """
+    SELECT username, MAX(id) AS last_entry_id
+    FROM extended_kpi_data
+    GROUP BY username
+    """
+    results = execute_query(query)
+    if results is None:
+        return None
+    return {row["username"]: row["last_entry_id"] for row in results}
+
+# Function to get the queued forecast refits, oldest first
+def get_forecast_refits(username=None):
+    query = """
+    SELECT username, process_name, kpi_type, queued_at
+    FROM kpi_forecast_refits
+    """
+    params = None
+    
+    if username:
+        query += " WHERE username = %s"
+        params = (username,)
+    
+    query += " ORDER BY queued_at"
+    return execute_query(query, params)
+
+# Statement moving forecast cursors to the given entry ids; run it in the transaction saving the forecasts
+def forecast_cursor_statement(cursors):
+    query = """
+    INSERT INTO kpi_forecast_cursor (username, last_entry_id, updated_at)
+    VALUES %s
+    ON CONFLICT (username) DO UPDATE SET
+        last_entry_id = GREATEST(kpi_forecast_cursor.last_entry_id, EXCLUDED.last_entry_id),
+        updated_at = EXCLUDED.updated_at
+    """
+    return (query, [(username, last_entry_id, datetime.now()) for username, last_entry_id in cursors.items()])
+
+# Statement queuing (username, process_name, kpi_type) series for a refit from their whole history
+def queue_forecast_refits_statement(series):
+    query = """
+    INSERT INTO kpi_forecast_refits (username, process_name, kpi_type, queued_at)
+    VALUES %s
+    ON CONFLICT (username, process_name, kpi_type) DO UPDATE SET queued_at = EXCLUDED.queued_at
+    """
+    return (query, [(*key, datetime.now()) for key in series])
+
+# Statement removing refits that were served; a series queued again since it was read stays queued
+def clear_forecast_refits_statement(refits):
+    query = """
+    DELETE FROM kpi_forecast_refits r
+    USING (VALUES %s) AS k(username, process_name, kpi_type, queued_at)
+    WHERE r.username = k.username AND r.process_name = k.process_name AND r.kpi_type = k.kpi_type
+      AND r.queued_at <= k.queued_at
+    """
+    return (query, [(r["username"], r["process_name"], r["kpi_type"], r["queued_at"]) for r in refits])
+
+# Function to get the stored forecast model state of every series
+def get_forecast_states(username=None):
+    query = """
+    SELECT username, process_name, kpi_type, level, trend, alpha, beta, sigma2, n_errors, last_date
+    FROM kpi_forecast_state
+    """
+    params = None
+    
+    if username:
+        query += " WHERE username = %s"
+        params = (username,)
+    
+    return execute_query(query, params) or []
+
+# Function to save forecast model states and replace their forecasts
+# extra_statements (cursor moves, refit queue changes) commit in the same transaction
+def save_kpi_forecasts(states, forecasts, extra_statements=()):
+    state_rows = [
+        (s["username"], s["process_name"], s["kpi_type"], s["level"], s["trend"], s["alpha"],
+         s["beta"], s["sigma2"], s["n_errors"], s["last_date"], datetime.now())
+        for s in states
+    ]
+    series_keys = [(s["username"], s["process_name"], s["kpi_type"]) for s in states]
+    forecast_rows = [
+        (f["username"], f["process_name"], f["kpi_type"], f["forecast_date"], f["horizon"],
+         f["forecast"], f["lower_bound"], f["upper_bound"], datetime.now())
+        for f in forecasts
+    ]
+    
+    statements = [
+        ("""
+        INSERT INTO kpi_forecast_state
+            (username, process_name, kpi_type, level, trend, alpha, beta, sigma2, n_errors, last_date, updated_at)
+        VALUES %s
+        ON CONFLICT (username, process_name, kpi_type) DO UPDATE SET
+            level = EXCLUDED.level, trend = EXCLUDED.trend, alpha = EXCLUDED.alpha, beta = EXCLUDED.beta,
+            sigma2 = EXCLUDED.sigma2, n_errors = EXCLUDED.n_errors, last_date = EXCLUDED.last_date,
+            updated_at = EXCLUDED.updated_at
+        """, state_rows),
+        ("""
+        DELETE FROM kpi_forecasts f
+        USING (VALUES %s) AS k(username, process_name, kpi_type)
+        WHERE f.username = k.username AND f.process_name = k.process_name AND f.kpi_type = k.kpi_type
+        """, series_keys),
+        ("""
+        INSERT INTO kpi_forecasts
+            (username, process_name, kpi_type, forecast_date, horizon, forecast, lower_bound, upper_bound, created_at)
+        VALUES %s
+        """, forecast_rows)
+    ]
+    
+    return execute_transaction(statements + list(extra_statements))
+
+# Function to get every user with extended KPI data, their data version and the data version their
+# stored optimization results were computed from (None before the first batch run); None on failure
+def get_optimization_batch_users():
+    query = """
+    SELECT u.username, COALESCE(v.version, 0) AS version, b.data_version AS computed_version
+    FROM users u
+    LEFT JOIN user_data_versions v ON v.username = u.username
+    LEFT JOIN optimization_batch_versions b ON b.username = u.username
+    WHERE EXISTS (SELECT 1 FROM extended_kpi_data e WHERE e.username = u.username)
+    ORDER BY u.username
+    """
+    return execute_query(query)
+
+# Function to replace the stored optimization results of the given users
+# user_versions maps each user to the data version the results were computed from; it is recorded
+# even for users without results, so that they are not recomputed until their data changes
+def save_optimization_results(user_versions, results):
+    rows = [
+        (r["username"], r["process_name"], r["target_column"], r["goal"], json.dumps(r["input_variables"]),
+         r["model_name"], r["r2"], r["cv_r2"], r["num_rows"], r["optimal_value"],
+         json.dumps(r["optimal_settings"]), r["data_version"], datetime.now())
+        for r in results
+    ]
+    version_rows = [(username, version, datetime.now()) for username, version in user_versions.items()]
+    
+    statements = [
+        ("DELETE FROM optimization_results WHERE username = ANY(%s)", (list(user_versions),)),
+        ("""
+        INSERT INTO optimization_results
+            (username, process_name, target_column, goal, input_variables, model_name, r2, cv_r2,
+             num_rows, optimal_value, optimal_settings, data_version, updated_at)
+        VALUES %s
+        """, rows),
+        ("""
+        INSERT INTO optimization_batch_versions (username, data_version, updated_at)
+        VALUES %s
+        ON CONFLICT (username) DO UPDATE SET
+            data_version = EXCLUDED.data_version, updated_at = EXCLUDED.updated_at
+        """, version_rows)
+    ]
+    
+    return execute_transaction(statements)
+
+# Function to get the online model states of a user
+def get_online_model_states(username):
+    query = """
+    SELECT model_key, target_column, input_variables, degree, forgetting, xtx, xty, yty,
+           num_rows, reference_date, last_entry_id
+    FROM online_model_state
+    WHERE username = %s
+    """
+    params = (username,)
+    results = execute_query(query, params) or []
+    
+    for row in results:
+        for column in ("input_variables", "xtx", "xty"):
+            if isinstance(row[column], str):
+                row[column] = json.loads(row[column])
+    
+    return results
+
+# Function to insert or update online model states
+def save_online_model_states(username, states):
+    rows = [
+        (username, s["model_key"], s["target_column"], json.dumps(s["input_variables"]), s["degree"],
+         s["forgetting"], json.dumps(s["xtx"]), json.dumps(s["xty"]), s["yty"], s["num_rows"],
+         s["reference_date"], s["last_entry_id"], datetime.now())
+        for s in states
+    ]
+    
+    statements = [
+        ("""
+        INSERT INTO online_model_state
+            (username, model_key, target_column, input_variables, degree, forgetting, xtx, xty, yty,
+             num_rows, reference_date, last_entry_id, updated_at)
+        VALUES %s
+        ON CONFLICT (username, model_key) DO UPDATE SET
+            xtx = EXCLUDED.xtx, xty = EXCLUDED.xty, yty = EXCLUDED.yty, num_rows = EXCLUDED.num_rows,
+            reference_date = EXCLUDED.reference_date, last_entry_id = EXCLUDED.last_entry_id,
+            updated_at = EXCLUDED.updated_at
+        """, rows)
+    ]
+    
+    return execute_transaction(statements)
+
+# Function to mark an online model state as used and remove the user's least recently used states over keep
+def mark_online_model_state_used(username, model_key, keep):
+    statements = [
+        ("""
+        UPDATE online_model_state SET used_at = %s
+        WHERE username = %s AND model_key = %s
+        """, (datetime.now(), username, model_key)),
+        ("""
+        DELETE FROM online_model_state
+        WHERE username = %s AND model_key NOT IN (
+            SELECT model_key FROM online_model_state
+            WHERE username = %s
+            ORDER BY used_at DESC
+            LIMIT %s
+        )
+        """, (username, username, keep))
+    ]
+    
+    return execute_transaction(statements)
+
+# Function to get stored forecasts for a user
+def get_user_kpi_forecasts(username):
+    query = """
+    SELECT process_name, kpi_type, forecast_date, horizon, forecast, lower_bound, upper_bound
+    FROM kpi_forecasts
+    WHERE username = %s
+    ORDER BY process_name, kpi_type, forecast_date
+    """
+    params = (username,)
+    
+    return execute_query(query, params) or []
+
+# Function to aggregate the numeric JSONB metrics of KPI data per group in SQL
+# Returns one row per (group, metric) with mean, std, count, min and max
+def get_kpi_metric_aggregates(group_by=None, username=None, source="kpi_data",
+                              sort_metric=None, ascending=False, top_n=None):
+    group_columns = {"process_name": "k.process_name", "field": "k.field", "username": "k.username"}
+    if group_by is not None and group_by not in group_columns:
+        raise ValueError(f"Unsupported group column: {group_by}")
+    group_expr = group_columns.get(group_by, "'all'")
+    
+    # Extended entries are namespaced by KPI type, e.g. oee.availability
+    if source == "extended_kpi_data":
+        table, data_column, metric_expr = "extended_kpi_data", "kpi_data", "k.kpi_type || '.' || m.key"
+    else:
+        table, data_column, metric_expr = "kpi_data", "data", "m.key"
+    
+    params = []
+    user_filter = ""
+    if username:
+        user_filter = "AND k.username = %s"
+        params.append(username)
+    
+    query = f"""
+    WITH metrics AS (
+        SELECT {group_expr} AS group_key, {metric_expr} AS metric, (m.value #>> '{{}}')::double precision AS value
+        FROM {table} k, jsonb_each(k.{data_column}) m
+        WHERE jsonb_typeof(m.value) = 'number' {user_filter}
+    ), stats AS (
+        SELECT group_key, metric, AVG(value) AS mean, STDDEV_SAMP(value) AS std,
+               COUNT(*) AS count, MIN(value) AS min, MAX(value) AS max
+        FROM metrics
+        GROUP BY group_key, metric
+    )
+    """
+    
+    # Rank groups on one metric so that only the top N are returned
+    if sort_metric and top_n:
+        order = "ASC" if ascending else "DESC"
+        query += f"""
+    , ranked AS (
+        SELECT group_key FROM stats
+        WHERE metric = %s
+        ORDER BY mean {order} NULLS LAST
+        LIMIT %s
+    )
+    SELECT s.* FROM stats s JOIN ranked r ON r.group_key = s.group_key
+    """
+        params.extend([sort_metric, top_n])
+    else:
+        query += " SELECT * FROM stats"
+    
+    return execute_query(query, tuple(params)) or []
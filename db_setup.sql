@@ -76,6 +76,147 @@ CREATE TABLE IF NOT EXISTS extended_kpi_data (
     FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
 );
 
+-- Create forecast model state table (one row per process and KPI type series)
+CREATE TABLE IF NOT EXISTS kpi_forecast_state (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    kpi_type VARCHAR(50) NOT NULL,
+    level DOUBLE PRECISION NOT NULL,
+    trend DOUBLE PRECISION NOT NULL,
+    alpha DOUBLE PRECISION NOT NULL,
+    beta DOUBLE PRECISION NOT NULL,
+    sigma2 DOUBLE PRECISION NOT NULL,
+    n_errors INTEGER NOT NULL,
+    last_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (username, process_name, kpi_type),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create forecast update cursor table (last extended KPI entry applied to each user's forecasts)
+CREATE TABLE IF NOT EXISTS kpi_forecast_cursor (
+    username VARCHAR(50) PRIMARY KEY,
+    last_entry_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create forecast refit queue table (series that need a fit from their whole history)
+CREATE TABLE IF NOT EXISTS kpi_forecast_refits (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    kpi_type VARCHAR(50) NOT NULL,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (username, process_name, kpi_type),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create KPI forecasts table with 95% prediction intervals
+CREATE TABLE IF NOT EXISTS kpi_forecasts (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    kpi_type VARCHAR(50) NOT NULL,
+    forecast_date DATE NOT NULL,
+    horizon INTEGER NOT NULL,
+    forecast DOUBLE PRECISION NOT NULL,
+    lower_bound DOUBLE PRECISION NOT NULL,
+    upper_bound DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create anomaly detection state table (streaming median/MAD sketch per series metric)
+CREATE TABLE IF NOT EXISTS kpi_anomaly_state (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    kpi_type VARCHAR(50) NOT NULL,
+    metric VARCHAR(100) NOT NULL,
+    median DOUBLE PRECISION,
+    mad DOUBLE PRECISION,
+    count INTEGER NOT NULL DEFAULT 0,
+    warmup JSONB NOT NULL DEFAULT '[]',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (username, process_name, kpi_type, metric),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create table of KPI entries flagged as anomalous
+CREATE TABLE IF NOT EXISTS kpi_anomalies (
+    id SERIAL PRIMARY KEY,
+    kpi_entry_id INTEGER REFERENCES extended_kpi_data(id) ON DELETE CASCADE,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    kpi_type VARCHAR(50) NOT NULL,
+    metric VARCHAR(100) NOT NULL,
+    date DATE NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+    reason VARCHAR(20) NOT NULL,
+    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create per-user data version table, bumped by every KPI write to invalidate cached frames
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    username VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create batch optimization results table (latest optimal settings per process and target)
+CREATE TABLE IF NOT EXISTS optimization_results (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    process_name VARCHAR(100) NOT NULL,
+    target_column VARCHAR(150) NOT NULL,
+    goal VARCHAR(20) NOT NULL,
+    input_variables JSONB NOT NULL,
+    model_name VARCHAR(50) NOT NULL,
+    r2 DOUBLE PRECISION NOT NULL,
+    cv_r2 DOUBLE PRECISION NOT NULL,
+    num_rows INTEGER NOT NULL,
+    optimal_value DOUBLE PRECISION NOT NULL,
+    optimal_settings JSONB NOT NULL,
+    data_version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (username, process_name, target_column),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create optimization batch version table (data version each user's batch results were computed from)
+CREATE TABLE IF NOT EXISTS optimization_batch_versions (
+    username VARCHAR(50) PRIMARY KEY,
+    data_version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
+-- Create online model state table (weighted sufficient statistics of linear and polynomial models)
+CREATE TABLE IF NOT EXISTS online_model_state (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    model_key VARCHAR(64) NOT NULL,
+    target_column VARCHAR(150) NOT NULL,
+    input_variables JSONB NOT NULL,
+    degree INTEGER NOT NULL,
+    forgetting DOUBLE PRECISION NOT NULL,
+    xtx JSONB NOT NULL,
+    xty JSONB NOT NULL,
+    yty DOUBLE PRECISION NOT NULL,
+    num_rows INTEGER NOT NULL,
+    reference_date DATE,
+    last_entry_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (username, model_key),
+    FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_kpi_data_username ON kpi_data(username);
@@ -86,3 +227,9 @@ CREATE INDEX IF NOT EXISTS idx_activity_logs_timestamp ON activity_logs(timestam
 CREATE INDEX IF NOT EXISTS idx_user_kpi_preferences_username ON user_kpi_preferences(username);
 CREATE INDEX IF NOT EXISTS idx_extended_kpi_data_username ON extended_kpi_data(username);
 CREATE INDEX IF NOT EXISTS idx_extended_kpi_data_type ON extended_kpi_data(kpi_type);
+CREATE INDEX IF NOT EXISTS idx_kpi_forecasts_series ON kpi_forecasts(username, process_name, kpi_type);
+CREATE INDEX IF NOT EXISTS idx_kpi_anomalies_username ON kpi_anomalies(username, detected_at);
+CREATE INDEX IF NOT EXISTS idx_extended_kpi_data_latest ON extended_kpi_data(username, kpi_type, process_name, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_extended_kpi_data_page ON extended_kpi_data(username, kpi_type, date, id);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_page ON activity_logs(timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_extended_kpi_data_user_id ON extended_kpi_data(username, id);
@@ -0,0 +1,110 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+# Assumed plot width of a full-width chart; Streamlit does not report the client width to the server,
+# so the budget is a fixed CHART_WIDTH_PX * POINTS_PER_PIXEL unless a caller passes a narrower width
+CHART_WIDTH_PX = 1200
+
+# Points sent per horizontal pixel; more than 2 is not visible on a line chart
+POINTS_PER_PIXEL = 2
+
+# Minimum points kept per line, so charts with many processes or columns stay readable
+MIN_POINTS_PER_SERIES = 200
+
+# Function to get the maximum number of points to send for a chart (full width unless width_px is given)
+def chart_point_budget(width_px=None):
+    return int((width_px or CHART_WIDTH_PX) * POINTS_PER_PIXEL)
+
+# Function to select points with Largest-Triangle-Three-Buckets
+# x must be sorted; returns the positions of the n_out selected points
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next bucket average
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+# Function to select the min and max point of every bucket (envelope preserving spikes)
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    num_buckets = (n_out - 2) // 2
+    edges = np.linspace(0, n, num_buckets + 1).astype(int)
+    buckets = np.repeat(np.arange(num_buckets), np.diff(edges))
+
+    # Sorting by (bucket, y) puts each bucket's min and max at its edges
+    order = np.lexsort((y, buckets))
+    selected = np.concatenate([[0, n - 1], order[edges[:-1]], order[edges[1:] - 1]])
+
+    return np.unique(selected)
+
+# Function to downsample a frame before plotting, per line series
+# Each (group, column) series gets an equal share of max_points, but never fewer than MIN_POINTS_PER_SERIES
+def downsample_frame(df, x, y_columns, max_points=None, method="lttb", group=None):
+    max_points = max_points or chart_point_budget()
+    y_columns = [col for col in y_columns if col in df.columns]
+    if len(df) <= max_points or not y_columns:
+        return df
+
+    df = df.reset_index(drop=True)
+    groups = [df] if group is None else [frame for _, frame in df.groupby(group, sort=False)]
+    points_per_series = max(max_points // (len(groups) * len(y_columns)), MIN_POINTS_PER_SERIES)
+
+    keep = []
+    for frame in groups:
+        frame = frame.sort_values(x, kind='stable')
+        if pd.api.types.is_datetime64_any_dtype(frame[x]):
+            x_values = frame[x].astype('int64').to_numpy(dtype=float)
+        else:
+            x_values = frame[x].to_numpy(dtype=float)
+
+        for col in y_columns:
+            y_values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(y_values))
+
+            if method == "minmax":
+                selected = minmax_indices(y_values[valid], points_per_series)
+            else:
+                selected = lttb_indices(x_values[valid], y_values[valid], points_per_series)
+            keep.append(frame.index.to_numpy()[valid[selected]])
+
+    rows = np.unique(np.concatenate(keep)) if keep else np.array([], dtype=int)
+    return df.loc[rows].sort_values(x, kind='stable')
+
+# Function to let the user zoom on a date range; narrow ranges are plotted at full resolution
+def select_range(df, x, key, label="Date Range"):
+    dates = pd.to_datetime(df[x])
+    start, end = dates.min(), dates.max()
+    if pd.isna(start) or start == end:
+        return df
+
+    selected = st.slider(
+        label,
+        min_value=start.to_pydatetime(),
+        max_value=end.to_pydatetime(),
+        value=(start.to_pydatetime(), end.to_pydatetime()),
+        format="YYYY-MM-DD",
+        key=key
+    )
+
+    return df[(dates >= pd.Timestamp(selected[0])) & (dates <= pd.Timestamp(selected[1]))]
@@ -0,0 +1,337 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from concurrent.futures import ProcessPoolExecutor
+import database
+import utils
+
+# Holt smoothing parameters evaluated for every series in one batch
+ALPHA_GRID = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+BETA_GRID = np.array([0.01, 0.05, 0.1, 0.3])
+
+# Number of days forecast after the last observation of each series
+FORECAST_HORIZON = 30
+
+# z-score of the 95% prediction interval
+INTERVAL_Z = 1.96
+
+# Series need this many one-step errors before they get a forecast
+MIN_ERRORS = 3
+
+SERIES_KEYS = ["username", "process_name", "kpi_type"]
+
+# Stored Holt state of a series
+STATE_COLUMNS = ['level', 'trend', 'alpha', 'beta', 'sigma2', 'n_errors', 'last_date']
+
+# Function to pivot daily points into a (series x day) matrix with NaN for missing days
+def build_series_matrix(points, start=None):
+    points = points.copy()
+    points['date'] = pd.to_datetime(points['date'])
+
+    if start is None:
+        start = points['date'].min()
+    num_days = (points['date'].max() - start).days + 1
+
+    # Series are numbered in order of first appearance, like drop_duplicates
+    codes = points.groupby(SERIES_KEYS, sort=False).ngroup().to_numpy()
+    keys = points[SERIES_KEYS].drop_duplicates().reset_index(drop=True)
+
+    Y = np.full((len(keys), num_days), np.nan)
+    Y[codes, (points['date'] - start).dt.days.to_numpy()] = points['value'].to_numpy(dtype=float)
+
+    return keys, Y, start
+
+# Function to run the Holt linear-trend recursion over all series at once
+# Y is (series x days); alpha, beta, level and trend are (series x parameter sets)
+def _holt_recursion(Y, alpha, beta, level, trend, start_idx, n_obs):
+    num_series, num_days = Y.shape
+    observed = ~np.isnan(Y)
+    has_data = observed.any(axis=1)
+    last_idx = np.where(has_data, num_days - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+
+    initialised = n_obs > 0
+    first_idx = np.full(num_series, -1)
+    sse = np.zeros_like(level)
+    n_errors = np.zeros(num_series)
+
+    for t in range(num_days):
+        active = (t > start_idx) & (t <= last_idx)
+        obs = observed[:, t] & active
+        y = Y[:, t]
+
+        # The first observation of a new series initialises its level
+        first = obs & ~initialised
+        level[first] = y[first][:, None]
+        trend[first] = 0.0
+        first_idx[first] = t
+
+        # The second observation initialises the daily trend
+        second = obs & initialised & (n_obs == 1)
+        if second.any():
+            days = (t - first_idx[second])[:, None]
+            trend[second] = (y[second][:, None] - level[second]) / np.maximum(days, 1)
+            level[second] = y[second][:, None]
+
+        # Error-correction form: l = l + b + alpha*e, b = b + alpha*beta*e
+        update = obs & initialised & (n_obs > 1)
+        if update.any():
+            forecast = level[update] + trend[update]
+            error = y[update][:, None] - forecast
+            sse[update] += error ** 2
+            n_errors[update] += 1
+            level[update] = forecast + alpha[update] * error
+            trend[update] = trend[update] + alpha[update] * beta[update] * error
+
+        # Days without data carry the trend forward
+        gap = active & ~observed[:, t] & initialised
+        level[gap] += trend[gap]
+
+        initialised = initialised | first
+        n_obs = n_obs + obs
+
+    return level, trend, sse, n_errors, last_idx
+
+# Function to fit Holt models to new series, selecting smoothing parameters per series
+def fit_series_batch(points):
+    keys, Y, start = build_series_matrix(points)
+    num_series = len(keys)
+
+    alpha_grid, beta_grid = [g.ravel() for g in np.meshgrid(ALPHA_GRID, BETA_GRID, indexing="ij")]
+    num_params = alpha_grid.size
+    alpha = np.broadcast_to(alpha_grid, (num_series, num_params))
+    beta = np.broadcast_to(beta_grid, (num_series, num_params))
+    level = np.full((num_series, num_params), np.nan)
+    trend = np.zeros((num_series, num_params))
+
+    level, trend, sse, n_errors, last_idx = _holt_recursion(
+        Y, alpha, beta, level, trend, np.full(num_series, -1), np.zeros(num_series, dtype=int)
+    )
+
+    # Keep the parameter set with the lowest one-step mean squared error
+    mse = sse / np.maximum(n_errors, 1)[:, None]
+    best = np.argmin(mse, axis=1)
+    rows = np.arange(num_series)
+
+    states = keys.copy()
+    states['level'] = level[rows, best]
+    states['trend'] = trend[rows, best]
+    states['alpha'] = alpha_grid[best]
+    states['beta'] = beta_grid[best]
+    states['sigma2'] = mse[rows, best]
+    states['n_errors'] = n_errors.astype(int)
+    states['last_date'] = start + pd.to_timedelta(last_idx, unit='D')
+
+    return states[states['n_errors'] >= MIN_ERRORS].reset_index(drop=True)
+
+# Function to advance stored Holt states with the points received since their last date
+def update_series_batch(points, states):
+    states = states.copy()
+    states['last_date'] = pd.to_datetime(states['last_date'])
+
+    # Start the day axis right after the oldest state so that gaps are carried forward
+    start = min(states['last_date'].min() + pd.Timedelta(days=1), pd.to_datetime(points['date']).min())
+    keys, Y, start = build_series_matrix(points, start=start)
+    states = keys.merge(states, on=SERIES_KEYS, how='left')
+    num_series = len(states)
+
+    alpha = states['alpha'].to_numpy()[:, None]
+    beta = states['beta'].to_numpy()[:, None]
+    level = states['level'].to_numpy(dtype=float)[:, None].copy()
+    trend = states['trend'].to_numpy(dtype=float)[:, None].copy()
+    start_idx = (states['last_date'] - start).dt.days.to_numpy()
+
+    level, trend, sse, n_errors, last_idx = _holt_recursion(
+        Y, alpha, beta, level, trend, start_idx, np.full(num_series, 2)
+    )
+
+    # Running mean of squared one-step errors
+    previous_errors = states['n_errors'].to_numpy()
+    states['sigma2'] = (states['sigma2'].to_numpy() * previous_errors + sse[:, 0]) / np.maximum(previous_errors + n_errors, 1)
+    states['n_errors'] = (previous_errors + n_errors).astype(int)
+    states['level'] = level[:, 0]
+    states['trend'] = trend[:, 0]
+    new_last_date = pd.Series(start + pd.to_timedelta(last_idx, unit='D'), index=states.index)
+    states['last_date'] = states['last_date'].where(last_idx <= start_idx, new_last_date)
+
+    return states
+
+# Function to compute forecasts and prediction intervals for all states at once
+def forecast_states(states, horizon=FORECAST_HORIZON):
+    steps = np.arange(1, horizon + 1)
+    level = states['level'].to_numpy()[:, None]
+    trend = states['trend'].to_numpy()[:, None]
+    alpha = states['alpha'].to_numpy()[:, None]
+    beta = states['beta'].to_numpy()[:, None]
+    sigma2 = states['sigma2'].to_numpy()[:, None]
+
+    mean = level + steps * trend
+
+    # ETS(A,A,N) variance: sigma2 * (1 + sum_{j<h} (alpha * (1 + j*beta))^2)
+    weights = (alpha * (1 + beta * steps[:-1])) ** 2
+    cumulative = np.concatenate([np.zeros((len(states), 1)), np.cumsum(weights, axis=1)], axis=1)
+    spread = INTERVAL_Z * np.sqrt(sigma2 * (1 + cumulative))
+
+    forecasts = pd.DataFrame({
+        key: np.repeat(states[key].to_numpy(), horizon) for key in SERIES_KEYS
+    })
+    forecasts['horizon'] = np.tile(steps, len(states))
+    forecasts['forecast_date'] = (
+        np.repeat(pd.to_datetime(states['last_date']).to_numpy(), horizon)
+        + pd.to_timedelta(forecasts['horizon'], unit='D').to_numpy()
+    )
+    forecasts['forecast'] = mean.ravel()
+    forecasts['lower_bound'] = (mean - spread).ravel()
+    forecasts['upper_bound'] = (mean + spread).ravel()
+
+    return forecasts
+
+# Function to fit and forecast one chunk of series (runs in a worker process)
+def _fit_chunk(points):
+    states = fit_series_batch(points)
+    return states, forecast_states(states)
+
+# Function to convert fitted states and forecasts to database rows
+def _to_records(states, forecasts):
+    states = states.copy()
+    states['last_date'] = pd.to_datetime(states['last_date']).dt.date
+    forecasts = forecasts.copy()
+    forecasts['forecast_date'] = pd.to_datetime(forecasts['forecast_date']).dt.date
+
+    columns = SERIES_KEYS + STATE_COLUMNS
+    state_records = [dict(zip(columns, row)) for row in states[columns].astype(object).itertuples(index=False)]
+    forecast_records = forecasts.astype(object).to_dict('records')
+
+    return state_records, forecast_records
+
+# Function to fit whole series split into one chunk per worker of a process pool
+def _fit_in_pool(points, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    codes = points.groupby(SERIES_KEYS, sort=False).ngroup()
+    chunks = [chunk for _, chunk in points.groupby(codes % max_workers) if not chunk.empty]
+
+    if len(chunks) == 1:
+        results = [_fit_chunk(chunks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_fit_chunk, chunks))
+
+    states = pd.concat([r[0] for r in results], ignore_index=True)
+    forecasts = pd.concat([r[1] for r in results], ignore_index=True)
+    return states, forecasts
+
+# Function to refit every (user, process, KPI) series from scratch using a process pool
+# Returns the number of refitted series, or None when they could not be saved
+def refit_all_forecasts(max_workers=None):
+    # Read before the history, so entries saved meanwhile are applied again by the next update
+    latest_entry_ids = database.get_latest_entry_ids()
+    refits = database.get_forecast_refits()
+    if latest_entry_ids is None or refits is None:
+        return None
+    
+    points = pd.DataFrame(database.get_daily_kpi_series(utils.KPI_MAIN_METRICS))
+    if points.empty:
+        return 0
+
+    states, forecasts = _fit_in_pool(points, max_workers)
+
+    saved = database.save_kpi_forecasts(*_to_records(states, forecasts), extra_statements=[
+        database.forecast_cursor_statement(latest_entry_ids),
+        database.clear_forecast_refits_statement(refits)
+    ])
+    return len(states) if saved else None
+
+# Function to refit the queued series from their whole history using a process pool
+# The queue is drained from the command line (--queued) or by the full refit, never from a page request
+# Returns the number of refitted series, or None when they could not be saved
+def refit_queued_forecasts(username=None, max_workers=None):
+    refits = database.get_forecast_refits(username)
+    if not refits:
+        return None if refits is None else 0
+
+    series = [(r["username"], r["process_name"], r["kpi_type"]) for r in refits]
+    points = pd.DataFrame(database.get_daily_kpi_series(utils.KPI_MAIN_METRICS, username, series=series))
+
+    # Series still below MIN_ERRORS leave the queue; their next entry queues them again
+    states, forecasts = _fit_in_pool(points, max_workers) if not points.empty else (pd.DataFrame(), pd.DataFrame())
+    records = _to_records(states, forecasts) if not states.empty else ([], [])
+
+    saved = database.save_kpi_forecasts(*records, extra_statements=[database.clear_forecast_refits_statement(refits)])
+    return len(states) if saved else None
+
+# Function to update a user's forecasts with the entries saved since the last update
+# Days after the last date of a stored state are applied to it in time proportional to the new days;
+# series without a state, or whose already-applied days changed (same-day or backfilled entries),
+# are queued for a refit from their whole history by refit_queued_forecasts
+# Returns the number of updated series, or None when the update could not be saved
+def update_user_forecasts(username):
+    cursor = database.get_forecast_cursor(username)
+    changes = pd.DataFrame(database.get_daily_kpi_changes(utils.KPI_MAIN_METRICS, username, cursor))
+    if changes.empty:
+        return 0
+
+    newest_entry_id = int(changes['newest_entry_id'].max())
+    points = changes.drop(columns='newest_entry_id')
+    points['date'] = pd.to_datetime(points['date'])
+
+    states = pd.DataFrame(database.get_forecast_states(username), columns=SERIES_KEYS + STATE_COLUMNS)
+    states['last_date'] = pd.to_datetime(states['last_date'])
+    points = points.merge(states[SERIES_KEYS + ['last_date']], on=SERIES_KEYS, how='left')
+
+    stale = points['last_date'].isna() | (points['date'] <= points['last_date'])
+    refit_series = points.loc[stale, SERIES_KEYS].drop_duplicates()
+    appendable = points.merge(refit_series, on=SERIES_KEYS, how='left', indicator=True)['_merge'].to_numpy() == 'left_only'
+    points = points.loc[appendable, SERIES_KEYS + ['date', 'value']]
+
+    updated = pd.DataFrame()
+    if not points.empty:
+        updated = update_series_batch(points, states.merge(points[SERIES_KEYS].drop_duplicates(), on=SERIES_KEYS))
+    records = _to_records(updated, forecast_states(updated)) if not updated.empty else ([], [])
+
+    saved = database.save_kpi_forecasts(*records, extra_statements=[
+        database.queue_forecast_refits_statement(list(refit_series.itertuples(index=False, name=None))),
+        database.forecast_cursor_statement({username: newest_entry_id})
+    ])
+    return len(updated) if saved else None
+
+# Function to add a forecast line and prediction band per process to a trend chart
+# Traces are named after the process unless a label is given
+def add_forecast_band(fig, forecasts, kpi_type, process_name=None, label=None):
+    if forecasts is None or len(forecasts) == 0 or kpi_type is None:
+        return fig
+
+    series = forecasts[forecasts['kpi_type'] == kpi_type]
+    if process_name is not None:
+        series = series[series['process_name'] == process_name]
+
+    for process, group in series.groupby('process_name'):
+        group = group.sort_values('forecast_date')
+
+        fig.add_trace(go.Scatter(
+            x=group['forecast_date'], y=group['upper_bound'],
+            mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=group['forecast_date'], y=group['lower_bound'],
+            mode='lines', line=dict(width=0), fill='tonexty',
+            fillcolor='rgba(31, 119, 180, 0.2)', name=f'95% interval ({label or process})'
+        ))
+        fig.add_trace(go.Scatter(
+            x=group['forecast_date'], y=group['forecast'],
+            mode='lines', line=dict(dash='dash'), name=f'Forecast ({label or process})'
+        ))
+
+    return fig
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refit KPI forecasts for all processes")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--queued", action="store_true", help="Only refit the series queued by KPI entries")
+    args = parser.parse_args()
+
+    num_series = refit_queued_forecasts(max_workers=args.workers) if args.queued else refit_all_forecasts(args.workers)
+    if num_series is None:
+        sys.exit("Forecasts could not be saved")
+    print(f"Refitted {num_series} KPI series")
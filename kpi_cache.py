@@ -0,0 +1,113 @@
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+import database
+
+# Memory budget shared by all sessions of this server process
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# LRU cache of parsed frames keyed by (username, data version, kind)
+_cache = OrderedDict()
+_cache_sizes = {}
+_cache_lock = threading.Lock()
+
+# Function to estimate the memory used by a cached value
+def _estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'to_plotly_json'):
+        # Plotly figures: the trace arrays dominate the size
+        return sum(
+            8 * len(values) for trace in value.data for values in (trace['x'], trace['y']) if values is not None
+        )
+    if isinstance(value, dict):
+        return sum(_estimate_size(v) for v in value.values()) + sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        # e.g. the (sample frame, sample info) pairs of the optimization page
+        return sum(_estimate_size(v) for v in value) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+# Function to store a value and evict the least recently used entries over budget
+def _store(key, value):
+    size = _estimate_size(value)
+
+    with _cache_lock:
+        # Entries of older versions can never be hit again
+        username, version, kind = key
+        for stale_key in [k for k in _cache if k[0] == username and k[2] == kind and k[1] != version]:
+            _cache.pop(stale_key)
+            _cache_sizes.pop(stale_key)
+
+        _cache[key] = value
+        _cache_sizes[key] = size
+
+        while len(_cache) > 1 and sum(_cache_sizes.values()) > MAX_CACHE_BYTES:
+            evicted_key, _ = _cache.popitem(last=False)
+            _cache_sizes.pop(evicted_key)
+
+# Function to get a cached value for the user's current data version, loading it on a miss
+# Cached frames are shared between sessions and must be treated as read-only
+def get_cached(username, kind, loader):
+    key = (username, database.get_user_data_version(username), kind)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    value = loader(username)
+    _store(key, value)
+    return value
+
+# Function to get a user's extended KPI data as one typed DataFrame per KPI type
+def get_extended_kpi_frames(username):
+    def load(username):
+        frames = database.get_user_extended_kpi_frames(username)
+        for frame in frames.values():
+            frame['Date'] = pd.to_datetime(frame['Date'])
+        return frames
+
+    return get_cached(username, "extended_frames", load)
+
+# Function to get a user's extended KPI data as one flat date-sorted DataFrame
+def get_extended_kpi_frame(username):
+    def load(username):
+        frames = get_extended_kpi_frames(username)
+        if not frames:
+            return pd.DataFrame(columns=['date', 'process_name', 'kpi_type'])
+
+        df = pd.concat([
+            frame.rename(columns={'Date': 'date', 'Processus': 'process_name'}).assign(kpi_type=kpi_type)
+            for kpi_type, frame in frames.items()
+        ], ignore_index=True)
+        return df.sort_values('date', kind='stable').reset_index(drop=True)
+
+    return get_cached(username, "extended_frame", load)
+
+# Function to pivot long (date, process_name, feature, value) rows into one wide row per (date, process_name)
+def pivot_feature_values(rows, value_column='value'):
+    values = pd.DataFrame(rows, columns=['date', 'process_name', 'feature', value_column])
+    matrix = values.pivot(index=['date', 'process_name'], columns='feature', values=value_column)
+    matrix.columns.name = None
+    matrix = matrix.sort_index().reset_index()
+    matrix['date'] = pd.to_datetime(matrix['date'])
+    return matrix
+
+# Function to get a user's extended KPI data as a wide feature matrix
+# One row per (date, process_name) and one namespaced column per numeric field, e.g. oee.availability
+def get_feature_matrix(username):
+    def load(username):
+        return pivot_feature_values(database.get_user_feature_values(username))
+
+    return get_cached(username, "feature_matrix", load)
+
+# Function to get a user's legacy KPI data as a typed DataFrame
+def get_kpi_frame(username):
+    def load(username):
+        df = pd.DataFrame(database.get_user_kpi_data(username))
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    return get_cached(username, "kpi_frame", load)
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import model_selection
+import solvers
+
+# Processes need this many complete rows to get their own model
+MIN_PROCESS_ROWS = 3
+
+# Below this many rows in total the models are fitted in-process (pool startup costs more)
+PARALLEL_MIN_ROWS = 2000
+
+# Seed grid size of each process optimum; many small models do not need the full page grid
+FLEET_GRID_POINTS = 20_000
+
+# Label of the reference model fitted on all processes together
+POOLED_LABEL = "All Processes (pooled)"
+
+# Arrays and settings shared with the worker processes, set once per worker by the pool initializer
+_shared = {}
+
+def _init_worker(X, y, model_kind, goal, target_value):
+    _shared["X"] = X
+    _shared["y"] = y
+    _shared["model_kind"] = model_kind
+    _shared["goal"] = goal
+    _shared["target_value"] = target_value
+
+# Function to fit and optimize the model of one row range of the shared arrays
+# Rows are sorted by process, so each process is a contiguous slice (a view, not a copy)
+def _fit_segment(segment):
+    start, stop = segment
+    X = _shared["X"][start:stop]
+    y = _shared["y"][start:stop]
+
+    fitted = model_selection.fit_optimization_model(X, y, _shared["model_kind"], max_workers=1)
+    solution = solvers.solve_model(
+        fitted["poly"], fitted["model"], X.min(axis=0), X.max(axis=0),
+        _shared["goal"], _shared["target_value"], max_grid_points=FLEET_GRID_POINTS
+    )
+    return fitted["name"], float(fitted["r2"]), float(solution["y"]), np.asarray(solution["x"], dtype=float)
+
+# Function to fit and optimize one model per process, plus the pooled model as a reference
+# Returns one row per process with its row count, R², optimal value and optimal input settings
+def fit_fleet(df, target_column, input_variables, model_kind, goal, target_value=None, max_workers=None):
+    df = df.sort_values('process_name', kind='stable')
+    X = np.ascontiguousarray(df[input_variables].to_numpy(dtype=float))
+    y = np.ascontiguousarray(df[target_column].to_numpy(dtype=float))
+
+    counts = df.groupby('process_name', sort=True).size()
+    offsets = np.concatenate([[0], np.cumsum(counts.to_numpy())])
+    eligible = np.flatnonzero(counts.to_numpy() >= MIN_PROCESS_ROWS)
+
+    names = [counts.index[i] for i in eligible] + [POOLED_LABEL]
+    segments = [(int(offsets[i]), int(offsets[i + 1])) for i in eligible] + [(0, len(y))]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers > 1 and len(segments) > 1 and len(y) >= PARALLEL_MIN_ROWS:
+        workers = min(max_workers, len(segments))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(X, y, model_kind, goal, target_value)
+        ) as executor:
+            results = list(executor.map(_fit_segment, segments, chunksize=max(1, len(segments) // (4 * workers))))
+    else:
+        _init_worker(X, y, model_kind, goal, target_value)
+        results = [_fit_segment(segment) for segment in segments]
+        _shared.clear()
+
+    fleet = pd.DataFrame({
+        "process_name": names,
+        "rows": [stop - start for start, stop in segments],
+        "model": [name for name, _, _, _ in results],
+        "r2": [r2 for _, r2, _, _ in results],
+        "optimal_value": [value for _, _, value, _ in results]
+    })
+    settings = pd.DataFrame([x for _, _, _, x in results], columns=input_variables)
+    return pd.concat([fleet, settings], axis=1)
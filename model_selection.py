@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import PolynomialFeatures
+
+# Number of cross-validation folds shared by all candidates
+CV_FOLDS = 5
+
+# Ridge penalty of the regularized candidates
+RIDGE_ALPHA = 1.0
+
+# Below this many rows x candidates the folds are evaluated in-process (pool startup costs more)
+PARALLEL_MIN_ROWS = 5000
+
+# Candidate models: (name, polynomial degree of the features, estimator class)
+CANDIDATES = [
+    ("Linear", 1, "linear"),
+    ("Ridge", 1, "ridge"),
+    ("Polynomial (degree 2)", 2, "linear"),
+    ("Polynomial (degree 3, ridge)", 3, "ridge"),
+]
+BOOSTING_CANDIDATE = ("Gradient Boosting", 1, "boosting")
+
+# Arrays shared with the worker processes, set once per worker by the pool initializer
+_shared = {}
+
+def _init_worker(features, y, folds):
+    _shared["features"] = features
+    _shared["y"] = y
+    _shared["folds"] = folds
+
+def _make_estimator(kind):
+    if kind == "ridge":
+        return Ridge(alpha=RIDGE_ALPHA)
+    if kind == "boosting":
+        return HistGradientBoostingRegressor(random_state=0)
+    return LinearRegression()
+
+# Function to fit one candidate on one fold and return its held-out squared errors
+# The degree d features are the first columns of the precomputed degree 3 design matrix
+def _evaluate_fold(task):
+    candidate_index, fold_index, num_columns, kind = task
+    features = _shared["features"][:, :num_columns]
+    y = _shared["y"]
+    test = _shared["folds"][fold_index]
+    train = np.ones(len(y), dtype=bool)
+    train[test] = False
+
+    estimator = _make_estimator(kind)
+    estimator.fit(features[train], y[train])
+    errors = y[test] - estimator.predict(features[test])
+    return candidate_index, float(np.sum(errors ** 2))
+
+# Function to get the number of polynomial feature columns of each degree
+def _columns_per_degree(num_variables, max_degree):
+    poly = PolynomialFeatures(degree=max_degree, include_bias=False).fit(np.zeros((1, num_variables)))
+    degrees = poly.powers_.sum(axis=1)
+    return {degree: int(np.sum(degrees <= degree)) for degree in range(1, max_degree + 1)}
+
+# Function to cross-validate the candidate models and refit the best one on all rows
+# Returns the fitted model, its polynomial transform (None for degree 1) and the CV scores of every candidate
+def select_model(X, y, include_boosting=False, folds=CV_FOLDS, max_workers=None):
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    candidates = CANDIDATES + ([BOOSTING_CANDIDATE] if include_boosting else [])
+
+    # Features and folds are computed once and shared by every candidate
+    max_degree = max(degree for _, degree, _ in candidates)
+    features = PolynomialFeatures(degree=max_degree, include_bias=False).fit_transform(X)
+    num_columns = _columns_per_degree(X.shape[1], max_degree)
+    folds = min(folds, len(y))
+    fold_indices = [test for _, test in KFold(n_splits=folds, shuffle=True, random_state=0).split(X)]
+
+    tasks = [
+        (i, f, num_columns[degree], kind)
+        for i, (_, degree, kind) in enumerate(candidates)
+        for f in range(folds)
+    ]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers > 1 and len(y) * len(candidates) >= PARALLEL_MIN_ROWS:
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(tasks)),
+            initializer=_init_worker,
+            initargs=(features, y, fold_indices)
+        ) as executor:
+            results = list(executor.map(_evaluate_fold, tasks))
+    else:
+        _init_worker(features, y, fold_indices)
+        results = [_evaluate_fold(task) for task in tasks]
+        _shared.clear()
+
+    # Out-of-fold R² from the pooled held-out errors of each candidate
+    sse = np.zeros(len(candidates))
+    for candidate_index, fold_sse in results:
+        sse[candidate_index] += fold_sse
+    sst = float(np.sum((y - y.mean()) ** 2)) or 1.0
+    cv_r2 = 1 - sse / sst
+
+    scores = pd.DataFrame({
+        "Model": [name for name, _, _ in candidates],
+        "CV R²": cv_r2,
+        "CV RMSE": np.sqrt(sse / len(y))
+    }).sort_values("CV R²", ascending=False).reset_index(drop=True)
+
+    # Refit the best candidate on all rows
+    best = int(np.argmax(cv_r2))
+    name, degree, kind = candidates[best]
+    poly = PolynomialFeatures(degree=degree, include_bias=False).fit(X) if degree > 1 else None
+    model = _make_estimator(kind)
+    model.fit(features[:, :num_columns[degree]], y)
+
+    return {"name": name, "model": model, "poly": poly, "kind": kind, "cv_scores": scores}
+
+# Function to fit the regression model of an optimization method and its training metrics
+# model_kind is "linear", "polynomial" (degree 2), "auto" or "auto_boosting" (cross-validated selection)
+def fit_optimization_model(X, y, model_kind, max_workers=None):
+    if model_kind.startswith("auto"):
+        selected = select_model(X, y, include_boosting=model_kind == "auto_boosting", max_workers=max_workers)
+        poly = selected["poly"]
+        y_pred = selected["model"].predict(poly.transform(X) if poly is not None else X)
+        return {**selected, "y_pred": y_pred, "r2": r2_score(y, y_pred)}
+    
+    if model_kind == "polynomial":
+        name = "Polynomial (degree 2)"
+        poly = PolynomialFeatures(degree=2, include_bias=False)
+        model = LinearRegression()
+        model.fit(poly.fit_transform(X), y)
+        y_pred = model.predict(poly.transform(X))
+    else:
+        name = "Linear"
+        poly = None
+        model = LinearRegression()
+        model.fit(X, y)
+        y_pred = model.predict(X)
+    
+    return {"name": name, "model": model, "poly": poly, "y_pred": y_pred, "r2": r2_score(y, y_pred)}
@@ -0,0 +1,73 @@
+import os
+import pickle
+import hashlib
+import threading
+import database
+
+# Directory of the pickled fitted models
+MODEL_STORE_DIR = os.environ.get("MODEL_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_store"))
+
+# Maximum number of stored models; the least recently used files are removed first
+MAX_STORED_MODELS = 500
+
+_store_lock = threading.Lock()
+
+def _digest(value):
+    return hashlib.sha256(repr(value).encode()).hexdigest()[:16]
+
+# Function to get the file of a model; the name starts with the user and model spec so that
+# files of older data versions can be found and removed
+def _model_path(username, target_column, input_variables, method, version):
+    prefix = f"{_digest(username)}_{_digest((target_column, tuple(input_variables), method))}"
+    return os.path.join(MODEL_STORE_DIR, f"{prefix}_{version}.pkl"), prefix
+
+# Function to remove the least recently used files over the limit
+def _evict():
+    paths = [os.path.join(MODEL_STORE_DIR, name) for name in os.listdir(MODEL_STORE_DIR) if name.endswith(".pkl")]
+    if len(paths) <= MAX_STORED_MODELS:
+        return
+
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - MAX_STORED_MODELS]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Function to get a fitted model and its metrics, fitting and storing it on a miss
+# fit() returns a picklable dict; entries are keyed by the user's data version so new KPI data invalidates them
+def get_or_fit(username, target_column, input_variables, method, fit):
+    path, prefix = _model_path(
+        username, target_column, input_variables, method, database.get_user_data_version(username)
+    )
+
+    try:
+        with open(path, "rb") as f:
+            fitted = pickle.load(f)
+        os.utime(path)  # Mark as recently used
+        return fitted
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    fitted = fit()
+
+    with _store_lock:
+        os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+
+        # Models fitted on older data versions can never be hit again
+        for name in os.listdir(MODEL_STORE_DIR):
+            if name.startswith(prefix + "_") and os.path.join(MODEL_STORE_DIR, name) != path:
+                try:
+                    os.remove(os.path.join(MODEL_STORE_DIR, name))
+                except OSError:
+                    pass
+
+        # Write to a temporary file first so that readers never see a partial model
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(fitted, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+        _evict()
+
+    return fitted
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from scipy import stats
+
+# Confidence level of the slope intervals and regression bands
+CONFIDENCE_LEVEL = 0.95
+
+# Points along each regression line and band
+BAND_POINTS = 50
+
+# Rows drawn as scatter points per facet; larger datasets are sampled
+SCATTER_MAX_POINTS = 2000
+
+# From this many rows the facets show a binned density instead of a point sample
+DENSITY_MIN_ROWS = 20_000
+DENSITY_BINS = 40
+
+# Number of facet columns of the relationship figure
+FACET_COLUMNS = 3
+
+# Function to analyze the simple linear relationship of every input variable with the target
+# All correlations, slopes, intercepts and confidence bands come from one covariance matrix product
+def analyze(X, y, variable_names, target_name, confidence=CONFIDENCE_LEVEL):
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, k = X.shape
+
+    data = np.column_stack([X, y])
+    means = data.mean(axis=0)
+    centered = data - means
+    scatter = centered.T @ centered  # (k + 1) x (k + 1) sums of cross products
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sd = np.sqrt(np.diag(scatter))
+        correlation = scatter / np.outer(sd, sd)
+
+        sxx = np.diag(scatter)[:k]
+        sxy = scatter[:k, k]
+        syy = scatter[k, k]
+        x_mean, y_mean = means[:k], means[k]
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+
+        # Residual variance of each simple regression and the standard error of its slope
+        dof = max(n - 2, 1)
+        residual_variance = np.maximum(syy - slope * sxy, 0) / dof
+        slope_se = np.sqrt(residual_variance / sxx)
+        t_critical = stats.t.ppf(0.5 + confidence / 2, dof)
+        p_value = 2 * stats.t.sf(np.abs(slope / slope_se), dof)
+
+        # Confidence band of the mean prediction along the observed range of each variable
+        grid = np.linspace(X.min(axis=0), X.max(axis=0), BAND_POINTS).T  # (k x BAND_POINTS)
+        fit = intercept[:, None] + slope[:, None] * grid
+        half_width = t_critical * np.sqrt(
+            residual_variance[:, None] * (1 / n + (grid - x_mean[:, None]) ** 2 / sxx[:, None])
+        )
+
+    names = list(variable_names) + [target_name]
+    summary = pd.DataFrame({
+        "variable": list(variable_names),
+        "correlation": correlation[:k, k],
+        "r2": correlation[:k, k] ** 2,
+        "slope": slope,
+        "slope_lower": slope - t_critical * slope_se,
+        "slope_upper": slope + t_critical * slope_se,
+        "intercept": intercept,
+        "p_value": p_value
+    })
+
+    return {
+        "correlation": pd.DataFrame(correlation, index=names, columns=names),
+        "summary": summary,
+        "grid": grid,
+        "fit": fit,
+        "lower": fit - half_width,
+        "upper": fit + half_width
+    }
+
+# Function to draw every variable against the target in one faceted figure
+# Small datasets are drawn as points (sampled to SCATTER_MAX_POINTS), large ones as binned density
+def relationship_figure(X, y, analysis, display_variables, target_label, seed=0):
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    k = X.shape[1]
+    num_rows = -(-k // FACET_COLUMNS)
+    fig = make_subplots(rows=num_rows, cols=min(k, FACET_COLUMNS), subplot_titles=display_variables)
+
+    use_density = len(y) >= DENSITY_MIN_ROWS
+    if not use_density and len(y) > SCATTER_MAX_POINTS:
+        # One shared sample keeps the facets comparable
+        sample = np.random.default_rng(seed).choice(len(y), SCATTER_MAX_POINTS, replace=False)
+    else:
+        sample = slice(None)
+
+    for i in range(k):
+        row, col = i // FACET_COLUMNS + 1, i % FACET_COLUMNS + 1
+
+        if use_density:
+            counts, x_edges, y_edges = np.histogram2d(X[:, i], y, bins=DENSITY_BINS)
+            fig.add_trace(go.Heatmap(
+                x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                z=np.where(counts.T > 0, counts.T, np.nan), colorscale='Blues', showscale=False,
+                name='Density'
+            ), row=row, col=col)
+        else:
+            fig.add_trace(go.Scattergl(
+                x=X[sample, i], y=y[sample], mode='markers', marker=dict(size=4, opacity=0.5),
+                name='Data', showlegend=i == 0, legendgroup='data'
+            ), row=row, col=col)
+
+        grid = analysis["grid"][i]
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([grid, grid[::-1]]),
+            y=np.concatenate([analysis["upper"][i], analysis["lower"][i][::-1]]),
+            fill='toself', fillcolor='rgba(214, 39, 40, 0.2)', line=dict(width=0),
+            name=f'{CONFIDENCE_LEVEL:.0%} confidence band', showlegend=i == 0, legendgroup='band', hoverinfo='skip'
+        ), row=row, col=col)
+        fig.add_trace(go.Scatter(
+            x=grid, y=analysis["fit"][i], mode='lines', line=dict(color='rgb(214, 39, 40)'),
+            name='Linear fit', showlegend=i == 0, legendgroup='fit'
+        ), row=row, col=col)
+
+    fig.update_yaxes(title_text=target_label, col=1)
+    fig.update_layout(height=300 * num_rows, title='Parameter Relationships')
+    return fig
@@ -0,0 +1,191 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy import linalg
+from sklearn.preprocessing import PolynomialFeatures
+import database
+import kpi_cache
+
+# Forgetting factor per day of data age; 1.0 weighs the full history equally
+DEFAULT_FORGETTING = 1.0
+
+# Forgetting factors offered on the page; each one is a separate stored state, so the set stays small
+FORGETTING_OPTIONS = (0.9, 0.95, 0.98, 0.99, 0.995, 0.999, 1.0)
+
+# Stored states per user; the least recently used ones are removed, since every state is updated on each entry
+MAX_STATES_PER_USER = 20
+
+# Ridge term on the scaled (unit-diagonal) normal equations, keeping them solvable with few or collinear rows
+RIDGE_EPSILON = 1e-10
+
+# Linear model on precomputed features, solved from sufficient statistics
+class OnlineLinearModel:
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+# Function to get the key of an online model state
+def model_key(target_column, input_variables, degree, forgetting):
+    return hashlib.sha256(repr((target_column, tuple(input_variables), degree, float(forgetting))).encode()).hexdigest()[:32]
+
+# Function to get the polynomial transform of a model degree (None for linear models)
+def _feature_transform(degree, num_inputs):
+    if degree <= 1:
+        return None
+    return PolynomialFeatures(degree=degree, include_bias=False).fit(np.zeros((1, num_inputs)))
+
+# Function to build the design matrix [1, features] of raw input rows
+def _design(poly, X):
+    features = poly.transform(X) if poly is not None else X
+    return np.column_stack([np.ones(len(X)), features])
+
+# Function to create an empty state; it is filled from the history by the first update
+def new_state(target_column, input_variables, degree=1, forgetting=DEFAULT_FORGETTING):
+    num_features = _design(_feature_transform(degree, len(input_variables)), np.zeros((1, len(input_variables)))).shape[1]
+    return {
+        "model_key": model_key(target_column, input_variables, degree, forgetting),
+        "target_column": target_column,
+        "input_variables": list(input_variables),
+        "degree": degree,
+        "forgetting": float(forgetting),
+        "xtx": np.zeros((num_features, num_features)).tolist(),
+        "xty": np.zeros(num_features).tolist(),
+        "yty": 0.0,
+        "num_rows": 0,
+        "reference_date": None,
+        "last_entry_id": 0
+    }
+
+# Function to get the complete (date, inputs, target) rows of a wide matrix for a state
+def _complete_rows(matrix, state):
+    columns = state["input_variables"] + [state["target_column"]]
+    if matrix.empty or not all(col in matrix.columns for col in columns):
+        return pd.DataFrame(columns=['date'] + columns)
+    return matrix.dropna(subset=columns)
+
+# Function to add and remove wide rows from the weighted sufficient statistics of a state
+# Rows are weighted by forgetting ** (days before the newest date); moving the newest date forward
+# scales the existing statistics, so removing a row subtracts exactly the weight it has now
+def apply_rows(state, added, removed):
+    added = _complete_rows(added, state)
+    removed = _complete_rows(removed, state)
+    if added.empty and removed.empty:
+        return state
+
+    poly = _feature_transform(state["degree"], len(state["input_variables"]))
+    xtx = np.asarray(state["xtx"], dtype=float)
+    xty = np.asarray(state["xty"], dtype=float)
+    yty = float(state["yty"])
+    forgetting = state["forgetting"]
+
+    reference = pd.Timestamp(state["reference_date"]) if state["reference_date"] is not None else None
+    if not added.empty and (reference is None or added['date'].max() > reference):
+        newest = added['date'].max()
+        if reference is not None:
+            decay = forgetting ** (newest - reference).days
+            xtx, xty, yty = xtx * decay, xty * decay, yty * decay
+        reference = newest
+
+    for rows, sign in ((added, 1.0), (removed, -1.0)):
+        if rows.empty:
+            continue
+        Z = _design(poly, rows[state["input_variables"]].to_numpy(dtype=float))
+        y = rows[state["target_column"]].to_numpy(dtype=float)
+        w = sign * forgetting ** (reference - rows['date']).dt.days.to_numpy(dtype=float)
+        xtx += (Z * w[:, None]).T @ Z
+        xty += (w * y) @ Z
+        yty += float(np.sum(w * y ** 2))
+
+    return {
+        **state,
+        "xtx": xtx.tolist(),
+        "xty": xty.tolist(),
+        "yty": yty,
+        "num_rows": state["num_rows"] + len(added) - len(removed),
+        "reference_date": reference.date() if reference is not None else None
+    }
+
+# Function to solve the model of a state from its statistics, in time independent of the history size
+# The statistics are centered and scaled to a correlation matrix before a Cholesky solve; raw polynomial
+# features are too badly conditioned for the plain normal equations
+# Returns the polynomial transform (None for linear models), the model and its weighted R²
+def solve_state(state):
+    xtx = np.asarray(state["xtx"], dtype=float)
+    xty = np.asarray(state["xty"], dtype=float)
+    poly = _feature_transform(state["degree"], len(state["input_variables"]))
+
+    # The first feature is the constant, so xtx[0, 0] is the total weight
+    total_weight = xtx[0, 0]
+    if total_weight <= 0:
+        return poly, OnlineLinearModel(np.zeros(len(xty) - 1), 0.0), 0.0
+
+    means = xtx[0, 1:] / total_weight
+    y_mean = xty[0] / total_weight
+    covariance = xtx[1:, 1:] / total_weight - np.outer(means, means)
+    covariance_y = xty[1:] / total_weight - means * y_mean
+    variance_y = state["yty"] / total_weight - y_mean ** 2
+
+    scale = np.sqrt(np.maximum(np.diag(covariance), 0))
+    scale[scale == 0] = 1.0
+    correlation = covariance / np.outer(scale, scale) + RIDGE_EPSILON * np.eye(len(scale))
+    try:
+        coef = linalg.cho_solve(linalg.cho_factor(correlation), covariance_y / scale) / scale
+    except linalg.LinAlgError:
+        coef = linalg.lstsq(correlation, covariance_y / scale)[0] / scale
+    intercept = y_mean - means @ coef
+
+    residual_variance = variance_y - 2 * coef @ covariance_y + coef @ covariance @ coef
+    r2 = 1 - residual_variance / variance_y if variance_y > 0 else 0.0
+
+    return poly, OnlineLinearModel(coef, intercept), float(r2)
+
+# Function to bring states up to date with the entries added since their last update
+def refresh_states(username, states):
+    updated = []
+
+    # States with the same last entry share one query
+    for last_entry_id in sorted({s["last_entry_id"] for s in states}):
+        changes = database.get_feature_value_changes(username, last_entry_id)
+        if not changes:
+            continue
+
+        removed = kpi_cache.pivot_feature_values(changes, 'old_value')
+        added = kpi_cache.pivot_feature_values(changes, 'new_value')
+        newest_entry_id = max(row["last_entry_id"] for row in changes)
+
+        for state in states:
+            if state["last_entry_id"] == last_entry_id:
+                updated.append({**apply_rows(state, added, removed), "last_entry_id": newest_entry_id})
+
+    if updated:
+        database.save_online_model_states(username, updated)
+
+    updated_keys = {s["model_key"] for s in updated}
+    return [s for s in states if s["model_key"] not in updated_keys] + updated
+
+# Function to update every online model of a user after new KPI entries
+def update_user_models(username):
+    states = database.get_online_model_states(username)
+    if not states:
+        return 0
+
+    before = {s["model_key"]: s["last_entry_id"] for s in states}
+    states = refresh_states(username, states)
+    return sum(1 for s in states if s["last_entry_id"] != before[s["model_key"]])
+
+# Function to get an up-to-date online fit, creating its state from the history on first use
+# Returns the same fields as a batch fit; y_pred is computed on the given rows for display only
+def get_online_fit(username, target_column, input_variables, degree, forgetting, X):
+    key = model_key(target_column, input_variables, degree, forgetting)
+    state = next((s for s in database.get_online_model_states(username) if s["model_key"] == key), None)
+    state = refresh_states(username, [state or new_state(target_column, input_variables, degree, forgetting)])[0]
+    database.mark_online_model_state_used(username, key, MAX_STATES_PER_USER)
+
+    poly, model, r2 = solve_state(state)
+    X = np.asarray(X, dtype=float)
+    y_pred = model.predict(poly.transform(X) if poly is not None else X)
+
+    return {"model": model, "poly": poly, "y_pred": y_pred, "r2": r2, "num_rows": state["num_rows"]}
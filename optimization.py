@@ -3,10 +3,38 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import r2_score
+import bayesian_search
+import constraints
 import database
+import kpi_cache
+import model_fleet
+import model_selection
+import model_store
+import multi_factor
+import online_models
+from optimization_targets import (
+    MINIMIZED_TARGETS, display_name, get_default_inputs, get_optimization_targets
+)
+import pareto
+import profiling
+import response_surface
+import sampling
+import sensitivity
+import solvers
+
+# Method selecting the model by k-fold cross-validation
+AUTO_METHOD = "Auto (Cross-Validated)"
+
+# Method searching the cross-validated model with a budgeted Gaussian-process search
+BAYESIAN_METHOD = "Bayesian Search"
+
+# Methods whose optimum can be searched under operating constraints
+CONSTRAINED_METHODS = ("Linear Regression", "Polynomial Regression", AUTO_METHOD)
+
+# Variables explaining less of the predicted variation, or moving it by less than this share of the
+# target's scale, are not reported as influential
+MIN_REPORTED_INFLUENCE = 0.01
+MIN_REPORTED_EFFECT = 1e-9
 
 def show_optimization():
     st.title("Process Optimization")
@@ -17,18 +45,25 @@ def show_optimization():
         st.error("Error fetching user data")
         return
     
-    # Get user's KPI data
-    kpi_data = database.get_user_kpi_data(st.session_state.username)
+    # Get user's extended KPI entries as one wide row per date and process, cached until the user's data changes
+    df = kpi_cache.get_feature_matrix(st.session_state.username)
     
-    if not kpi_data or len(kpi_data) == 0:
-        st.warning("No process data available for optimization. Please add process data in the Dashboard first.")
+    if len(df) == 0:
+        st.warning("No process data available for optimization. Please add KPI data in the Advanced KPIs page first.")
         return
     
-    # Convert to dataframe
-    df = pd.DataFrame(kpi_data)
-    
     # Extract field
-    field = df.iloc[0]['field']
+    field = user_data['field']
+    
+    # Several targets are traded off on a Pareto front
+    optimization_mode = st.radio(
+        "Optimization Mode",
+        ["Single Target", "Multi-Objective (Pareto)"],
+        horizontal=True
+    )
+    if optimization_mode == "Multi-Objective (Pareto)":
+        show_pareto_optimization(df)
+        return
     
     # Left column for optimization targets and options
     col1, col2 = st.columns([1, 2])
@@ -36,102 +71,40 @@ def show_optimization():
     with col1:
         st.subheader("Optimization Targets")
         
-        # Select optimization target based on industry
-        if field == "Oil and Gas":
-            optimization_target = st.selectbox(
-                "Select Parameter to Optimize",
-                ["Flow Efficiency", "Energy Efficiency"]
-            )
-            
-            if optimization_target == "Flow Efficiency":
-                target_column = "flow_efficiency"
-                unit = "%"
-            else:  # Energy Efficiency
-                target_column = "energy_efficiency"
-                unit = "m³/kWh"
-            
-            # Input variables
-            input_variables = st.multiselect(
-                "Select Input Variables",
-                ["inlet_flow", "outlet_flow", "temperature", "pressure"],
-                ["inlet_flow", "temperature"]
-            )
-            
-        elif field == "Food and Beverage":
-            optimization_target = st.selectbox(
-                "Select Parameter to Optimize",
-                ["Yield Rate", "Waste Rate", "Energy Efficiency"]
-            )
-            
-            if optimization_target == "Yield Rate":
-                target_column = "yield_rate"
-                unit = "%"
-            elif optimization_target == "Waste Rate":
-                target_column = "waste_rate"
-                unit = "%"
-            else:  # Energy Efficiency
-                target_column = "energy_efficiency"
-                unit = "kg/kWh"
-            
-            # Input variables
-            input_variables = st.multiselect(
-                "Select Input Variables",
-                ["raw_material", "final_product", "energy_consumption", "water_usage"],
-                ["raw_material", "energy_consumption"]
-            )
-            
-        elif field == "Pharmaceutical":
-            optimization_target = st.selectbox(
-                "Select Parameter to Optimize",
-                ["Yield Efficiency", "Production Rate", "Right First Time"]
-            )
-            
-            if optimization_target == "Yield Efficiency":
-                target_column = "yield_efficiency"
-                unit = "%"
-            elif optimization_target == "Production Rate":
-                target_column = "production_rate"
-                unit = "kg/h"
-            else:  # Right First Time
-                target_column = "right_first_time"
-                unit = "%"
-            
-            # Input variables
-            input_variables = st.multiselect(
-                "Select Input Variables",
-                ["batch_size", "cycle_time", "defect_rate"],
-                ["batch_size", "cycle_time"]
-            )
-            
-        else:  # Generic
-            optimization_target = st.selectbox(
-                "Select Parameter to Optimize",
-                ["Efficiency", "Productivity", "Energy Efficiency"]
-            )
-            
-            if optimization_target == "Efficiency":
-                target_column = "efficiency"
-                unit = "%"
-            elif optimization_target == "Productivity":
-                target_column = "productivity"
-                unit = "units/h"
-            else:  # Energy Efficiency
-                target_column = "energy_efficiency"
-                unit = "units/kWh"
-            
-            # Input variables
-            input_variables = st.multiselect(
-                "Select Input Variables",
-                ["input_quantity", "output_quantity", "energy_consumption", "process_time"],
-                ["input_quantity", "process_time"]
-            )
+        # Select optimization target among the KPIs entered
+        targets = get_optimization_targets(df)
+        optimization_target = st.selectbox(
+            "Select Parameter to Optimize",
+            list(targets["targets"].keys())
+        )
+        target_column, unit = targets["targets"][optimization_target]
+        
+        # Input variables
+        input_variables = st.multiselect(
+            "Select Input Variables",
+            [col for col in targets["inputs"] if col != target_column],
+            get_default_inputs(targets, [target_column]),
+            format_func=display_name
+        )
         
         # Optimization method
         optimization_method = st.radio(
             "Optimization Method",
-            ["Linear Regression", "Polynomial Regression", "Multi-factor Analysis"]
+            ["Linear Regression", "Polynomial Regression", AUTO_METHOD, BAYESIAN_METHOD, "Multi-factor Analysis"]
         )
         
+        if optimization_method in (AUTO_METHOD, BAYESIAN_METHOD):
+            st.checkbox("Include gradient boosting", key="auto_include_boosting")
+        if optimization_method in ("Linear Regression", "Polynomial Regression", AUTO_METHOD):
+            st.checkbox("Fit one model per process", key="per_process_models")
+        if optimization_method in ("Linear Regression", "Polynomial Regression"):
+            # Online models are updated on every KPI entry instead of refitted from the full history
+            if st.checkbox("Online updates", key="online_updates"):
+                st.select_slider("Forgetting Factor (per day)", online_models.FORGETTING_OPTIONS,
+                                 online_models.DEFAULT_FORGETTING, key="online_forgetting")
+        if optimization_method == BAYESIAN_METHOD:
+            st.slider("Evaluation Budget", 20, 200, bayesian_search.DEFAULT_BUDGET, step=10, key="bayesian_budget")
+        
         # Optimization goal
         optimization_goal = st.radio(
             "Optimization Goal",
@@ -141,18 +114,26 @@ def show_optimization():
         if optimization_goal == "Target Value":
             target_value = st.number_input(f"Target Value ({unit})", min_value=0.0, format="%.2f")
         
-        # Button to run optimization
-        run_optimization = st.button("Run Optimization", type="primary")
+        # Operating constraints on the input variables
+        constraint_set, constraint_error = None, None
+        if optimization_method in CONSTRAINED_METHODS and input_variables:
+            constraint_set, constraint_error = show_constraint_inputs(df, target_column, input_variables)
+        
+        # Button to run optimization; once run, results follow the selected options using stored models
+        if st.button("Run Optimization", type="primary"):
+            st.session_state.optimization_active = True
     
     # Right column for optimization results
     with col2:
-        if run_optimization:
+        if st.session_state.get("optimization_active"):
             if target_column not in df.columns:
                 st.error(f"Target column '{target_column}' not found in the data")
             elif not all(var in df.columns for var in input_variables):
                 st.error("Some input variables are not found in the data")
             elif len(input_variables) == 0:
                 st.error("Please select at least one input variable")
+            elif constraint_error:
+                st.error(constraint_error)
             else:
                 # Drop rows with NaN in target or input variables
                 analysis_df = df.dropna(subset=[target_column] + input_variables)
@@ -168,27 +149,238 @@ def show_optimization():
                         optimization_goal,
                         target_value if optimization_goal == "Target Value" else None,
                         unit,
-                        field
+                        field,
+                        constraint_set
                     )
 
-def show_optimization_results(df, target_column, input_variables, optimization_method, 
-                             optimization_goal, target_value, unit, field):
-    st.subheader("Optimization Analysis")
+# Function to display the operating constraint inputs of the selected variables
+# Returns (constraints, error); constraints is None while the bounds are the observed ranges and no line is given
+def show_constraint_inputs(df, target_column, input_variables):
+    rows = df.dropna(subset=[target_column] + input_variables)
+    observed_min = rows[input_variables].min().to_numpy(dtype=float)
+    observed_max = rows[input_variables].max().to_numpy(dtype=float)
+    
+    with st.expander("Operating Constraints"):
+        st.caption(
+            "Edit the range of each variable (an equal minimum and maximum fixes its value) and add one linear "
+            "constraint per line, e.g. `flow.outlet <= flow.inlet`, `0.5 * a + b <= 60` or `a / b >= 0.5`."
+        )
+        bounds = st.data_editor(
+            pd.DataFrame({"Variable": input_variables, "Minimum": observed_min, "Maximum": observed_max}),
+            disabled=["Variable"], hide_index=True, key=f"constraint_bounds_{'|'.join(input_variables)}"
+        )
+        text = st.text_area("Linear Constraints", key="constraint_text", placeholder="flow.outlet <= flow.inlet")
+    
+    # Cleared cells fall back to the observed range
+    lower = bounds["Minimum"].fillna(pd.Series(observed_min)).to_numpy(dtype=float)
+    upper = bounds["Maximum"].fillna(pd.Series(observed_max)).to_numpy(dtype=float)
+    if not text.strip() and np.allclose(lower, observed_min) and np.allclose(upper, observed_max):
+        return None, None
+    
+    try:
+        return constraints.build_constraints(input_variables, lower, upper, text), None
+    except ValueError as e:
+        return None, str(e)
+
+# Function to display the multi-objective optimization mode
+def show_pareto_optimization(df):
+    targets = get_optimization_targets(df)
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("Optimization Targets")
+        
+        selected_targets = st.multiselect(
+            "Select Parameters to Optimize",
+            list(targets["targets"].keys()),
+            list(targets["targets"].keys())[:2]
+        )
+        
+        # Direction of each target
+        maximize = []
+        for name in selected_targets:
+            column = targets["targets"][name][0]
+            goal = st.radio(
+                f"{name} Goal",
+                ["Maximize", "Minimize"],
+                index=1 if column in MINIMIZED_TARGETS else 0,
+                horizontal=True,
+                key=f"pareto_goal_{column}"
+            )
+            maximize.append(goal == "Maximize")
+        
+        target_columns = [targets["targets"][name][0] for name in selected_targets]
+        input_variables = st.multiselect(
+            "Select Input Variables",
+            [col for col in targets["inputs"] if col not in target_columns],
+            get_default_inputs(targets, target_columns),
+            format_func=display_name
+        )
+        
+        model_method = st.radio("Model", ["Linear Regression", "Polynomial Regression"], key="pareto_model")
+        n_samples = st.select_slider("Candidate Points", options=[5000, 20000, 50000, 100000], value=20000)
+        
+        if st.button("Compute Pareto Front", type="primary"):
+            st.session_state.pareto_active = True
+    
+    with col2:
+        if not st.session_state.get("pareto_active"):
+            return
+        
+        units = [targets["targets"][name][1] for name in selected_targets]
+        
+        if len(target_columns) < 2:
+            st.error("Please select at least two parameters to optimize")
+            return
+        if len(input_variables) == 0:
+            st.error("Please select at least one input variable")
+            return
+        missing = [col for col in target_columns + input_variables if col not in df.columns]
+        if missing:
+            st.error(f"Columns not found in the data: {', '.join(missing)}")
+            return
+        
+        analysis_df = df.dropna(subset=target_columns + input_variables)
+        if len(analysis_df) < 3:
+            st.error("Not enough data points for analysis. Please add more process data.")
+            return
+        
+        show_pareto_results(analysis_df, target_columns, units, maximize, input_variables, model_method, n_samples)
+
+@profiling.profiled("pareto front")
+def show_pareto_results(df, target_columns, units, maximize, input_variables, model_method, n_samples):
+    st.subheader("Pareto Front")
     
-    # Prepare data
     X = df[input_variables].values
-    y = df[target_column].values
+    model_kind = "polynomial" if model_method == "Polynomial Regression" else "linear"
+    
+    # One stored model per target; the fits only use rows with every selected target, so the
+    # target set is part of the stored key and the single-target models are never reused here
+    models = []
+    for target_column in target_columns:
+        y = df[target_column].values
+        fitted = model_store.get_or_fit(
+            st.session_state.username, target_column, input_variables, ("pareto", model_kind, tuple(target_columns)),
+            lambda: model_selection.fit_optimization_model(X, y, model_kind)
+        )
+        models.append((fitted["poly"], fitted["model"]))
+        st.markdown(f"**{display_name(target_column)} Model R² Score:** {fitted['r2']:.4f}")
+    
+    candidates, predictions, on_front = pareto.compute_pareto_front(
+        models, X.min(axis=0), X.max(axis=0), maximize, n_samples
+    )
+    
+    # Front points ordered along the first target
+    front_X = candidates[on_front]
+    front_y = predictions[on_front]
+    order = np.argsort(front_y[:, 0])
+    front_X, front_y = front_X[order], front_y[order]
+    
+    st.markdown(f"**{len(front_X)}** Pareto-optimal operating points out of {len(candidates)} candidates.")
+    
+    display_targets = [display_name(col) for col in target_columns]
+    front_df = pd.DataFrame(front_y, columns=display_targets)
+    for i, var in enumerate(input_variables):
+        front_df[display_name(var)] = front_X[:, i]
+    
+    # Pick an operating point along the front
+    point = st.slider("Operating Point", 0, len(front_df) - 1, len(front_df) // 2) if len(front_df) > 1 else 0
+    
+    if len(target_columns) == 2:
+        # Dominated candidates are shown as a downsampled background cloud
+        background = np.random.default_rng(0).choice(len(candidates), min(len(candidates), 2000), replace=False)
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(
+            x=predictions[background, 0], y=predictions[background, 1], mode='markers',
+            marker=dict(color='lightgray', size=4), name='Candidates'
+        ))
+        fig.add_trace(go.Scatter(
+            x=front_y[:, 0], y=front_y[:, 1], mode='lines+markers',
+            customdata=front_X, name='Pareto Front'
+        ))
+        fig.add_trace(go.Scatter(
+            x=[front_y[point, 0]], y=[front_y[point, 1]], mode='markers',
+            marker=dict(color='red', size=12), name='Operating Point'
+        ))
+        fig.update_layout(
+            xaxis_title=f"{display_targets[0]} ({units[0]})",
+            yaxis_title=f"{display_targets[1]} ({units[1]})"
+        )
+    else:
+        fig = px.scatter_matrix(front_df, dimensions=display_targets, title="Pareto Front")
+    profiling.plotly_chart(fig, use_container_width=True)
+    
+    # Selected operating point
+    st.subheader("Selected Operating Point")
+    profiling.dataframe(front_df.iloc[[point]].T.rename(columns={front_df.index[point]: "Value"}))
+    
+    with st.expander("All Pareto-optimal points"):
+        profiling.dataframe(front_df)
+
+@profiling.profiled("optimization analysis")
+def show_optimization_results(df, target_column, input_variables, optimization_method, 
+                             optimization_goal, target_value, unit, field, constraint_set=None):
+    st.subheader("Optimization Analysis")
     
     # Normalize variable names for display
-    display_variables = [var.replace('_', ' ').title() for var in input_variables]
+    display_variables = [display_name(var) for var in input_variables]
+    
+    # Fitted models are stored per user, target, inputs and data version; reruns skip the fit
+    if optimization_method == "Polynomial Regression":
+        model_kind = "polynomial"
+    elif optimization_method in (AUTO_METHOD, BAYESIAN_METHOD):
+        model_kind = "auto_boosting" if st.session_state.get("auto_include_boosting") else "auto"
+    else:
+        model_kind = "linear"
+    
+    # Processes that behave differently get their own models, compared with the pooled one
+    if st.session_state.get("per_process_models") and optimization_method in (
+        "Linear Regression", "Polynomial Regression", AUTO_METHOD
+    ):
+        if constraint_set is not None:
+            st.info("Per-process optima are searched over each process's observed ranges; "
+                    "operating constraints apply to the pooled analysis.")
+        show_process_fleet(df, target_column, input_variables, model_kind, optimization_goal, target_value, unit)
+        return
+    
+    # Large histories are fitted and plotted on a stratified sample, so the page cost stops growing with the data
+    sample_df, sample_info = kpi_cache.get_cached(
+        st.session_state.username, ("fit_sample", target_column, tuple(input_variables)),
+        lambda username: sampling.stratified_sample(df, target_column, input_variables + [target_column], 'process_name')
+    )
+    online = model_kind in ("linear", "polynomial") and st.session_state.get("online_updates")
+    if sample_info["ratio"] < 1 and online:
+        st.caption(
+            f"The online model is fitted on the full history; its plots show a stratified sample of "
+            f"{sample_info['sample_rows']:,} of {sample_info['rows']:,} rows ({sample_info['ratio']:.1%})."
+        )
+    elif sample_info["ratio"] < 1:
+        st.caption(
+            f"Fitted on a stratified sample of {sample_info['sample_rows']:,} of {sample_info['rows']:,} rows "
+            f"({sample_info['ratio']:.1%}, by process and {display_name(target_column)} level). The sample mean of "
+            f"{display_name(target_column)} is within ±{sample_info['error_bound']:.3g} {unit} of the full data "
+            f"(95% confidence)."
+        )
+    
+    # Prepare data
+    X = sample_df[input_variables].values
+    y = sample_df[target_column].values
+    
+    if online:
+        # Online models are solved from sufficient statistics kept up to date by every KPI entry
+        fitted = online_models.get_online_fit(
+            st.session_state.username, target_column, input_variables, 2 if model_kind == "polynomial" else 1,
+            st.session_state.get("online_forgetting", online_models.DEFAULT_FORGETTING), X
+        )
+    else:
+        fitted = model_store.get_or_fit(
+            st.session_state.username, target_column, input_variables, model_kind,
+            lambda: model_selection.fit_optimization_model(X, y, model_kind)
+        )
+    model, poly, y_pred, r2 = fitted["model"], fitted["poly"], fitted["y_pred"], fitted["r2"]
     
     # Apply optimization method
     if optimization_method == "Linear Regression":
-        model = LinearRegression()
-        model.fit(X, y)
-        y_pred = model.predict(X)
-        r2 = r2_score(y, y_pred)
-        
         # Display model quality
         st.markdown(f"**Model R² Score:** {r2:.4f}")
         
@@ -204,34 +396,25 @@ def show_optimization_results(df, target_column, input_variables, optimization_m
         coefs['Absolute Impact'] = abs(coefs['Coefficient'])
         coefs = coefs.sort_values('Absolute Impact', ascending=False)
         
-        st.dataframe(coefs)
+        profiling.dataframe(coefs)
         
         # Find optimal values
         find_optimal_values(model, X, input_variables, display_variables, target_column, 
-                           optimization_goal, target_value, unit, is_polynomial=False)
+                           optimization_goal, target_value, unit, is_polynomial=False,
+                           constraint_set=constraint_set)
         
         # Plot actual vs predicted
         fig = px.scatter(x=y, y=y_pred, 
-                        labels={'x': f'Actual {target_column.replace("_", " ").title()} ({unit})', 
-                                'y': f'Predicted {target_column.replace("_", " ").title()} ({unit})'},
+                        labels={'x': f'Actual {display_name(target_column)} ({unit})', 
+                                'y': f'Predicted {display_name(target_column)} ({unit})'},
                         title='Model Fit: Actual vs Predicted')
         fig.add_trace(
             go.Scatter(x=[min(y), max(y)], y=[min(y), max(y)], 
                       mode='lines', name='Perfect Fit', line=dict(dash='dash'))
         )
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
         
     elif optimization_method == "Polynomial Regression":
-        # Transform features to polynomial
-        poly = PolynomialFeatures(degree=2, include_bias=False)
-        X_poly = poly.fit_transform(X)
-        
-        # Fit regression model
-        model = LinearRegression()
-        model.fit(X_poly, y)
-        y_pred = model.predict(X_poly)
-        r2 = r2_score(y, y_pred)
-        
         # Display model quality
         st.markdown(f"**Model R² Score:** {r2:.4f}")
         
@@ -240,90 +423,145 @@ def show_optimization_results(df, target_column, input_variables, optimization_m
         
         # Plot actual vs predicted
         fig = px.scatter(x=y, y=y_pred, 
-                        labels={'x': f'Actual {target_column.replace("_", " ").title()} ({unit})', 
-                                'y': f'Predicted {target_column.replace("_", " ").title()} ({unit})'},
+                        labels={'x': f'Actual {display_name(target_column)} ({unit})', 
+                                'y': f'Predicted {display_name(target_column)} ({unit})'},
                         title='Polynomial Model Fit: Actual vs Predicted')
         fig.add_trace(
             go.Scatter(x=[min(y), max(y)], y=[min(y), max(y)], 
                       mode='lines', name='Perfect Fit', line=dict(dash='dash'))
         )
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
         
         # Find optimal values using grid search for polynomial model
         find_optimal_values_poly(poly, model, X, input_variables, display_variables, 
-                                target_column, optimization_goal, target_value, unit)
+                                target_column, optimization_goal, target_value, unit, constraint_set)
+        
+    elif optimization_method == AUTO_METHOD:
+        # Display the cross-validated comparison of the candidate models
+        st.markdown(f"**Selected Model:** {fitted['name']} (training R² {r2:.4f})")
+        st.subheader("Cross-Validation Results")
+        profiling.dataframe(fitted["cv_scores"])
+        
+        # Plot actual vs predicted
+        fig = px.scatter(x=y, y=y_pred, 
+                        labels={'x': f'Actual {display_name(target_column)} ({unit})', 
+                                'y': f'Predicted {display_name(target_column)} ({unit})'},
+                        title=f'{fitted["name"]} Fit: Actual vs Predicted')
+        fig.add_trace(
+            go.Scatter(x=[min(y), max(y)], y=[min(y), max(y)], 
+                      mode='lines', name='Perfect Fit', line=dict(dash='dash'))
+        )
+        profiling.plotly_chart(fig, use_container_width=True)
+        
+        # Linear candidates are solved exactly, the others by the polynomial/grid search
+        if poly is None and fitted["kind"] != "boosting":
+            find_optimal_values(model, X, input_variables, display_variables, target_column, 
+                               optimization_goal, target_value, unit, is_polynomial=False,
+                           constraint_set=constraint_set)
+        else:
+            find_optimal_values_poly(poly, model, X, input_variables, display_variables, 
+                                    target_column, optimization_goal, target_value, unit, constraint_set)
+        
+    elif optimization_method == BAYESIAN_METHOD:
+        st.markdown(f"**Selected Model:** {fitted['name']} (training R² {r2:.4f})")
+        profiling.dataframe(fitted["cv_scores"])
+        
+        find_optimal_values_search(poly, model, X, input_variables, display_variables, target_column,
+                                   optimization_goal, target_value, unit,
+                                   st.session_state.get("bayesian_budget", bayesian_search.DEFAULT_BUDGET))
         
     else:  # Multi-factor Analysis
-        # Create correlation matrix
-        corr_matrix = df[input_variables + [target_column]].corr()
+        # Correlations, simple regressions and their confidence bands in one pass of matrix operations
+        analysis = multi_factor.analyze(X, y, input_variables, target_column)
         
         # Display correlation heatmap
         st.subheader("Correlation Matrix")
-        fig = px.imshow(corr_matrix, text_auto=True, color_continuous_scale='RdBu_r',
+        corr_matrix = analysis["correlation"].rename(index=display_name, columns=display_name)
+        fig = px.imshow(corr_matrix, text_auto='.2f', color_continuous_scale='RdBu_r', zmin=-1, zmax=1,
                        title='Parameter Correlation Matrix')
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
         
-        # Display scatter plots for each input variable vs target
+        # Display every input variable against the target with its linear fit
         st.subheader("Parameter Relationships")
+        summary = analysis["summary"].assign(variable=lambda s: s["variable"].map(display_name)).rename(columns={
+            'variable': 'Parameter', 'correlation': 'Correlation', 'r2': 'R²', 'slope': 'Slope',
+            'slope_lower': 'Slope (lower 95%)', 'slope_upper': 'Slope (upper 95%)',
+            'intercept': 'Intercept', 'p_value': 'p-value'
+        })
+        profiling.dataframe(summary, use_container_width=True, hide_index=True)
         
-        for i, var in enumerate(input_variables):
-            fig = px.scatter(df, x=var, y=target_column, trendline="ols",
-                            labels={'x': display_variables[i], 'y': target_column.replace('_', ' ').title()})
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Fit linear model for reference
-        model = LinearRegression()
-        model.fit(X, y)
-        y_pred = model.predict(X)
-        r2 = r2_score(y, y_pred)
+        fig = multi_factor.relationship_figure(X, y, analysis, display_variables, display_name(target_column))
+        profiling.plotly_chart(fig, use_container_width=True)
         
+        # Linear model for reference
         st.markdown(f"**Reference Linear Model R² Score:** {r2:.4f}")
     
     # Show industry-specific recommendations
     show_industry_recommendations(field, target_column, input_variables, model, X, y, 
-                                 optimization_method != "Multi-factor Analysis")
+                                 optimization_method != "Multi-factor Analysis", poly)
 
+@profiling.profiled("per-process models")
+def show_process_fleet(df, target_column, input_variables, model_kind, optimization_goal, target_value, unit):
+    st.subheader("Per-Process Models")
+    
+    # The fleet is fitted in a process pool once per data version and option set
+    fleet_key = ("model_fleet", target_column, tuple(input_variables), model_kind, optimization_goal, target_value)
+    fleet = kpi_cache.get_cached(
+        st.session_state.username, fleet_key,
+        lambda username: model_fleet.fit_fleet(
+            df, target_column, input_variables, model_kind, optimization_goal, target_value
+        )
+    )
+    
+    skipped = df['process_name'].nunique() - (len(fleet) - 1)
+    if skipped > 0:
+        st.info(f"{skipped} processes with fewer than {model_fleet.MIN_PROCESS_ROWS} complete rows are only "
+                f"covered by the pooled model.")
+    
+    # Comparison of the optimum and fit quality of every process
+    fig = px.bar(
+        fleet, x='process_name', y='optimal_value', color='r2', color_continuous_scale='RdYlGn',
+        range_color=[0, 1], title=f'Optimal {display_name(target_column)} per Process',
+        labels={'process_name': 'Process', 'optimal_value': f'Optimal {display_name(target_column)} ({unit})', 'r2': 'R²'}
+    )
+    profiling.plotly_chart(fig, use_container_width=True)
+    
+    table = fleet.rename(columns={
+        'process_name': 'Process', 'rows': 'Rows', 'model': 'Model', 'r2': 'R²',
+        'optimal_value': f'Optimal {display_name(target_column)} ({unit})',
+        **{var: display_name(var) for var in input_variables}
+    })
+    profiling.dataframe(table, use_container_width=True, hide_index=True)
+
+@profiling.profiled("optimal values")
 def find_optimal_values(model, X, input_variables, display_variables, target_column, 
-                       optimization_goal, target_value, unit, is_polynomial=False):
+                       optimization_goal, target_value, unit, is_polynomial=False, constraint_set=None):
     st.subheader("Optimal Process Parameters")
     
-    # Get min and max values for each input variable
-    X_min = X.min(axis=0)
-    X_max = X.max(axis=0)
-    
-    # Generate grid of values for optimization
-    num_points = 1000
-    grid_points = []
-    
-    for i in range(len(input_variables)):
-        grid_points.append(np.linspace(X_min[i], X_max[i], num_points))
-    
-    # Create all combinations of input variables
-    grid = np.meshgrid(*grid_points)
-    grid_flat = [g.flatten() for g in grid]
-    X_grid = np.column_stack(grid_flat)
-    
-    # Make predictions for all grid points
-    if is_polynomial:
-        # For polynomial, this function is expected to be called with already transformed X_grid
-        y_grid = model.predict(X_grid)
+    if constraint_set is not None:
+        # Operating constraints: the linear program gives the exact optimum over the feasible set
+        X_min, X_max = constraint_set["lower"], constraint_set["upper"]
+        try:
+            solution = solvers.solve_linear_constrained(
+                model.coef_, model.intercept_, constraint_set, optimization_goal, target_value
+            )
+        except ValueError as e:
+            st.error(str(e))
+            return
     else:
-        y_grid = model.predict(X_grid)
-    
-    # Find optimal point based on goal
-    if optimization_goal == "Maximize":
-        optimal_idx = np.argmax(y_grid)
-    elif optimization_goal == "Minimize":
-        optimal_idx = np.argmin(y_grid)
-    else:  # Target Value
-        optimal_idx = np.argmin(np.abs(y_grid - target_value))
+        # Get min and max values for each input variable
+        X_min = X.min(axis=0)
+        X_max = X.max(axis=0)
+        
+        # The optimum of a linear model over the data range is solved exactly (a corner, or the target hyperplane)
+        solution = solvers.solve_linear(model.coef_, model.intercept_, X_min, X_max, optimization_goal, target_value)
     
     # Extract optimal values
-    optimal_X = X_grid[optimal_idx]
-    optimal_y = y_grid[optimal_idx]
+    optimal_X = solution["x"]
+    optimal_y = solution["y"]
     
     # Display results
-    st.markdown(f"**Optimal {target_column.replace('_', ' ').title()}:** {optimal_y:.2f} {unit}")
+    st.markdown(f"**Optimal {display_name(target_column)}:** {optimal_y:.2f} {unit}")
     
     # Create dataframe for optimal values
     optimal_df = pd.DataFrame({
@@ -335,17 +573,21 @@ def find_optimal_values(model, X, input_variables, display_variables, target_col
     })
     
     # Display as table
-    st.dataframe(optimal_df)
+    profiling.dataframe(optimal_df)
     
     # Display as gauge charts
     st.subheader("Optimal Parameter Settings")
     
+    show_parameter_gauges(optimal_X, X_min, X_max, display_variables)
+
+# Function to display the optimal setting of each variable as a gauge over its data range
+def show_parameter_gauges(optimal_X, X_min, X_max, display_variables):
     # Create 2 columns per row
-    for i in range(0, len(input_variables), 2):
+    for i in range(0, len(display_variables), 2):
         cols = st.columns(2)
         
         for j in range(2):
-            if i + j < len(input_variables):
+            if i + j < len(display_variables):
                 with cols[j]:
                     # Calculate percentage within range
                     var_idx = i + j
@@ -366,48 +608,74 @@ def find_optimal_values(model, X, input_variables, display_variables, target_col
                             ]
                         }
                     ))
-                    st.plotly_chart(fig, use_container_width=True)
+                    profiling.plotly_chart(fig, use_container_width=True)
 
-def find_optimal_values_poly(poly, model, X, input_variables, display_variables, 
-                           target_column, optimization_goal, target_value, unit):
-    st.subheader("Optimal Process Parameters (Polynomial Model)")
+@profiling.profiled("optimal values (bayesian search)")
+def find_optimal_values_search(poly, model, X, input_variables, display_variables, 
+                              target_column, optimization_goal, target_value, unit, budget):
+    st.subheader("Optimal Process Parameters (Bayesian Search)")
     
     # Get min and max values for each input variable
     X_min = X.min(axis=0)
     X_max = X.max(axis=0)
     
-    # Generate grid of values for optimization
-    num_points = 20  # Reduced for polynomial to avoid too many combinations
-    grid_points = []
+    # Latin hypercube design refined by a Gaussian process within a fixed evaluation budget
+    solution = bayesian_search.search_model(poly, model, X_min, X_max, optimization_goal, target_value, budget)
+    optimal_X = solution["x"]
+    optimal_y = solution["y"]
     
-    for i in range(len(input_variables)):
-        grid_points.append(np.linspace(X_min[i], X_max[i], num_points))
+    # Display results
+    st.markdown(f"**Optimal {display_name(target_column)}:** {optimal_y:.2f} {unit}")
+    stop_note = " (stopped early, no further improvement)" if solution["early_stopped"] else ""
+    st.caption(f"{solution['evaluations']} model evaluations{stop_note}")
     
-    # Create all combinations of input variables
-    grid = np.meshgrid(*grid_points)
-    grid_flat = [g.flatten() for g in grid]
-    X_grid = np.column_stack(grid_flat)
+    # Create dataframe for optimal values
+    optimal_df = pd.DataFrame({
+        'Parameter': display_variables,
+        'Optimal Value': optimal_X,
+        'Min Value': X_min,
+        'Max Value': X_max,
+        'Current %': (optimal_X - X_min) / (X_max - X_min) * 100
+    })
     
-    # Transform to polynomial features
-    X_grid_poly = poly.transform(X_grid)
+    # Display as table
+    profiling.dataframe(optimal_df)
     
-    # Make predictions for all grid points
-    y_grid = model.predict(X_grid_poly)
+    # Convergence of the search
+    fig = px.line(solution["history"], x='Evaluation', y='Best Loss', title='Search Convergence')
+    profiling.plotly_chart(fig, use_container_width=True)
     
-    # Find optimal point based on goal
-    if optimization_goal == "Maximize":
-        optimal_idx = np.argmax(y_grid)
-    elif optimization_goal == "Minimize":
-        optimal_idx = np.argmin(y_grid)
-    else:  # Target Value
-        optimal_idx = np.argmin(np.abs(y_grid - target_value))
+    st.subheader("Optimal Parameter Settings")
+    show_parameter_gauges(optimal_X, X_min, X_max, display_variables)
+
+@profiling.profiled("optimal values (polynomial)")
+def find_optimal_values_poly(poly, model, X, input_variables, display_variables, 
+                           target_column, optimization_goal, target_value, unit, constraint_set=None):
+    st.subheader("Optimal Process Parameters (Polynomial Model)")
+    
+    if constraint_set is not None:
+        # Operating constraints: SLSQP runs from feasible samples handle them exactly
+        X_min, X_max = constraint_set["lower"], constraint_set["upper"]
+        try:
+            solution = solvers.solve_model_constrained(poly, model, constraint_set, optimization_goal, target_value)
+        except ValueError as e:
+            st.error(str(e))
+            return
+    else:
+        # Get min and max values for each input variable
+        X_min = X.min(axis=0)
+        X_max = X.max(axis=0)
+        
+        # A memory-capped grid search locates the best region, then a multi-start bounded quasi-Newton
+        # search using the analytic gradient of the polynomial refines it
+        solution = solvers.solve_model(poly, model, X_min, X_max, optimization_goal, target_value)
     
     # Extract optimal values
-    optimal_X = X_grid[optimal_idx]
-    optimal_y = y_grid[optimal_idx]
+    optimal_X = solution["x"]
+    optimal_y = solution["y"]
     
     # Display results
-    st.markdown(f"**Optimal {target_column.replace('_', ' ').title()}:** {optimal_y:.2f} {unit}")
+    st.markdown(f"**Optimal {display_name(target_column)}:** {optimal_y:.2f} {unit}")
     
     # Create dataframe for optimal values
     optimal_df = pd.DataFrame({
@@ -419,205 +687,203 @@ def find_optimal_values_poly(poly, model, X, input_variables, display_variables,
     })
     
     # Display as table
-    st.dataframe(optimal_df)
+    profiling.dataframe(optimal_df)
     
     # Display optimal settings
     st.subheader("Optimal Parameter Settings")
     
-    # Create response surface plots for pairs of variables if we have more than one variable
+    # Response surfaces of every pair of variables, holding the others at the optimum
     if len(input_variables) >= 2:
-        # Choose first two variables for demonstration
-        var1_idx, var2_idx = 0, 1
-        var1, var2 = input_variables[var1_idx], input_variables[var2_idx]
-        var1_display, var2_display = display_variables[var1_idx], display_variables[var2_idx]
-        
-        # Create grid for these two variables
-        x_grid = np.linspace(X_min[var1_idx], X_max[var1_idx], 50)
-        y_grid = np.linspace(X_min[var2_idx], X_max[var2_idx], 50)
-        xx, yy = np.meshgrid(x_grid, y_grid)
-        
-        # For other variables, use the optimal value
-        grid_data = np.zeros((xx.size, len(input_variables)))
-        grid_data[:, var1_idx] = xx.flatten()
-        grid_data[:, var2_idx] = yy.flatten()
-        
-        # Fill other variables with optimal values
-        for i in range(len(input_variables)):
-            if i != var1_idx and i != var2_idx:
-                grid_data[:, i] = optimal_X[i]
-        
-        # Transform to polynomial and predict
-        grid_data_poly = poly.transform(grid_data)
-        z = model.predict(grid_data_poly).reshape(xx.shape)
-        
-        # Create contour plot
-        fig = go.Figure(data=
-            go.Contour(
-                z=z,
-                x=x_grid,
-                y=y_grid,
-                colorscale='Viridis',
-                colorbar=dict(title=target_column.replace('_', ' ').title())
-            )
+        # All pairs are evaluated in one batched prediction and cached with the user's data version
+        surface_key = (
+            "response_surfaces", target_column, tuple(input_variables), type(model).__name__,
+            poly.degree if poly is not None else 1, tuple(np.round(optimal_X, 9))
         )
-        
-        # Add optimal point
-        fig.add_trace(
-            go.Scatter(
-                x=[optimal_X[var1_idx]],
-                y=[optimal_X[var2_idx]],
-                mode='markers',
-                marker=dict(color='red', size=10),
-                name='Optimal Point'
-            )
+        surfaces = kpi_cache.get_cached(
+            st.session_state.username, surface_key,
+            lambda username: response_surface.pairwise_surfaces(poly, model, optimal_X, X_min, X_max)
         )
         
-        fig.update_layout(
-            title=f'Response Surface for {target_column.replace("_", " ").title()}',
-            xaxis_title=var1_display,
-            yaxis_title=var2_display
+        fig = response_surface.surface_matrix_figure(
+            surfaces, optimal_X, display_variables, display_name(target_column)
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        profiling.plotly_chart(fig, use_container_width=True)
     
     # Create gauge charts for each variable
-    for i in range(0, len(input_variables), 2):
-        cols = st.columns(2)
-        
-        for j in range(2):
-            if i + j < len(input_variables):
-                with cols[j]:
-                    # Calculate percentage within range
-                    var_idx = i + j
-                    var_range = X_max[var_idx] - X_min[var_idx]
-                    var_pct = (optimal_X[var_idx] - X_min[var_idx]) / var_range * 100 if var_range > 0 else 50
-                    
-                    # Create gauge chart
-                    fig = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=optimal_X[var_idx],
-                        title={'text': display_variables[var_idx]},
-                        gauge={
-                            'axis': {'range': [X_min[var_idx], X_max[var_idx]]},
-                            'bar': {'color': "darkblue"},
-                            'steps': [
-                                {'range': [X_min[var_idx], X_min[var_idx] + var_range*0.25], 'color': "lightgray"},
-                                {'range': [X_min[var_idx] + var_range*0.75, X_max[var_idx]], 'color': "lightgray"}
-                            ]
-                        }
-                    ))
-                    st.plotly_chart(fig, use_container_width=True)
+    show_parameter_gauges(optimal_X, X_min, X_max, display_variables)
 
-def show_industry_recommendations(field, target_column, input_variables, model, X, y, has_model=True):
+# Function to display the Sobol indices and partial dependence curves of the fitted model
+def show_sensitivity_analysis(analysis, input_variables, target_column):
+    st.subheader("Sensitivity Analysis")
+    
+    importance = analysis["importance"].copy()
+    importance['variable'] = importance['variable'].map(display_name)
+    indices = importance.melt(
+        id_vars='variable', value_vars=['first_order', 'total'], var_name='Index', value_name='Sobol Index'
+    )
+    indices['Index'] = indices['Index'].map({'first_order': 'First Order', 'total': 'Total Effect'})
+    fig = px.bar(indices, x='variable', y='Sobol Index', color='Index', barmode='group',
+                 labels={'variable': 'Parameter'}, title='Share of Predicted Variation per Parameter')
+    profiling.plotly_chart(fig, use_container_width=True)
+    
+    # Partial dependence curves, one panel per variable
+    curves = pd.concat([
+        pd.DataFrame({
+            'Parameter': display_name(input_variables[i]),
+            'Value': analysis["pd_grid"][i],
+            target_column: analysis["pd_values"][i]
+        })
+        for i in range(len(input_variables))
+    ], ignore_index=True)
+    fig = px.line(curves, x='Value', y=target_column, facet_col='Parameter', facet_col_wrap=3,
+                  title='Partial Dependence', labels={target_column: display_name(target_column)})
+    fig.update_xaxes(matches=None, showticklabels=True)
+    profiling.plotly_chart(fig, use_container_width=True)
+
+@profiling.profiled("industry recommendations")
+def show_industry_recommendations(field, target_column, input_variables, model, X, y, has_model=True, poly=None):
+    # Variable importance from a global sensitivity analysis of the fitted model
+    if has_model and len(input_variables) > 0:
+        analysis_key = (
+            "sensitivity", target_column, tuple(input_variables), type(model).__name__,
+            poly.degree if poly is not None else 1, tuple(np.ravel(getattr(model, "coef_", [])))
+        )
+        analysis = kpi_cache.get_cached(
+            st.session_state.username, analysis_key,
+            lambda username: sensitivity.analyze(poly, model, X, input_variables)
+        )
+        show_sensitivity_analysis(analysis, input_variables, target_column)
+    
     st.subheader("Industry-Specific Recommendations")
     
     recommendations = []
     
     # Common recommendations
-    if has_model:
-        # Identify most influential variables
-        coeffs = model.coef_
-        abs_coeffs = np.abs(coeffs)
-        sorted_idx = np.argsort(abs_coeffs)[::-1]  # Sort in descending order
-        
-        most_influential = input_variables[sorted_idx[0]] if len(input_variables) > 0 else None
-        second_influential = input_variables[sorted_idx[1]] if len(input_variables) > 1 else None
-        
-        # Add recommendation based on most influential variable
-        if most_influential:
-            influence_dir = "positive" if coeffs[sorted_idx[0]] > 0 else "negative"
-            recommendations.append(f"**{most_influential.replace('_', ' ').title()}** has the strongest {influence_dir} influence on {target_column.replace('_', ' ').title()}.")
+    if has_model and len(input_variables) > 0:
+        # Identify most influential variables by their share of the predicted variation
+        # A constant model or a negligible effect gives no variable worth recommending
+        importance = analysis["importance"]
+        effect_scale = max(float(np.max(np.abs(y))) if len(y) > 0 else 0.0, 1.0)
+        influential = importance[(importance['total'] >= MIN_REPORTED_INFLUENCE)
+                                 & (importance['effect_range'] > MIN_REPORTED_EFFECT * effect_scale)
+                                 & (importance['direction'] != "flat")]
+        
+        # Add recommendation based on the most influential variables
+        if len(influential) > 0:
+            most_influential = influential.iloc[0]
+            if most_influential['direction'] == "non-monotonic":
+                recommendations.append(
+                    f"**{display_name(most_influential['variable'])}** has the strongest influence on "
+                    f"{display_name(target_column)}, explaining {most_influential['total']:.0%} of its predicted variation; "
+                    f"its effect peaks or bottoms out inside the observed range, so an intermediate setting may be optimal rather than one end of the range."
+                )
+            else:
+                recommendations.append(
+                    f"**{display_name(most_influential['variable'])}** has the strongest {most_influential['direction']} "
+                    f"influence on {display_name(target_column)}, explaining {most_influential['total']:.0%} of its predicted variation."
+                )
+        if len(influential) > 1 and influential.iloc[1]['total'] > 0.05:
+            second_influential = influential.iloc[1]
+            effect = ("turning point inside the observed range" if second_influential['direction'] == "non-monotonic"
+                      else f"{second_influential['direction']} effect")
+            recommendations.append(
+                f"**{display_name(second_influential['variable'])}** is the next most influential variable "
+                f"({effect}, {second_influential['total']:.0%} of the variation)."
+            )
+    
+    # Industry-specific recommendations, keyed by the KPI type of the target and inputs
+    target_kpi = target_column.split('.', 1)[0]
+    input_names = {name for var in input_variables for name in var.split('.', 1)}
     
-    # Industry-specific recommendations
     if field == "Oil and Gas":
-        if target_column == "flow_efficiency":
+        if target_kpi == "flow_efficiency":
             recommendations.append("**Flow Efficiency Improvement**:")
             recommendations.append("- Ensure proper separator design and operation")
             recommendations.append("- Consider optimizing pressure drop across the system")
             recommendations.append("- Implement regular maintenance to prevent flow restrictions")
             
-            if "temperature" in input_variables:
+            if "temperature" in input_names:
                 recommendations.append("- Monitor and control process temperature for optimal separation")
             
-            if "pressure" in input_variables:
+            if "pressure" in input_names:
                 recommendations.append("- Maintain optimal pressure conditions for phase separation")
         
-        elif target_column == "energy_efficiency":
+        elif target_kpi == "energy_efficiency":
             recommendations.append("**Energy Efficiency Improvement**:")
             recommendations.append("- Evaluate heat integration opportunities")
             recommendations.append("- Implement energy recovery systems")
             recommendations.append("- Optimize compression and pumping operations")
             
-            if "inlet_flow" in input_variables:
+            if "inlet_flow" in input_names:
                 recommendations.append("- Optimize flow rates to balance throughput and energy consumption")
     
     elif field == "Food and Beverage":
-        if target_column == "yield_rate":
+        if target_kpi == "yield":
             recommendations.append("**Yield Rate Optimization**:")
             recommendations.append("- Ensure consistent raw material quality")
             recommendations.append("- Optimize process parameters for maximum conversion")
             recommendations.append("- Implement statistical process control")
             
-            if "raw_material" in input_variables:
+            if "raw_material" in input_names:
                 recommendations.append("- Consider raw material preparation techniques to improve processability")
                 
-        elif target_column == "waste_rate":
+        elif target_kpi == "defect_rate":
             recommendations.append("**Waste Reduction Strategies**:")
             recommendations.append("- Implement precision dosing systems")
             recommendations.append("- Optimize batch sizes to reduce leftover materials")
             recommendations.append("- Improve product handling procedures")
             
-            if "water_usage" in input_variables:
+            if "water_usage" in input_names:
                 recommendations.append("- Implement water recycling and reuse systems")
                 
-        elif target_column == "energy_efficiency":
+        elif target_kpi == "energy_efficiency":
             recommendations.append("**Energy Efficiency Improvement**:")
             recommendations.append("- Optimize cooking and cooling cycles")
             recommendations.append("- Implement heat recovery systems")
             recommendations.append("- Ensure proper equipment insulation")
     
     elif field == "Pharmaceutical":
-        if target_column == "yield_efficiency":
+        if target_kpi == "yield":
             recommendations.append("**Yield Optimization Strategies**:")
             recommendations.append("- Fine-tune reaction parameters for maximum API yield")
             recommendations.append("- Implement PAT (Process Analytical Technology)")
             recommendations.append("- Consider continuous manufacturing techniques")
             
-            if "batch_size" in input_variables:
+            if "batch_size" in input_names:
                 recommendations.append("- Evaluate optimal batch size for maximum yield efficiency")
                 
-        elif target_column == "production_rate":
+        elif target_kpi == "productivity":
             recommendations.append("**Production Rate Improvement**:")
             recommendations.append("- Reduce cycle times through process optimization")
             recommendations.append("- Identify and eliminate bottlenecks")
             recommendations.append("- Implement lean manufacturing principles")
             
-            if "cycle_time" in input_variables:
+            if "cycle_time" in input_names:
                 recommendations.append("- Focus on reducing cycle time which has significant impact on production rate")
                 
-        elif target_column == "right_first_time":
+        elif target_kpi == "fpy":
             recommendations.append("**Quality Improvement Strategies**:")
             recommendations.append("- Implement robust quality-by-design principles")
             recommendations.append("- Enhance operator training programs")
             recommendations.append("- Implement error-proofing mechanisms")
             
-            if "defect_rate" in input_variables:
+            if "defect_rate" in input_names:
                 recommendations.append("- Implement statistical process control to identify and address variations")
     
     else:  # Generic recommendations
-        if target_column == "efficiency":
+        if target_kpi == "oee":
             recommendations.append("**Efficiency Optimization Strategies**:")
             recommendations.append("- Conduct detailed process analysis to identify bottlenecks")
             recommendations.append("- Optimize process parameters")
             recommendations.append("- Consider automation opportunities")
             
-        elif target_column == "productivity":
+        elif target_kpi == "productivity":
             recommendations.append("**Productivity Improvement Strategies**:")
             recommendations.append("- Reduce cycle times through process optimization")
             recommendations.append("- Optimize resource allocation")
             recommendations.append("- Implement continuous improvement methodologies")
             
-        elif target_column == "energy_efficiency":
+        elif target_kpi == "energy_efficiency":
             recommendations.append("**Energy Efficiency Improvement**:")
             recommendations.append("- Conduct energy audit")
             recommendations.append("- Identify major energy consumers")
@@ -0,0 +1,42 @@
+import utils
+
+# Columns of the feature matrix that are not process measurements
+ID_COLUMNS = ["date", "process_name"]
+
+# Main metric columns of the feature matrix, e.g. oee.oee_value, mapped to their KPI type
+MAIN_METRIC_COLUMNS = {f"{kpi_type}.{metric}": kpi_type for kpi_type, metric in utils.KPI_MAIN_METRICS.items()}
+
+# Targets where lower is better
+MINIMIZED_TARGETS = {
+    column for column, kpi_type in MAIN_METRIC_COLUMNS.items() if kpi_type in utils.KPI_LOWER_IS_BETTER
+}
+
+# Number of input variables selected by default
+DEFAULT_INPUT_COUNT = 2
+
+# Function to get the display name of a namespaced feature column, e.g. oee.availability -> Oee: Availability
+def display_name(column):
+    return column.replace('.', ': ').replace('_', ' ').title()
+
+# Function to get the optimization targets and input variables available in a user's feature matrix
+# Targets are the main metrics of the KPI types entered; every other measured column can be an input
+def get_optimization_targets(df):
+    columns = [col for col in df.columns if col not in ID_COLUMNS]
+    target_columns = [col for col in columns if col in MAIN_METRIC_COLUMNS] or columns
+    
+    # The most populated measurements come first among the default inputs
+    inputs = [col for col in columns if col not in MAIN_METRIC_COLUMNS] or columns
+    counts = df[inputs].notna().sum()
+    
+    return {
+        "targets": {
+            display_name(col): (col, utils.KPI_MAIN_UNITS.get(MAIN_METRIC_COLUMNS.get(col), ""))
+            for col in target_columns
+        },
+        "inputs": columns,
+        "default_inputs": list(counts.sort_values(ascending=False, kind='stable').index)
+    }
+
+# Function to get the default input variables for the selected targets
+def get_default_inputs(targets, target_columns):
+    return [col for col in targets["default_inputs"] if col not in target_columns][:DEFAULT_INPUT_COUNT]
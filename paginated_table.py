@@ -0,0 +1,89 @@
+import streamlit as st
+import pandas as pd
+import profiling
+
+# Page sizes offered to the user
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250]
+
+# Control labels for the pages using the component
+LABELS = {
+    "fr": {
+        "sort": "Trier par", "order": "Ordre", "descending": "Décroissant", "ascending": "Croissant",
+        "page_size": "Lignes par page", "empty": "Aucune donnée à afficher",
+        "previous": "← Précédent", "next": "Suivant →", "page": "Page"
+    },
+    "en": {
+        "sort": "Sort by", "order": "Order", "descending": "Descending", "ascending": "Ascending",
+        "page_size": "Rows per page", "empty": "No data to display",
+        "previous": "← Previous", "next": "Next →", "page": "Page"
+    }
+}
+
+# Function to reset the pagination of a table to its first page
+def _reset_pages(key):
+    st.session_state[f"{key}_cursors"] = [None]
+
+# Function to move to the next page, remembering the cursor of the page being left
+def _next_page(key, cursor):
+    st.session_state[f"{key}_cursors"].append(cursor)
+
+# Function to go back one page
+def _previous_page(key):
+    cursors = st.session_state[f"{key}_cursors"]
+    if len(cursors) > 1:
+        cursors.pop()
+
+# Function to display a table one page at a time; only the current page is fetched and sent to the browser
+# fetch_page(sort_column, descending, after, page_size) returns (rows, has_next) from a keyset-paginated query
+# sort_options maps sort column -> label; filter_key changes whenever the caller's filters change
+def show_paginated_table(key, fetch_page, sort_options, format_rows=None, filter_key=None,
+                         page_size_options=None, language="fr"):
+    page_size_options = page_size_options or PAGE_SIZE_OPTIONS
+    labels = LABELS[language]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_column = st.selectbox(
+            labels["sort"], list(sort_options.keys()), format_func=sort_options.get, key=f"{key}_sort"
+        )
+    with col2:
+        descending = st.radio(
+            labels["order"], [True, False], format_func=lambda d: labels["descending"] if d else labels["ascending"],
+            horizontal=True, key=f"{key}_descending"
+        )
+    with col3:
+        page_size = st.selectbox(labels["page_size"], page_size_options, index=1, key=f"{key}_page_size")
+
+    # Any change of sort, page size or filters starts again from the first page
+    signature = (sort_column, descending, page_size, filter_key)
+    if st.session_state.get(f"{key}_signature") != signature or f"{key}_cursors" not in st.session_state:
+        st.session_state[f"{key}_signature"] = signature
+        _reset_pages(key)
+
+    cursors = st.session_state[f"{key}_cursors"]
+    rows, has_next = fetch_page(sort_column, descending, cursors[-1], page_size)
+
+    if not rows:
+        st.info(labels["empty"])
+        return
+
+    page_df = format_rows(rows) if format_rows else pd.DataFrame(rows)
+    profiling.dataframe(page_df, use_container_width=True, hide_index=True)
+
+    # Cursor of the last row, used by the next page query
+    last_row = rows[-1]
+    next_cursor = (last_row[sort_column], last_row["id"])
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button(
+            labels["previous"], key=f"{key}_previous", disabled=len(cursors) == 1,
+            on_click=_previous_page, args=(key,)
+        )
+    with col2:
+        st.caption(f"{labels['page']} {len(cursors)}")
+    with col3:
+        st.button(
+            labels["next"], key=f"{key}_next", disabled=not has_next,
+            on_click=_next_page, args=(key, next_cursor)
+        )
@@ -0,0 +1,71 @@
+import numpy as np
+import sampling
+
+# Number of candidate points screened at once against the current front
+PARETO_BLOCK_SIZE = 2048
+
+# Function to flag the non-dominated rows of an objective matrix (all objectives minimized)
+# After a lexicographic sort a point can only be dominated by points before it
+def pareto_front_mask(F, block_size=PARETO_BLOCK_SIZE):
+    F = np.asarray(F, dtype=float)
+    order = np.lexsort(F.T[::-1])
+    sorted_F = F[order]
+
+    if F.shape[1] == 2:
+        # Two objectives: a point is on the front when it beats the best second objective seen so far
+        previous_best = np.concatenate([[np.inf], np.minimum.accumulate(sorted_F[:-1, 1])])
+        on_front = sorted_F[:, 1] < previous_best
+    else:
+        on_front = _front_by_blocks(sorted_F, block_size)
+
+    mask = np.zeros(len(F), dtype=bool)
+    mask[order[on_front]] = True
+    return mask
+
+# Function to check whether the rows of a are dominated by any row of b
+def _dominated_by(a, b):
+    return np.any(
+        np.all(b[:, None, :] <= a[None, :, :], axis=2) & np.any(b[:, None, :] < a[None, :, :], axis=2),
+        axis=0
+    )
+
+# Function to screen lexicographically sorted points block by block, first against the front found so far
+# (usually small) and then against the remaining points of their own block
+def _front_by_blocks(sorted_F, block_size):
+    on_front = np.zeros(len(sorted_F), dtype=bool)
+    front = sorted_F[:0]
+
+    for start in range(0, len(sorted_F), block_size):
+        block = sorted_F[start:start + block_size]
+        candidates = np.arange(len(block))
+        if len(front):
+            candidates = candidates[~_dominated_by(block, front)]
+
+        # Duplicates keep their first occurrence, on the front or in the block
+        _, first = np.unique(block[candidates], axis=0, return_index=True)
+        candidates = candidates[np.sort(first)]
+        if len(front) and len(candidates):
+            candidates = candidates[~np.any(np.all(front[:, None, :] == block[candidates][None, :, :], axis=2), axis=0)]
+
+        candidates = candidates[~_dominated_by(block[candidates], block[candidates])]
+        on_front[start + candidates] = True
+        front = np.vstack([front, block[candidates]])
+
+    return on_front
+
+# Function to sample the input box and find the Pareto-optimal candidates of several fitted models
+# models is a list of (poly, model) pairs; maximize is a list of booleans, one per model
+# Returns the candidate inputs, their predicted targets and the mask of the Pareto front
+def compute_pareto_front(models, lower, upper, maximize, n_samples=20000, seed=0):
+    X = sampling.latin_hypercube(n_samples, lower, upper, seed)
+
+    predictions = np.column_stack([
+        model.predict(poly.transform(X) if poly is not None else X)
+        for poly, model in models
+    ])
+
+    # Turn every objective into a minimization
+    signs = np.where(np.asarray(maximize), -1.0, 1.0)
+    mask = pareto_front_mask(predictions * signs)
+
+    return X, predictions, mask
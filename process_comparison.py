@@ -0,0 +1,47 @@
+import pandas as pd
+import database
+
+# Statistics returned for every (group, metric) pair
+COMPARISON_STATS = ["mean", "std", "count"]
+
+# Function to get an already pivoted group x metric matrix computed in PostgreSQL
+# Columns are a (metric, stat) MultiIndex; only the top_n groups on sort_metric are loaded
+def get_comparison_matrix(group_by="process_name", username=None, source="kpi_data",
+                          sort_metric=None, ascending=False, top_n=None, stats=None):
+    stats = stats or COMPARISON_STATS
+    rows = database.get_kpi_metric_aggregates(group_by, username, source, sort_metric, ascending, top_n)
+    if not rows:
+        return pd.DataFrame()
+
+    # The long result is groups x metrics rows, never the raw entries
+    long = pd.DataFrame(rows)
+    matrix = long.pivot(index='group_key', columns='metric', values=stats)
+    matrix = matrix.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+    matrix.index.name = group_by or "all"
+    matrix.columns.names = ["metric", "stat"]
+
+    if sort_metric and (sort_metric, "mean") in matrix.columns:
+        matrix = matrix.sort_values((sort_metric, "mean"), ascending=ascending, na_position='last')
+
+    return matrix
+
+# Function to get one statistic of the matrix as a plain group x metric frame
+def get_stat(matrix, stat="mean"):
+    if matrix.empty:
+        return matrix
+    return matrix.xs(stat, axis=1, level="stat")
+
+# Function to flatten the matrix columns for display, e.g. "efficiency (mean)"
+def flatten_columns(matrix):
+    flat = matrix.copy()
+    flat.columns = [f"{metric} ({stat})" for metric, stat in matrix.columns]
+    return flat
+
+# Function to get describe()-like summary statistics of every metric in SQL
+def get_summary_statistics(username=None, source="kpi_data"):
+    matrix = get_comparison_matrix(
+        group_by=None, username=username, source=source, stats=["count", "mean", "std", "min", "max"]
+    )
+    if matrix.empty:
+        return matrix
+    return matrix.iloc[0].unstack("stat")[["count", "mean", "std", "min", "max"]].T
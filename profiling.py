@@ -0,0 +1,152 @@
+import json
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import streamlit as st
+import pandas as pd
+
+# Records of the script run being profiled; each Streamlit session runs its script in its own thread
+_local = threading.local()
+
+# Function to start profiling a script run; nothing is recorded when disabled
+def start_run(enabled):
+    _local.run = {"started_at": datetime.now(), "sections": [], "stack": []} if enabled else None
+
+# Function to check whether the current script run is being profiled
+def is_active():
+    return getattr(_local, "run", None) is not None
+
+def _new_record(name, depth, checkpoint=False):
+    return {
+        "section": name, "depth": depth, "checkpoint": checkpoint, "start": time.perf_counter(),
+        "wall_ms": 0.0, "db_ms": 0.0, "queries": 0, "rows": 0, "render_ms": 0.0, "payload_bytes": 0
+    }
+
+def _close(record):
+    record["wall_ms"] = (time.perf_counter() - record["start"]) * 1000
+
+# Function to close the open checkpoint of the innermost section, if any
+def _close_checkpoint(run):
+    if run["stack"] and run["stack"][-1]["checkpoint"]:
+        _close(run["stack"].pop())
+
+# Context manager timing a page or a section; DB time, rows and payload are counted for every open section
+@contextmanager
+def section(name):
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield
+        return
+
+    record = _new_record(name, len(run["stack"]))
+    run["sections"].append(record)
+    run["stack"].append(record)
+    try:
+        yield
+    finally:
+        # Checkpoints opened inside the section end with it
+        _close_checkpoint(run)
+        if record in run["stack"]:
+            run["stack"].remove(record)
+        _close(record)
+
+# Decorator profiling every call of a function as a section
+def profiled(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Function to start a sequential section that lasts until the next checkpoint or the end of the enclosing section
+def checkpoint(name):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+
+    _close_checkpoint(run)
+    record = _new_record(name, len(run["stack"]), checkpoint=True)
+    run["sections"].append(record)
+    run["stack"].append(record)
+
+# Function to record one database round trip
+def record_query(seconds, rows):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+
+    for record in run["stack"]:
+        record["db_ms"] += seconds * 1000
+        record["queries"] += 1
+        record["rows"] += rows
+
+# Function to record the serialization time and size of an element sent to the browser
+def record_payload(seconds, num_bytes):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+
+    for record in run["stack"]:
+        record["render_ms"] += seconds * 1000
+        record["payload_bytes"] += num_bytes
+
+# Function to display a Plotly figure, measuring its serialized size while profiling
+def plotly_chart(fig, container=None, **kwargs):
+    container = container or st
+    if not is_active():
+        return container.plotly_chart(fig, **kwargs)
+
+    start = time.perf_counter()
+    num_bytes = len(fig.to_json())
+    result = container.plotly_chart(fig, **kwargs)
+    record_payload(time.perf_counter() - start, num_bytes)
+    return result
+
+# Function to display a DataFrame, measuring its in-memory size while profiling
+def dataframe(df, container=None, **kwargs):
+    container = container or st
+    if not is_active():
+        return container.dataframe(df, **kwargs)
+
+    start = time.perf_counter()
+    num_bytes = int(df.memory_usage(deep=True).sum()) if isinstance(df, pd.DataFrame) else 0
+    result = container.dataframe(df, **kwargs)
+    record_payload(time.perf_counter() - start, num_bytes)
+    return result
+
+# Function to get the breakdown of the current run; "other" is the time spent outside DB and rendering
+def get_report():
+    run = getattr(_local, "run", None)
+    if run is None or not run["sections"]:
+        return pd.DataFrame()
+
+    report = pd.DataFrame(run["sections"]).drop(columns=["start", "checkpoint"])
+
+    report["other_ms"] = (report["wall_ms"] - report["db_ms"] - report["render_ms"]).clip(lower=0)
+    report["section"] = ["  " * depth + name for depth, name in zip(report["depth"], report["section"])]
+    return report.drop(columns=["depth"]).round(1)
+
+# Function to display the profiling breakdown inline with a JSON export
+def show_report():
+    report = get_report()
+    if report.empty:
+        return
+
+    with st.expander("Profiling", expanded=True):
+        st.dataframe(report, use_container_width=True, hide_index=True)
+
+        export = {
+            "page": st.session_state.get("page"),
+            "started_at": _local.run["started_at"].isoformat(),
+            "sections": report.assign(section=report["section"].str.strip()).to_dict("records")
+        }
+        st.download_button(
+            "Export JSON",
+            json.dumps(export, indent=2),
+            file_name=f"profile_{export['page']}_{_local.run['started_at']:%Y%m%d_%H%M%S}.json",
+            mime="application/json"
+        )
@@ -0,0 +1,68 @@
+import itertools
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Grid points per axis of every pairwise surface
+SURFACE_RESOLUTION = 40
+
+# Function to evaluate the response surface of every pair of variables in one batched prediction
+# Variables outside the pair are held at base_X; returns the pairs, the axis grids and a (pairs x R x R) array
+def pairwise_surfaces(poly, model, base_X, X_min, X_max, resolution=SURFACE_RESOLUTION):
+    base_X = np.asarray(base_X, dtype=float)
+    num_variables = len(base_X)
+    pairs = list(itertools.combinations(range(num_variables), 2))
+    axes = np.linspace(X_min, X_max, resolution).T  # (variables x R)
+
+    # Stacked grid tensor (pairs x R x R x variables) filled with the base point
+    grid = np.broadcast_to(base_X, (len(pairs), resolution, resolution, num_variables)).copy()
+    first = np.array([i for i, _ in pairs])
+    second = np.array([j for _, j in pairs])
+    p = np.arange(len(pairs))[:, None, None]
+    rows = np.arange(resolution)[None, :, None]
+    cols = np.arange(resolution)[None, None, :]
+
+    # The first variable of a pair varies along the columns, the second along the rows
+    grid[p, rows, cols, first[:, None, None]] = axes[first][:, None, :]
+    grid[p, rows, cols, second[:, None, None]] = axes[second][:, :, None]
+
+    flat = grid.reshape(-1, num_variables)
+    z = model.predict(poly.transform(flat) if poly is not None else flat)
+
+    return {"pairs": pairs, "axes": axes, "z": z.reshape(len(pairs), resolution, resolution)}
+
+# Function to draw the surfaces as a lower-triangular contour matrix with the optimal point on each panel
+def surface_matrix_figure(surfaces, optimal_X, display_variables, target_label):
+    num_variables = len(display_variables)
+    size = num_variables - 1
+    fig = make_subplots(rows=size, cols=size, horizontal_spacing=0.04, vertical_spacing=0.04)
+
+    z_min = float(surfaces["z"].min())
+    z_max = float(surfaces["z"].max())
+
+    for k, (i, j) in enumerate(surfaces["pairs"]):
+        # Panel (row j, column i): x is variable i, y is variable j
+        row, col = j, i + 1
+        fig.add_trace(go.Contour(
+            z=surfaces["z"][k], x=surfaces["axes"][i], y=surfaces["axes"][j],
+            colorscale='Viridis', zmin=z_min, zmax=z_max, showscale=k == 0,
+            colorbar=dict(title=target_label)
+        ), row=row, col=col)
+        fig.add_trace(go.Scatter(
+            x=[optimal_X[i]], y=[optimal_X[j]], mode='markers',
+            marker=dict(color='red', size=8), name='Optimal Point', showlegend=k == 0
+        ), row=row, col=col)
+
+        if row == size:
+            fig.update_xaxes(title_text=display_variables[i], row=row, col=col)
+        if col == 1:
+            fig.update_yaxes(title_text=display_variables[j], row=row, col=col)
+
+    # Hide the empty upper triangle
+    for row in range(1, size + 1):
+        for col in range(row + 1, size + 1):
+            fig.update_xaxes(visible=False, row=row, col=col)
+            fig.update_yaxes(visible=False, row=row, col=col)
+
+    fig.update_layout(height=max(400, 260 * size), title=f'Response Surfaces for {target_label}')
+    return fig
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Function to draw a Latin hypercube design over the box [lower, upper]
+# Every variable's range is split into n equal strata and each stratum is sampled exactly once
+def latin_hypercube(n, lower, upper, seed=None):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    strata = rng.permuted(np.tile(np.arange(n), (len(lower), 1)), axis=1).T
+    unit = (strata + rng.random((n, len(lower)))) / n
+    return lower + unit * (upper - lower)
+
+# Row count above which models are fitted and plotted on a stratified sample
+MAX_FIT_ROWS = 20_000
+
+# Target quantile bins per process used as strata
+TARGET_STRATA = 5
+
+# z value of the reported error bound (95% confidence)
+ERROR_BOUND_Z = 1.96
+
+# Function to draw a stratified sample of n positions with proportional allocation
+# Every stratum keeps at least one row, the remaining rows are shared by largest remainder
+def stratified_indices(codes, n, seed=None):
+    codes = np.asarray(codes)
+    counts = np.bincount(codes)
+    present = counts > 0
+
+    allocation = present.astype(int)
+    share = max(n - allocation.sum(), 0) * counts / counts.sum()
+    allocation += np.floor(share).astype(int)
+    remainder = n - allocation.sum()
+    if remainder > 0:
+        allocation[np.argsort(-(share - np.floor(share)), kind='stable')[:remainder]] += 1
+    allocation = np.minimum(allocation, counts)
+
+    # Rows grouped by stratum (a stable integer sort), then allocation[h] positions drawn from each slice
+    rng = np.random.default_rng(seed)
+    order = np.argsort(codes, kind='stable')
+    starts = np.cumsum(counts) - counts
+    selected = np.concatenate([
+        order[start + rng.choice(count, size, replace=False)]
+        for start, count, size in zip(starts, counts, allocation) if size > 0
+    ])
+    return np.sort(selected), allocation
+
+# Function to reduce a frame to at most max_rows rows stratified by group and target level
+# The rows holding the minimum and maximum of each column are always kept, so the sample spans the
+# observed ranges; returns the sample and its sampling ratio with a 95% error bound on the mean target
+def stratified_sample(df, target_column, columns, group_column=None, max_rows=MAX_FIT_ROWS, seed=0):
+    num_rows = len(df)
+    if num_rows <= max_rows:
+        return df, {"rows": num_rows, "sample_rows": num_rows, "ratio": 1.0, "error_bound": 0.0}
+
+    y = df[target_column].to_numpy(dtype=float)
+    group_codes = pd.factorize(df[group_column])[0] if group_column is not None else np.zeros(num_rows, dtype=int)
+
+    # Strata are the groups crossed with the target quantile bins
+    edges = np.quantile(y, np.linspace(0, 1, TARGET_STRATA + 1)[1:-1])
+    codes = group_codes * TARGET_STRATA + np.searchsorted(edges, y)
+
+    extremes = np.concatenate([
+        [np.argmin(values), np.argmax(values)] for values in df[columns].to_numpy(dtype=float).T
+    ])
+    selected, allocation = stratified_indices(codes, max_rows - len(extremes), seed)
+    selected = np.union1d(selected, extremes)
+
+    # Standard error of the stratified mean: sum of W_h² (1 - n_h / N_h) s_h² / n_h over the non-empty strata
+    present = np.flatnonzero(np.bincount(codes))
+    counts = np.bincount(codes)[present]
+    sums = np.bincount(codes, y)[present]
+    squares = np.bincount(codes, y ** 2)[present]
+    taken = allocation[present]
+    variances = np.where(counts > 1, np.maximum(squares - sums ** 2 / counts, 0) / np.maximum(counts - 1, 1), 0.0)
+    weights = counts / num_rows
+    standard_error = np.sqrt(np.sum(weights ** 2 * (1 - taken / counts) * variances / taken))
+
+    return df.iloc[selected], {
+        "rows": num_rows,
+        "sample_rows": len(selected),
+        "ratio": len(selected) / num_rows,
+        "error_bound": float(ERROR_BOUND_Z * standard_error)
+    }
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import sampling
+
+# Total number of model evaluations of the Sobol analysis (N * (variables + 2))
+DEFAULT_SAMPLE_BUDGET = 100_000
+
+# Rows per prediction batch sent to a worker process
+EVALUATION_BATCH_SIZE = 50_000
+
+# Grid points and background rows of the partial dependence curves
+PD_GRID_POINTS = 25
+PD_BACKGROUND_ROWS = 300
+
+# Share of its range a partial dependence curve must move against its main direction to be non-monotonic
+MONOTONIC_TOLERANCE = 0.05
+
+# Function to predict a batch of raw input rows (runs in a worker process when a pool is used)
+def _predict_batch(args):
+    poly, model, X = args
+    return model.predict(poly.transform(X) if poly is not None else X)
+
+# Function to evaluate a model on many rows in batches, optionally in a process pool
+def evaluate_batched(poly, model, X, max_workers=None):
+    batches = [X[start:start + EVALUATION_BATCH_SIZE] for start in range(0, len(X), EVALUATION_BATCH_SIZE)]
+
+    if max_workers and max_workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_predict_batch, [(poly, model, batch) for batch in batches]))
+    else:
+        results = [_predict_batch((poly, model, batch)) for batch in batches]
+
+    return np.concatenate(results)
+
+# Function to compute first-order and total Sobol indices with Saltelli sampling
+# The N base rows of matrices A and B are Latin hypercube samples of the box; all N * (d + 2)
+# rows (A, B and every A with column i taken from B) are evaluated in batched predictions
+def sobol_indices(poly, model, lower, upper, sample_budget=DEFAULT_SAMPLE_BUDGET, max_workers=None, seed=0):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    num_variables = len(lower)
+    n = max(sample_budget // (num_variables + 2), 16)
+
+    A = sampling.latin_hypercube(n, lower, upper, seed)
+    B = sampling.latin_hypercube(n, lower, upper, seed + 1)
+    AB = np.repeat(A[None, :, :], num_variables, axis=0)
+    AB[np.arange(num_variables), :, np.arange(num_variables)] = B.T
+
+    f = evaluate_batched(poly, model, np.vstack([A, B, AB.reshape(-1, num_variables)]), max_workers)
+    f_A, f_B, f_AB = f[:n], f[n:2 * n], f[2 * n:].reshape(num_variables, n)
+
+    variance = np.var(np.concatenate([f_A, f_B]))
+    if variance <= 0:
+        zeros = np.zeros(num_variables)
+        return zeros, zeros
+
+    # Saltelli (2010) first-order and Jansen total-effect estimators
+    first_order = np.mean(f_B * (f_AB - f_A), axis=1) / variance
+    total = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / variance
+    return np.clip(first_order, 0, 1), np.clip(total, 0, 1)
+
+# Function to compute the partial dependence curve of every variable in one batched prediction
+# Returns the grid (variables x G) and the average prediction over the background rows at each grid value
+def partial_dependence(poly, model, X, lower, upper, grid_points=PD_GRID_POINTS,
+                       background_rows=PD_BACKGROUND_ROWS, max_workers=None, seed=0):
+    X = np.asarray(X, dtype=float)
+    num_variables = X.shape[1]
+    rng = np.random.default_rng(seed)
+    background = X[rng.choice(len(X), min(len(X), background_rows), replace=False)]
+
+    grid = np.linspace(lower, upper, grid_points).T  # (variables x G)
+
+    # Tensor (variables x G x background x variables) with variable i set to each grid value
+    tensor = np.broadcast_to(background, (num_variables, grid_points) + background.shape).copy()
+    variables = np.arange(num_variables)
+    tensor[variables, :, :, variables] = grid[:, :, None]
+
+    predictions = evaluate_batched(poly, model, tensor.reshape(-1, num_variables), max_workers)
+    return grid, predictions.reshape(num_variables, grid_points, len(background)).mean(axis=2)
+
+# Function to run the full sensitivity analysis of a fitted model over the data range
+# Returns a table of the variables ranked by total Sobol index with the direction of their effect
+def analyze(poly, model, X, input_variables, sample_budget=DEFAULT_SAMPLE_BUDGET, max_workers=None):
+    X = np.asarray(X, dtype=float)
+    lower, upper = X.min(axis=0), X.max(axis=0)
+
+    first_order, total = sobol_indices(poly, model, lower, upper, sample_budget, max_workers)
+    grid, pd_values = partial_dependence(poly, model, X, lower, upper, max_workers=max_workers)
+
+    # Direction of the effect from the rises and falls along the partial dependence curve; a curve that
+    # moves both ways by more than MONOTONIC_TOLERANCE of its range (e.g. an interior optimum) is non-monotonic
+    steps = np.diff(pd_values, axis=1)
+    rise = np.clip(steps, 0, None).sum(axis=1)
+    fall = -np.clip(steps, None, 0).sum(axis=1)
+    effect_range = pd_values.max(axis=1) - pd_values.min(axis=1)
+    tolerance = MONOTONIC_TOLERANCE * effect_range
+    direction = np.select(
+        [effect_range <= 0, (rise > tolerance) & (fall > tolerance), rise >= fall],
+        ["flat", "non-monotonic", "positive"],
+        "negative"
+    )
+
+    importance = pd.DataFrame({
+        "variable": input_variables,
+        "first_order": first_order,
+        "total": total,
+        "direction": direction,
+        "effect_range": effect_range
+    }).sort_values("total", ascending=False).reset_index(drop=True)
+
+    return {"importance": importance, "pd_grid": grid, "pd_values": pd_values}
@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from scipy import signal
 import plotly.graph_objects as go
 import plotly.express as px
 import time
 from datetime import datetime, timedelta
 import database
+import profiling
 
 def show_simulation():
     st.title("Process Simulation")
@@ -215,27 +217,20 @@ def get_generic_simulation_params():
         "mixing_factor": mixing_factor
     }
 
-# Function to run the simulation
-def run_simulation(params, duration, speed_multiplier, disturbance_type, disturbance_magnitude, 
-                   disturbance_time, line_chart_placeholder, gauge_chart_placeholder, field):
-    # Convert duration to seconds for simulation
-    duration_seconds = duration * 60
-    
-    # Calculate number of data points based on speed
-    num_points = int(duration_seconds / (1/speed_multiplier))
-    
-    # Initialize time points
-    time_points = np.linspace(0, duration_seconds, num_points)
-    
-    # Initialize data arrays
-    input_values = np.ones(num_points)
-    output_values = np.ones(num_points)
-    efficiency_values = np.ones(num_points)
-    
-    # Calculate disturbance point
-    disturbance_point = int(num_points * disturbance_time / 100)
-    
-    # Create base values based on industry
+# First-order dynamics per industry: (time constant per step, noise standard deviation relative to the base output)
+# Pharmaceutical processes respond slowly with little noise (tight control); food processes respond fastest
+FIRST_ORDER_DYNAMICS = {
+    "Oil and Gas": (0.1, 0.01),
+    "Food and Beverage": (0.05, 0.02),
+    "Pharmaceutical": (0.03, 0.005)
+}
+GENERIC_DYNAMICS = (0.08, 0.015)
+
+# Number of chart refreshes while a simulation is replayed
+CHART_FRAMES = 50
+
+# Function to get the steady-state input and output of a process from its parameters
+def get_base_values(params, field):
     if field == "Oil and Gas":
         base_input = params["inlet_flow"]
         base_output = base_input * (0.8 + 0.1 * params["separator_pressure"] / 30)
@@ -271,18 +266,62 @@ def run_simulation(params, duration, speed_multiplier, disturbance_type, disturb
         
         base_output = base_input * 0.7 * temp_factor * pressure_factor
     
-    # Set initial values
-    input_values[0] = base_input
+    return base_input, base_output
+
+# Function to compute a whole simulation run at once
+# The disturbance and noise are drawn as vectors and the first-order response
+# o[i] = o[i-1] + (drive[i] - o[i-1]) * k + noise[i] is applied as an IIR filter
+def simulate_process(params, field, num_points, disturbance_type, disturbance_magnitude, disturbance_time,
+                     duration_seconds, seed=None):
+    rng = np.random.default_rng(seed)
+    base_input, base_output = get_base_values(params, field)
+    time_constant, noise_level = FIRST_ORDER_DYNAMICS.get(field, GENERIC_DYNAMICS)
+    magnitude = disturbance_magnitude / 100
+    
+    # Disturbance of the input; the first point is always the steady state
+    steps = np.arange(num_points)
+    if disturbance_type == "Step Change":
+        disturbance_point = int(num_points * disturbance_time / 100)
+        input_factor = np.where(steps >= disturbance_point, 1 + magnitude, 1.0)
+    elif disturbance_type == "Random Fluctuation":
+        input_factor = 1 + (rng.random(num_points) - 0.5) * 2 * magnitude
+    elif disturbance_type == "Sinusoidal":
+        input_factor = 1 + np.sin(steps / num_points * 10 * np.pi) * magnitude
+    else:
+        input_factor = np.ones(num_points)
+    input_factor[0] = 1.0
+    input_values = base_input * input_factor
+    
+    # First-order response to the disturbed input, starting from the steady-state output
+    output_values = np.empty(num_points)
     output_values[0] = base_output
-    efficiency_values[0] = (output_values[0] / input_values[0]) * 100
-    
-    # Create empty dataframe for visualization
-    df = pd.DataFrame({
-        'Time': [0],
-        'Input': [input_values[0]],
-        'Output': [output_values[0]],
-        'Efficiency': [efficiency_values[0]]
+    if num_points > 1:
+        drive = time_constant * base_output * input_factor[1:] + rng.normal(0, base_output * noise_level, num_points - 1)
+        output_values[1:] = signal.lfilter(
+            [1.0], [1.0, -(1 - time_constant)], drive, zi=[(1 - time_constant) * base_output]
+        )[0]
+    
+    return pd.DataFrame({
+        'Time': np.linspace(0, duration_seconds, num_points),
+        'Input': input_values,
+        'Output': output_values,
+        'Efficiency': output_values / input_values * 100
     })
+
+# Function to run the simulation
+@profiling.profiled("run simulation")
+def run_simulation(params, duration, speed_multiplier, disturbance_type, disturbance_magnitude, 
+                   disturbance_time, line_chart_placeholder, gauge_chart_placeholder, field):
+    # Convert duration to seconds for simulation
+    duration_seconds = duration * 60
+    
+    # Calculate number of data points based on speed
+    num_points = int(duration_seconds / (1/speed_multiplier))
+    
+    # The run is computed at once, then replayed on the charts
+    df = simulate_process(params, field, num_points, disturbance_type, disturbance_magnitude, disturbance_time,
+                          duration_seconds)
+    efficiency_values = df['Efficiency'].to_numpy()
     
     # Function for updating chart
     def create_line_chart(df):
@@ -312,76 +351,18 @@ def run_simulation(params, duration, speed_multiplier, disturbance_type, disturb
         return fig
     
     # Display initial charts
-    line_chart_placeholder.plotly_chart(create_line_chart(df), use_container_width=True)
-    gauge_chart_placeholder.plotly_chart(create_gauge_chart(efficiency_values[0]), use_container_width=True)
-    
-    # Simulation loop
-    for i in range(1, num_points):
-        # Apply disturbance to input
-        if disturbance_type == "Step Change" and i >= disturbance_point:
-            disturbance_factor = 1 + (disturbance_magnitude / 100)
-            input_values[i] = base_input * disturbance_factor
-        elif disturbance_type == "Random Fluctuation":
-            random_factor = 1 + (np.random.random() - 0.5) * 2 * (disturbance_magnitude / 100)
-            input_values[i] = base_input * random_factor
-        elif disturbance_type == "Sinusoidal":
-            sin_factor = 1 + np.sin(i/num_points * 10 * np.pi) * (disturbance_magnitude / 100)
-            input_values[i] = base_input * sin_factor
-        else:
-            input_values[i] = base_input
+    profiling.plotly_chart(create_line_chart(df.iloc[:1]), container=line_chart_placeholder, use_container_width=True)
+    profiling.plotly_chart(create_gauge_chart(efficiency_values[0]), container=gauge_chart_placeholder, use_container_width=True)
+    
+    # Replay the run a few frames at a time to avoid excessive rendering
+    frame_step = max(1, int(num_points / CHART_FRAMES))
+    frame_ends = sorted(set(range(frame_step, num_points, frame_step)) | {num_points - 1} - {0})
+    for i in frame_ends:
+        profiling.plotly_chart(create_line_chart(df.iloc[:i + 1]), container=line_chart_placeholder, use_container_width=True)
+        profiling.plotly_chart(create_gauge_chart(efficiency_values[i]), container=gauge_chart_placeholder, use_container_width=True)
         
-        # Calculate output with some dynamics (first-order response)
-        if field == "Oil and Gas":
-            # First order response with time constant
-            time_constant = 0.1  # Faster response
-            output_values[i] = output_values[i-1] + (base_output * (input_values[i] / base_input) - output_values[i-1]) * time_constant
-            
-            # Add some noise
-            output_values[i] += np.random.normal(0, base_output * 0.01)
-            
-        elif field == "Food and Beverage":
-            # First order response with time constant
-            time_constant = 0.05  # Even faster response
-            output_values[i] = output_values[i-1] + (base_output * (input_values[i] / base_input) - output_values[i-1]) * time_constant
-            
-            # Add some noise
-            output_values[i] += np.random.normal(0, base_output * 0.02)
-            
-        elif field == "Pharmaceutical":
-            # First order response with time constant
-            time_constant = 0.03  # Slow response (pharmaceutical processes are often slower)
-            output_values[i] = output_values[i-1] + (base_output * (input_values[i] / base_input) - output_values[i-1]) * time_constant
-            
-            # Add some noise (less noise in pharmaceutical processes due to tight control)
-            output_values[i] += np.random.normal(0, base_output * 0.005)
-            
-        else:  # Generic
-            # First order response with time constant
-            time_constant = 0.08
-            output_values[i] = output_values[i-1] + (base_output * (input_values[i] / base_input) - output_values[i-1]) * time_constant
-            
-            # Add some noise
-            output_values[i] += np.random.normal(0, base_output * 0.015)
-        
-        # Calculate efficiency
-        efficiency_values[i] = (output_values[i] / input_values[i]) * 100
-        
-        # Update dataframe
-        new_row = pd.DataFrame({
-            'Time': [time_points[i]],
-            'Input': [input_values[i]],
-            'Output': [output_values[i]],
-            'Efficiency': [efficiency_values[i]]
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        
-        # Update charts every few iterations to avoid excessive rendering
-        if i % max(1, int(num_points / 50)) == 0 or i == num_points - 1:
-            line_chart_placeholder.plotly_chart(create_line_chart(df), use_container_width=True)
-            gauge_chart_placeholder.plotly_chart(create_gauge_chart(efficiency_values[i]), use_container_width=True)
-            
-            # Control simulation speed
-            time.sleep(0.1 / speed_multiplier)
+        # Control simulation speed
+        time.sleep(0.1 / speed_multiplier)
     
     # Calculate final metrics
     avg_efficiency = np.mean(efficiency_values)
@@ -0,0 +1,367 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.linalg import null_space
+from scipy.optimize import linprog, minimize
+
+# Number of L-BFGS-B starts for polynomial models (the center of the box plus random points)
+DEFAULT_STARTS = 8
+
+# Memory allowed for one block of grid points and its polynomial design matrix
+GRID_MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Feasible points sampled to seed constrained searches, and hit-and-run steps per sample
+CONSTRAINED_SAMPLES = 20_000
+HIT_AND_RUN_STEPS = 30
+
+# Largest constraint violation accepted from a constrained local search, relative to the variable ranges
+FEASIBILITY_TOLERANCE = 1e-7
+
+# Total number of points of the seed grid and the finest resolution per variable
+MAX_GRID_POINTS = 1_000_000
+MAX_POINTS_PER_VARIABLE = 100
+
+# Function to get the linear model value at x
+def _linear_value(coef, intercept, x):
+    return float(intercept + np.dot(coef, x))
+
+# Function to solve a linear model exactly over the box [lower, upper]
+# Maximize/Minimize pick the best corner; Target Value returns the point of the box on the
+# target hyperplane closest to the center of the box, or the closest corner when the target is out of reach
+def solve_linear(coef, intercept, lower, upper, goal, target_value=None):
+    coef = np.asarray(coef, dtype=float)
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+
+    # Corners reaching the highest and lowest predictions
+    best_max = np.where(coef > 0, upper, lower)
+    best_min = np.where(coef > 0, lower, upper)
+
+    if goal == "Maximize":
+        x = best_max
+    elif goal == "Minimize":
+        x = best_min
+    else:
+        x = _solve_linear_target(coef, intercept, lower, upper, best_min, best_max, target_value)
+
+    return {"x": x, "y": _linear_value(coef, intercept, x)}
+
+# Function to find the point x = clip(center + t * coef) of the box with coef.x equal to the target
+# coef.x is piecewise linear and non-decreasing in t, so the root is found exactly between two breakpoints
+def _solve_linear_target(coef, intercept, lower, upper, best_min, best_max, target_value):
+    goal_value = target_value - intercept
+    if goal_value >= np.dot(coef, best_max):
+        return best_max
+    if goal_value <= np.dot(coef, best_min):
+        return best_min
+
+    center = (lower + upper) / 2
+    active = coef != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bounds_t = np.concatenate([(lower - center)[active] / coef[active], (upper - center)[active] / coef[active]])
+    breakpoints = np.unique(np.concatenate([[0.0], bounds_t]))
+
+    def point(t):
+        return np.clip(center + t * coef, lower, upper)
+
+    values = np.array([np.dot(coef, point(t)) for t in breakpoints])
+    i = int(np.searchsorted(values, goal_value))
+    if i == 0:
+        return point(breakpoints[0])
+    if i == len(breakpoints):
+        return point(breakpoints[-1])
+
+    # Linear interpolation is exact inside a segment between breakpoints
+    t0, t1 = breakpoints[i - 1], breakpoints[i]
+    v0, v1 = values[i - 1], values[i]
+    t = t0 if v1 == v0 else t0 + (goal_value - v0) * (t1 - t0) / (v1 - v0)
+    return point(t)
+
+# Function to evaluate a fitted PolynomialFeatures + LinearRegression model and its gradient at x
+# powers is poly.powers_ (features x variables); each feature is prod(x_i ** p_i)
+def polynomial_value_and_gradient(powers, coef, intercept, x):
+    features = np.prod(x ** powers, axis=1)
+    value = intercept + np.dot(coef, features)
+
+    gradient = np.empty(len(x))
+    for i in range(len(x)):
+        # d/dx_i prod(x ** p) = p_i * x_i ** (p_i - 1) * prod_{m != i}(x_m ** p_m)
+        reduced = powers.copy()
+        reduced[:, i] = np.maximum(reduced[:, i] - 1, 0)
+        gradient[i] = np.dot(coef, powers[:, i] * np.prod(x ** reduced, axis=1))
+
+    return float(value), gradient
+
+# Function to get the objective of a polynomial model and its gradient in scaled coordinates z,
+# where x = lower + z * scale; the objective is minimized for every goal
+def _polynomial_objective(powers, coef, intercept, lower, scale, goal, target_value):
+    def objective(z):
+        value, gradient = polynomial_value_and_gradient(powers, coef, intercept, lower + z * scale)
+        gradient = gradient * scale
+        if goal == "Maximize":
+            return -value, -gradient
+        if goal == "Minimize":
+            return value, gradient
+        error = value - target_value
+        return error ** 2, 2 * error * gradient
+
+    return objective
+
+# Function to optimize a polynomial model over the box [lower, upper] with multi-start L-BFGS-B
+# Variables are scaled to [0, 1] so that the solver sees a well-conditioned problem
+def solve_polynomial(poly, model, lower, upper, goal, target_value=None, starts=None, n_starts=DEFAULT_STARTS, seed=0):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    scale = upper - lower
+    powers = poly.powers_
+    coef = np.asarray(model.coef_, dtype=float)
+    intercept = float(model.intercept_)
+    objective = _polynomial_objective(powers, coef, intercept, lower, scale, goal, target_value)
+
+    # Starting points: caller-provided seeds, the center of the box and random points
+    rng = np.random.default_rng(seed)
+    start_points = [np.full(len(lower), 0.5)] + list(rng.random((max(n_starts - 1, 0), len(lower))))
+    if starts is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seeds = np.where(scale > 0, (np.atleast_2d(starts) - lower) / scale, 0.5)
+        start_points = list(seeds) + start_points
+
+    best = None
+    for z0 in start_points:
+        result = minimize(objective, np.clip(z0, 0, 1), jac=True, method="L-BFGS-B", bounds=[(0, 1)] * len(lower))
+        if best is None or result.fun < best.fun:
+            best = result
+
+    x = lower + best.x * scale
+    value, _ = polynomial_value_and_gradient(powers, coef, intercept, x)
+    return {"x": x, "y": value}
+
+# Function to get the number of grid points per variable fitting the total point budget
+def grid_resolution(num_variables, max_points=MAX_GRID_POINTS):
+    return int(max(3, min(MAX_POINTS_PER_VARIABLE, max_points ** (1 / max(num_variables, 1)))))
+
+# Function to score predictions so that the best point has the lowest score
+def goal_scores(y, goal, target_value=None):
+    if goal == "Maximize":
+        return -y
+    if goal == "Minimize":
+        return y
+    return np.abs(y - target_value)
+
+# Function to evaluate one block of flat grid indices; returns (score, x, y) of its best point
+def _evaluate_block(poly, model, axes, shape, start, stop, goal, target_value):
+    index = np.unravel_index(np.arange(start, stop), shape)
+    X_block = np.column_stack([axis[i] for axis, i in zip(axes, index)])
+    y_block = model.predict(poly.transform(X_block) if poly is not None else X_block)
+    best = int(np.argmin(goal_scores(y_block, goal, target_value)))
+    return goal_scores(y_block[best:best + 1], goal, target_value)[0], X_block[best], y_block[best]
+
+# Function to search a regular grid over the box without materializing it
+# Grid points are generated lazily in blocks sized to the memory budget; only the running best point is kept
+# poly may be None for models predicting directly from the raw variables
+def evaluate_grid_chunked(poly, model, lower, upper, goal, target_value=None, num_points=None,
+                          memory_budget_bytes=GRID_MEMORY_BUDGET_BYTES, max_workers=None):
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    num_points = num_points or grid_resolution(len(lower))
+
+    axes = [np.linspace(lo, hi, num_points) for lo, hi in zip(lower, upper)]
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape, dtype=np.int64))
+
+    # Bytes per grid point: the raw point, its polynomial features and the prediction
+    # Each worker holds one block, so the budget is shared between them
+    max_workers = max_workers or 1
+    row_bytes = 8 * (len(lower) + (poly.n_output_features_ if poly is not None else 0) + 1)
+    block_size = max(1, memory_budget_bytes // (row_bytes * max_workers))
+    blocks = ((start, min(start + block_size, total)) for start in range(0, total, block_size))
+
+    def run(block):
+        return _evaluate_block(poly, model, axes, shape, block[0], block[1], goal, target_value)
+
+    # Blocks are independent; NumPy releases the GIL during the products, so threads run them in parallel
+    if max_workers > 1 and total > block_size:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            best = min(executor.map(run, blocks), key=lambda result: result[0])
+    else:
+        best = min(map(run, blocks), key=lambda result: result[0])
+
+    return {"x": best[1], "y": float(best[2]), "num_points": total}
+
+# Function to find the optimum of any fitted model over the box [lower, upper]
+# Linear models are solved exactly; polynomial models get a memory-capped grid search refined by
+# multi-start L-BFGS-B with the analytic gradient; other models keep the grid optimum
+def solve_model(poly, model, lower, upper, goal, target_value=None, max_workers=None, max_grid_points=MAX_GRID_POINTS):
+    if poly is None and hasattr(model, "coef_"):
+        return solve_linear(model.coef_, model.intercept_, lower, upper, goal, target_value)
+
+    num_points = grid_resolution(len(lower), max_grid_points)
+    grid_solution = evaluate_grid_chunked(
+        poly, model, lower, upper, goal, target_value, num_points=num_points, max_workers=max_workers
+    )
+    if poly is not None and hasattr(model, "coef_"):
+        return solve_polynomial(poly, model, lower, upper, goal, target_value, starts=[grid_solution["x"]])
+    return grid_solution
+
+# Function to split a constraint set into inequality rows G x <= h (bounds of free variables included)
+# and equality rows E x = f (fixed variables, lower == upper, included)
+def _constraint_rows(constraints):
+    lower, upper = constraints["lower"], constraints["upper"]
+    num_variables = len(lower)
+    identity = np.eye(num_variables)
+    fixed = lower == upper
+    free = ~fixed
+
+    G = np.vstack([constraints["A_ub"], identity[free], -identity[free]])
+    h = np.concatenate([constraints["b_ub"], upper[free], -lower[free]])
+    E = np.vstack([constraints["A_eq"], identity[fixed]])
+    f = np.concatenate([constraints["b_eq"], lower[fixed]])
+    return G, h, E, f
+
+# Function to find the center of the largest ball inside the feasible set (an interior point)
+# Raises ValueError when the constraints cannot be satisfied together
+def chebyshev_center(constraints):
+    G, h, E, f = _constraint_rows(constraints)
+    num_variables = G.shape[1]
+
+    # Ball radii are measured inside the subspace left free by the equalities
+    N = null_space(E) if len(E) else np.eye(num_variables)
+    norms = np.linalg.norm(G @ N, axis=1)
+
+    result = linprog(
+        c=np.concatenate([np.zeros(num_variables), [-1.0]]),
+        A_ub=np.column_stack([G, norms]), b_ub=h,
+        A_eq=np.column_stack([E, np.zeros(len(E))]) if len(E) else None, b_eq=f if len(E) else None,
+        bounds=[(None, None)] * num_variables + [(0, None)],
+        method="highs"
+    )
+    if result.status != 0:
+        raise ValueError("The operating constraints cannot be satisfied together")
+    return result.x[:num_variables], result.x[-1]
+
+# Function to sample points spread over the feasible set with vectorized hit-and-run chains
+# Every chain starts at the Chebyshev center and moves along random directions within the constraints,
+# so all samples are feasible by construction
+def sample_feasible(constraints, n, steps=HIT_AND_RUN_STEPS, seed=0):
+    center, _ = chebyshev_center(constraints)
+    G, h, E, _ = _constraint_rows(constraints)
+    N = null_space(E) if len(E) else np.eye(len(center))
+    X = np.tile(center, (n, 1))
+    if N.shape[1] == 0:
+        return X
+
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        directions = rng.standard_normal((n, N.shape[1])) @ N.T
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+        # Feasible step interval [t_min, t_max] of every chain along its direction
+        rates = directions @ G.T
+        slack = np.maximum(h - X @ G.T, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limits = slack / rates
+        t_max = np.min(np.where(rates > 1e-12, limits, np.inf), axis=1)
+        t_min = np.max(np.where(rates < -1e-12, limits, -np.inf), axis=1)
+
+        X = X + (t_min + rng.random(n) * (t_max - t_min))[:, None] * directions
+
+    return X
+
+# Function to solve a linear model exactly under linear constraints with a linear program
+# Target Value minimizes |prediction - target| through an auxiliary variable bounding the deviation
+def solve_linear_constrained(coef, intercept, constraints, goal, target_value=None):
+    coef = np.asarray(coef, dtype=float)
+    num_variables = len(coef)
+    bounds = list(zip(constraints["lower"], constraints["upper"]))
+    A_ub, b_ub = constraints["A_ub"], constraints["b_ub"]
+    A_eq, b_eq = constraints["A_eq"], constraints["b_eq"]
+
+    if goal in ("Maximize", "Minimize"):
+        c = -coef if goal == "Maximize" else coef
+    else:
+        # Variables (x, s): minimize s with coef.x - s <= target - intercept and -coef.x - s <= intercept - target
+        goal_value = target_value - intercept
+        c = np.concatenate([np.zeros(num_variables), [1.0]])
+        A_ub = np.vstack([
+            np.column_stack([A_ub, np.zeros(len(A_ub))]),
+            np.concatenate([coef, [-1.0]]),
+            np.concatenate([-coef, [-1.0]])
+        ])
+        b_ub = np.concatenate([b_ub, [goal_value, -goal_value]])
+        A_eq = np.column_stack([A_eq, np.zeros(len(A_eq))])
+        bounds = bounds + [(0, None)]
+
+    result = linprog(
+        c, A_ub=A_ub if len(A_ub) else None, b_ub=b_ub if len(A_ub) else None,
+        A_eq=A_eq if len(A_eq) else None, b_eq=b_eq if len(A_eq) else None,
+        bounds=bounds, method="highs"
+    )
+    if result.status != 0:
+        raise ValueError("The operating constraints cannot be satisfied together")
+
+    x = result.x[:num_variables]
+    return {"x": x, "y": _linear_value(coef, intercept, x)}
+
+# Function to get the largest constraint violation of a point
+def _max_violation(constraints, x):
+    G, h, E, f = _constraint_rows(constraints)
+    violations = [np.max(G @ x - h, initial=0.0)]
+    if len(E):
+        violations.append(np.max(np.abs(E @ x - f)))
+    return max(violations)
+
+# Function to optimize a polynomial model under linear constraints
+# Feasible samples seed multi-start SLSQP runs on the analytic gradient; the constraints stay linear in the
+# scaled coordinates, so they are handled exactly by the solver rather than by filtering candidate points
+def solve_polynomial_constrained(poly, model, constraints, goal, target_value=None, n_starts=DEFAULT_STARTS, seed=0):
+    lower, upper = constraints["lower"], constraints["upper"]
+    samples = sample_feasible(constraints, CONSTRAINED_SAMPLES, seed=seed)
+    scores = goal_scores(model.predict(poly.transform(samples)), goal, target_value)
+    best_sample = samples[int(np.argmin(scores))]
+
+    scale = np.where(upper > lower, upper - lower, 1.0)
+    objective = _polynomial_objective(
+        poly.powers_, np.asarray(model.coef_, dtype=float), float(model.intercept_), lower, scale, goal, target_value
+    )
+
+    # A x <= b in scaled coordinates: (A * scale) z <= b - A lower
+    solver_constraints = []
+    if len(constraints["A_ub"]):
+        A, b = constraints["A_ub"] * scale, constraints["b_ub"] - constraints["A_ub"] @ lower
+        solver_constraints.append({"type": "ineq", "fun": lambda z: b - A @ z, "jac": lambda z: -A})
+    if len(constraints["A_eq"]):
+        A_eq, b_eq = constraints["A_eq"] * scale, constraints["b_eq"] - constraints["A_eq"] @ lower
+        solver_constraints.append({"type": "eq", "fun": lambda z: A_eq @ z - b_eq, "jac": lambda z: A_eq})
+
+    # Starts: the best feasible samples, spread by taking every k-th of the ranked samples
+    ranked = samples[np.argsort(scores)]
+    starts = ranked[::max(1, len(ranked) // (10 * n_starts))][:n_starts]
+    bounds = [(0.0, 1.0) if hi > lo else (0.0, 0.0) for lo, hi in zip(lower, upper)]
+    tolerance = FEASIBILITY_TOLERANCE * max(float(np.max(scale)), 1.0)
+
+    best_x = best_sample
+    best_score = float(goal_scores(model.predict(poly.transform(best_sample[None, :])), goal, target_value)[0])
+    for x0 in starts:
+        result = minimize(objective, (x0 - lower) / scale, jac=True, method="SLSQP",
+                          bounds=bounds, constraints=solver_constraints)
+        x = lower + np.clip(result.x, [b[0] for b in bounds], [b[1] for b in bounds]) * scale
+        if _max_violation(constraints, x) > tolerance:
+            continue
+        score = float(goal_scores(model.predict(poly.transform(x[None, :])), goal, target_value)[0])
+        if score < best_score:
+            best_x, best_score = x, score
+
+    return {"x": best_x, "y": float(model.predict(poly.transform(best_x[None, :]))[0])}
+
+# Function to find the optimum of any fitted model under linear constraints
+# Linear models are solved exactly by linear programming, polynomial models by SLSQP from feasible samples;
+# models without an analytic gradient keep the best of the feasible samples
+def solve_model_constrained(poly, model, constraints, goal, target_value=None, seed=0):
+    if poly is None and hasattr(model, "coef_"):
+        return solve_linear_constrained(model.coef_, model.intercept_, constraints, goal, target_value)
+    if poly is not None and hasattr(model, "coef_"):
+        return solve_polynomial_constrained(poly, model, constraints, goal, target_value, seed=seed)
+
+    samples = sample_feasible(constraints, CONSTRAINED_SAMPLES, seed=seed)
+    y = model.predict(poly.transform(samples) if poly is not None else samples)
+    best = int(np.argmin(goal_scores(y, goal, target_value)))
+    return {"x": samples[best], "y": float(y[best])}
@@ -183,3 +183,68 @@ def check_kpi_alerts(kpi_values, field):
         alerts.append(("Critical: Process efficiency is severely degraded", "error"))
     
     return alerts
+
+# Main metric stored in extended_kpi_data.kpi_data for each KPI type
+KPI_MAIN_METRICS = {
+    "oee": "oee_value",
+    "yield": "yield_rate",
+    "fpy": "fpy_rate",
+    "cycle_time": "cycle_time_hours",
+    "productivity": "productivity_per_hour",
+    "defect_rate": "defect_rate",
+    "nq_cost": "total_nq_cost",
+    "equipment_availability": "availability_rate",
+    "equipment_utilization": "utilization_rate",
+    "on_time_delivery": "otd_rate",
+    "order_lead_time": "avg_lead_time_days",
+    "maintenance_cost": "maintenance_cost_per_unit",
+    "inventory_turnover": "inventory_turnover_ratio",
+    "safety_incidents": "incident_rate",
+    "absence_rate": "absence_rate",
+    "roi_improvement": "roi_percentage",
+    "flow_efficiency": "efficiency",
+    "energy_efficiency": "efficiency"
+}
+
+# Unit of the main metric of each KPI type
+KPI_MAIN_UNITS = {
+    "oee": "%",
+    "yield": "%",
+    "fpy": "%",
+    "cycle_time": "hours",
+    "productivity": "units/h",
+    "defect_rate": "%",
+    "nq_cost": "€",
+    "equipment_availability": "%",
+    "equipment_utilization": "%",
+    "on_time_delivery": "%",
+    "order_lead_time": "days",
+    "maintenance_cost": "€/unit",
+    "inventory_turnover": "ratio",
+    "safety_incidents": "per 1M h",
+    "absence_rate": "%",
+    "roi_improvement": "%",
+    "flow_efficiency": "%",
+    "energy_efficiency": "%"
+}
+
+# KPI types where a lower main metric is better
+KPI_LOWER_IS_BETTER = {
+    "cycle_time", "defect_rate", "nq_cost", "order_lead_time",
+    "maintenance_cost", "safety_incidents", "absence_rate"
+}
+
+# Function to get the main value of an extended KPI entry
+def get_main_kpi_value(kpi_type, kpi_data):
+    if not isinstance(kpi_data, dict) or len(kpi_data) == 0:
+        return None
+    
+    main_metric = KPI_MAIN_METRICS.get(kpi_type)
+    if main_metric in kpi_data:
+        return kpi_data[main_metric]
+    
+    # Fall back to the first numeric value for unknown KPI types
+    for value in kpi_data.values():
+        if isinstance(value, (int, float)):
+            return value
+    return None